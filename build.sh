@@ -6,6 +6,7 @@ pip install -r requirements.txt
 
 python manage.py collectstatic --no-input
 python manage.py migrate
+python manage.py partition_reservations
 python manage.py create_group 
 python manage.py create_rooms 
 python manage.py create_customers 
@@ -0,0 +1,78 @@
+import random
+import statistics
+import string
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from customer.models import Customer
+
+
+class Command(BaseCommand):
+    help = "Mide la latencia de la búsqueda de clientes según el número de clientes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[10000, 100000, 1000000],
+            help="Números de clientes a probar",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Repeticiones por medición",
+        )
+
+    def word(self, length):
+        return "".join(random.choices(string.ascii_lowercase, k=length)).capitalize()
+
+    def populate(self, size):
+        """Crea `size` clientes con nombres aleatorios"""
+        for start in range(0, size, 10000):
+            batch = range(start, min(start + 10000, size))
+            users = User.objects.bulk_create(
+                [User(username=f"benchmark_search_{i}") for i in batch]
+            )
+            Customer.objects.bulk_create(
+                [
+                    Customer(
+                        user=user,
+                        name=self.word(random.randint(4, 8)),
+                        last_name=self.word(random.randint(5, 10)),
+                        email=f"{user.username}@example.com",
+                        phone=str(random.randint(600000000, 699999999)),
+                    )
+                    for user in users
+                ]
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Customer._meta.db_table}")
+
+    def measure(self, text, repeat):
+        """Devuelve la mediana en milisegundos de la primera página de resultados"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(Customer.objects.search(text).order_by("-rank", "last_name", "id")[:20])
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'clientes':>10} {'nombre (ms)':>12} {'prefijo (ms)':>13} {'teléfono (ms)':>14}"
+        )
+        for size in options["sizes"]:
+            # Todo se deshace al salir: la base de datos queda intacta
+            with transaction.atomic():
+                self.populate(size)
+                sample = Customer.objects.order_by("?").first()
+                name_ms = self.measure(f"{sample.name} {sample.last_name}", options["repeat"])
+                prefix_ms = self.measure(sample.last_name[:4], options["repeat"])
+                phone_ms = self.measure(sample.phone, options["repeat"])
+                transaction.set_rollback(True)
+            self.stdout.write(f"{size:>10} {name_ms:>12.2f} {prefix_ms:>13.2f} {phone_ms:>14.2f}")
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:44
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0005_customer_customer_last_name_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            """
+            CREATE TRIGGER customer_search_vector_update
+            BEFORE INSERT OR UPDATE OF name, last_name, email, phone ON customer_customer
+            FOR EACH ROW EXECUTE FUNCTION tsvector_update_trigger(
+                search_vector, 'pg_catalog.simple', name, last_name, email, phone
+            );
+            UPDATE customer_customer SET name = name;
+            """,
+            "DROP TRIGGER customer_search_vector_update ON customer_customer;",
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='customer_search_vector_gin'),
+        ),
+    ]
@@ -2,13 +2,70 @@
 Customer
 '''
 
+import re
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
 from django.core.exceptions import PermissionDenied
+from django.db.models.functions import Cast
 
 # Create your models here.
 
 
+def search_query(text):
+    """
+    Convierte el texto de búsqueda en una consulta de texto completo por prefijos.
+
+    Cada palabra se busca como prefijo (`palabra:*`) y todas deben aparecer,
+    de modo que la búsqueda funciona mientras se escribe. Las palabras se
+    entrecomillan para que la sintaxis de tsquery no pueda inyectarse.
+
+    Args:
+        text (str): Texto introducido por el usuario.
+
+    Returns:
+        SearchQuery: Consulta para Customer.search_vector, o None si no hay palabras.
+    """
+    words = re.findall(r"[\w@.+-]+", text)
+    if not words:
+        return None
+    raw = " & ".join("'{}':*".format(word.replace("'", "''")) for word in words)
+    return SearchQuery(raw, search_type="raw", config="simple")
+
+
+class CustomerQuerySet(models.QuerySet):
+    """
+    QuerySet de clientes.
+
+    Métodos:
+        search(text): Filtra los clientes que coinciden con el texto y los puntúa.
+    """
+
+    def search(self, text):
+        """
+        Filtra los clientes por nombre, apellido, email o teléfono.
+
+        Usa el índice GIN de search_vector y anota cada cliente con su
+        relevancia en `rank`. SearchRank devuelve un real (float4); se
+        convierte a double precision para que el valor guardado en un cursor
+        de paginación vuelva a compararse igual con la columna.
+
+        Args:
+            text (str): Texto de búsqueda.
+
+        Returns:
+            QuerySet: Clientes que coinciden, anotados con `rank`.
+        """
+        query = search_query(text)
+        if query is None:
+            return self.annotate(rank=models.Value(0.0)).none()
+        return self.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(models.F("search_vector"), query), models.FloatField())
+        )
+
+
 class Customer(models.Model):
     """
     Modelo que representa a un cliente.
@@ -21,6 +78,9 @@ class Customer(models.Model):
         phone (str): Número de teléfono del cliente, con un máximo de 10 caracteres.
         address (str): Dirección del cliente, con un máximo de 100 caracteres.
         card_number (str): Número de tarjeta del cliente, con un máximo de 16 caracteres.
+        search_vector (SearchVectorField): Nombre, apellido, email y teléfono
+            indexados para la búsqueda. Lo mantiene un trigger de la base de datos.
+        updated_at (DateTimeField): Última modificación, para exportaciones incrementales.
     """  
 
     
@@ -31,6 +91,17 @@ class Customer(models.Model):
     phone = models.CharField(max_length=12)
     address = models.CharField(max_length=100)
     card_number = models.CharField(max_length=16)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CustomerQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["last_name", "id"], name="customer_last_name_id_idx"),
+            GinIndex(fields=["search_vector"], name="customer_search_vector_gin"),
+            models.Index(fields=["updated_at"], name="customer_updated_at_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         """
@@ -1,3 +1,4 @@
+import json
 from django.contrib.auth.models import Permission, User
 from django.core.exceptions import PermissionDenied
 from django.test import TestCase
@@ -108,6 +109,84 @@ class CustomerViewsTest(TestCase):
         response = self.client.get(reverse('show_customers'))
         self.assertEqual(response.status_code, 403)
 
+    def test_show_customers_keyset_pagination(self):
+        """Verifica que los clientes se paginan por apellido e id."""
+        for i in range(25):
+            user = User.objects.create_user(username=f'guest{i}')
+            Customer.objects.create(user=user, name='Guest', last_name=f'Apellido{i:02d}')
+        self.client.login(username='staff', password='staffpass')
+        response = self.client.get(reverse('show_customers'))
+        page = response.context['page']
+        self.assertEqual(len(page), 20)
+        self.assertEqual(page.object_list[0].last_name, 'Apellido00')
+        self.assertFalse(page.has_previous)
+
+        response = self.client.get(reverse('show_customers'), {'after': page.next_cursor})
+        second = response.context['page']
+        self.assertEqual(
+            [customer.last_name for customer in second],
+            [f'Apellido{i:02d}' for i in range(20, 25)] + ['User'],
+        )
+        self.assertFalse(second.has_next)
+
+        response = self.client.get(reverse('show_customers'), {'before': second.previous_cursor})
+        self.assertEqual(response.context['page'].object_list, page.object_list)
+
+    def test_show_customers_search(self):
+        """Verifica que la búsqueda encuentra por prefijo, email y teléfono."""
+        Customer.objects.create(
+            user=User.objects.create_user(username='ana'),
+            name='Ana', last_name='García', email='ana@example.com', phone='600111222',
+        )
+        Customer.objects.create(
+            user=User.objects.create_user(username='anabel'),
+            name='Anabel', last_name='Ruiz', email='anabel@example.com', phone='600333444',
+        )
+        self.client.login(username='staff', password='staffpass')
+
+        def search(text):
+            response = self.client.get(reverse('show_customers'), {'search': text})
+            return [customer.name for customer in response.context['page']]
+
+        self.assertEqual(sorted(search('ana')), ['Ana', 'Anabel'])
+        self.assertEqual(search('ana garc'), ['Ana'])
+        self.assertEqual(search('anabel@example.com'), ['Anabel'])
+        self.assertEqual(search('600333'), ['Anabel'])
+        self.assertEqual(search("' & !("), [])
+
+    def test_show_customers_search_pages(self):
+        """Verifica que las páginas de una búsqueda devuelven cada cliente una sola vez."""
+        for i in range(30):
+            Customer.objects.create(
+                user=User.objects.create_user(username=f'ana{i}'), name='Ana', last_name=f'Apellido{i:02d}'
+            )
+        self.client.login(username='staff', password='staffpass')
+        params = {'search': 'ana'}
+        page = self.client.get(reverse('show_customers'), params).context['page']
+        seen = list(page)
+        while page.has_next:
+            params['after'] = page.next_cursor
+            page = self.client.get(reverse('show_customers'), params).context['page']
+            seen.extend(page)
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(len({customer.id for customer in seen}), 30)
+
+    def test_search_vector_follows_updates(self):
+        """Verifica que el índice de búsqueda se actualiza al modificar el cliente."""
+        self.regular_customer.last_name = 'Martínez'
+        self.regular_customer.save()
+        self.assertTrue(Customer.objects.search('martínez').exists())
+        self.assertFalse(Customer.objects.search('user').exists())
+
+    def test_export_customers(self):
+        """Verifica que la exportación de clientes se envía por partes y omite la tarjeta."""
+        self.client.login(username='staff', password='staffpass')
+        response = self.client.get(reverse('export_customers'), {'format': 'ndjson'})
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([row['last_name'] for row in rows], ['User'])
+        self.assertNotIn('card_number', rows[0])
+
     def test_staff_can_delete_customer(self):
         """Verifica que staff pueda eliminar un cliente."""
         self.client.login(username='staff', password='staffpass')
@@ -1,7 +1,11 @@
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_GET
 
 import reservation_app
 import reservation_app.views
+from reservation_app import exports
+from reservation_app.pagination import keyset_page
 from .forms import CustomerForm
 from .models import Customer
 from django.shortcuts import get_object_or_404
@@ -56,14 +60,30 @@ def show_customers(request):
     """
     Muestra la lista de clientes.
 
+    Los clientes se paginan por clave (last_name, id) con los cursores
+    `after` y `before` (ver reservation_app.pagination). El parámetro
+    `search` filtra por nombre, apellido, email o teléfono y ordena por
+    relevancia.
+
     Args:
         request (HttpRequest): La solicitud HTTP.
 
     Returns:
         HttpResponse: Renderiza la plantilla con la lista de clientes.
     """
-    customers = Customer.objects.all()
-    context = {"customers": customers}
+    customers = Customer.objects.defer("search_vector")
+    ordering = ["last_name", "id"]
+    search_query = request.GET.get("search", "")
+    if search_query:
+        customers = customers.search(search_query)
+        ordering = ["-rank", *ordering]
+    page = keyset_page(
+        customers,
+        ordering,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+    )
+    context = {"customers": page, "page": page, "search_query": search_query}
     return render(request, "customer/show_customer.html", context)
 
 
@@ -116,3 +136,34 @@ def update_customer(request, id):
         form = CustomerForm(instance=customer)
     context = {"form": form}
     return render(request, "customer/customer_form.html", context)
+
+
+@login_required
+@permission_required("customer.view_customer", raise_exception=True)
+@require_GET
+def export_customers(request):
+    """
+    Exporta los clientes en CSV o NDJSON sin cargarlos en memoria.
+
+    Acepta el parámetro `search` de show_customers y `format` ("csv" por
+    defecto o "ndjson").
+
+    Args:
+        request (HttpRequest): La solicitud HTTP.
+
+    Returns:
+        StreamingHttpResponse: Fichero con los clientes.
+    """
+    output = request.GET.get("format", "csv")
+    if output not in exports.FORMATS:
+        return JsonResponse({"status": "failed"}, status=400)
+    customers = Customer.objects.all()
+    search_query = request.GET.get("search", "")
+    if search_query:
+        customers = customers.search(search_query)
+    response = StreamingHttpResponse(
+        exports.export_lines(exports.customer_rows(customers), exports.CUSTOMER_FIELDS, output),
+        content_type=exports.FORMATS[output],
+    )
+    response["Content-Disposition"] = f'attachment; filename="customers.{output}"'
+    return response
@@ -1,86 +1,60 @@
 # Azure Storage backends for Django with SAS token support
 from storages.backends.azure_storage import AzureStorage
 from django.conf import settings
-from datetime import datetime, timedelta
-from azure.storage.blob import generate_blob_sas, BlobSasPermissions
 import logging
 
+from . import sas
+from .uploads import UniqueNameMixin
+
 logger = logging.getLogger(__name__)
 
 
-class AzureMediaStorage(AzureStorage):
+class SasUrlMixin:
     """
-    Storage for media files in Azure Blob Storage with SAS token authentication
+    Signed URLs through the shared, time-bucketed signer in reservation.sas.
+
+    Every call within the same bucket returns the same URL for a blob, so
+    a page that shows a photo many times signs it once and browsers can
+    cache it.
     """
-    account_name = settings.AZURE_ACCOUNT_NAME
-    account_key = settings.AZURE_ACCOUNT_KEY
-    azure_container = settings.AZURE_CONTAINER
-    location = 'media'
-    overwrite_files = getattr(settings, 'AZURE_OVERWRITE_FILES', False)
-    expiration_secs = getattr(settings, 'AZURE_URL_EXPIRATION_SECS', 3600)
-    
+
     def url(self, name, expire=None):
         """
         Generate a URL with SAS token for secure access
         """
         if expire is None:
             expire = self.expiration_secs
-            
+
+        blob_name = f"{self.location}/{name}" if self.location else name
         try:
-            # Generate SAS token
-            sas_token = generate_blob_sas(
-                account_name=self.account_name,
-                account_key=self.account_key,
-                container_name=self.azure_container,
-                blob_name=f"{self.location}/{name}" if self.location else name,
-                permission=BlobSasPermissions(read=True),
-                expiry=datetime.utcnow() + timedelta(seconds=expire)
+            return sas.signer(self.account_name, self.account_key, self.azure_container).url(
+                blob_name, expire
             )
-            
-            # Build URL with SAS token
-            blob_url = f"https://{self.account_name}.blob.core.windows.net/{self.azure_container}/{self.location}/{name}"
-            return f"{blob_url}?{sas_token}"
-            
         except Exception as e:
-            logger.error(f"Error generating SAS token for {name}: {e}")
+            logger.error(f"Error generating SAS token for {blob_name}: {e}")
             # Fallback to standard URL without SAS token
             return super().url(name)
 
 
-class AzureStaticStorage(AzureStorage):
+class AzureMediaStorage(UniqueNameMixin, SasUrlMixin, AzureStorage):
+    """
+    Storage for media files in Azure Blob Storage with SAS token authentication
+    """
+    account_name = getattr(settings, 'AZURE_ACCOUNT_NAME', None)
+    account_key = getattr(settings, 'AZURE_ACCOUNT_KEY', None)
+    azure_container = getattr(settings, 'AZURE_CONTAINER', None)
+    location = 'media'
+    overwrite_files = getattr(settings, 'AZURE_OVERWRITE_FILES', False)
+    expiration_secs = getattr(settings, 'AZURE_URL_EXPIRATION_SECS', 3600)
+
+
+class AzureStaticStorage(SasUrlMixin, AzureStorage):
     """
     Storage for static files in Azure Blob Storage with SAS token authentication
     """
-    account_name = settings.AZURE_ACCOUNT_NAME
-    account_key = settings.AZURE_ACCOUNT_KEY
-    azure_container = settings.AZURE_CONTAINER
+    account_name = getattr(settings, 'AZURE_ACCOUNT_NAME', None)
+    account_key = getattr(settings, 'AZURE_ACCOUNT_KEY', None)
+    azure_container = getattr(settings, 'AZURE_CONTAINER', None)
     location = 'static'
     overwrite_files = True  # Static files can be overwritten
     expiration_secs = getattr(settings, 'AZURE_URL_EXPIRATION_SECS', 3600)
-    
-    def url(self, name, expire=None):
-        """
-        Generate a URL with SAS token for secure access to static files
-        """
-        if expire is None:
-            expire = self.expiration_secs
-            
-        try:
-            # Generate SAS token
-            sas_token = generate_blob_sas(
-                account_name=self.account_name,
-                account_key=self.account_key,
-                container_name=self.azure_container,
-                blob_name=f"{self.location}/{name}" if self.location else name,
-                permission=BlobSasPermissions(read=True),
-                expiry=datetime.utcnow() + timedelta(seconds=expire)
-            )
-            
-            # Build URL with SAS token
-            blob_url = f"https://{self.account_name}.blob.core.windows.net/{self.azure_container}/{self.location}/{name}"
-            return f"{blob_url}?{sas_token}"
-            
-        except Exception as e:
-            logger.error(f"Error generating SAS token for static file {name}: {e}")
-            # Fallback to standard URL without SAS token
-            return super().url(name)
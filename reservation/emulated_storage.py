@@ -0,0 +1,179 @@
+"""
+Emulador local de almacenamiento de blobs con latencia y fallos inyectados.
+
+EmulatedBlobStorage ofrece la misma interfaz que AzureMediaStorage y
+MediaStorage (url con caducidad y firma SAS, location, sobrescritura
+desactivada y nombres únicos sin HEAD), pero guarda los archivos en disco
+o en memoria. Cada operación puede esperar una latencia fija y fallar con
+una probabilidad dada, de modo que las subidas, los listados y la
+generación de URLs se pueden medir y probar sin red.
+
+Las URLs se firman con el mismo SasSigner compartido que usan los backends
+de Azure (ver reservation.sas), con la cuenta de desarrollo de Azurite.
+"""
+
+import random
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, InMemoryStorage, Storage
+from django.utils.encoding import filepath_to_uri
+
+from . import sas
+from .uploads import UniqueNameMixin
+
+OPERATIONS = ("exists", "save", "open", "delete", "properties", "listdir", "url")
+
+# Cuenta y clave públicas del emulador Azurite
+ACCOUNT_NAME = "devstoreaccount1"
+ACCOUNT_KEY = (
+    "Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw=="
+)
+
+
+class EmulatedStorageError(OSError):
+    """Fallo simulado de una operación del almacenamiento."""
+
+
+def per_operation(value):
+    """
+    Normaliza un valor por operación.
+
+    Args:
+        value: Número para todas las operaciones, diccionario operación ->
+            número o cadena "20" o "exists=20,save=40" (p. ej. de una
+            variable de entorno).
+
+    Returns:
+        dict: operación -> número.
+    """
+    if not value:
+        return {}
+    if isinstance(value, dict):
+        values = value
+    elif isinstance(value, str) and "=" in value:
+        values = dict(item.split("=", 1) for item in value.split(","))
+    else:
+        values = dict.fromkeys(OPERATIONS, value)
+    unknown = set(values) - set(OPERATIONS)
+    if unknown:
+        raise ValueError(f"Operaciones desconocidas: {', '.join(sorted(unknown))}")
+    return {operation: float(amount) for operation, amount in values.items()}
+
+
+class EmulatedBlobStorage(UniqueNameMixin, Storage):
+    """
+    Almacenamiento de blobs emulado en disco o en memoria.
+
+    Atributos:
+        location (str): Prefijo de los blobs en el contenedor, como en Azure.
+        overwrite_files (bool): Si es False, los nombres ocupados se cambian.
+        expiration_secs (int): Validez por defecto de las URLs firmadas.
+        latency (dict): Milisegundos de espera por operación.
+        failure_rate (dict): Probabilidad de fallo por operación.
+        requests (Counter): Peticiones recibidas por operación.
+
+    Métodos:
+        reset(): Pone a cero el contador de peticiones.
+    """
+
+    def __init__(self, root=None, base_url=None, location="media", overwrite_files=False,
+                 expiration_secs=3600, latency=None, failure_rate=None,
+                 account_name=ACCOUNT_NAME, account_key=ACCOUNT_KEY, container="media",
+                 seed=None):
+        """
+        Args:
+            root (str): Directorio de los archivos; si falta, se guardan en memoria.
+            base_url (str): Prefijo de las URLs (por defecto, MEDIA_URL).
+            location (str): Prefijo de los blobs firmados.
+            overwrite_files (bool): Sobrescribir los nombres ocupados.
+            expiration_secs (int): Validez por defecto de las URLs.
+            latency: Milisegundos por operación (ver per_operation).
+            failure_rate: Probabilidad de fallo por operación (ver per_operation).
+            account_name (str): Cuenta con la que se firman las URLs.
+            account_key (str): Clave de la cuenta.
+            container (str): Contenedor de los blobs.
+            seed (int): Semilla de los fallos, para repetir una ejecución.
+        """
+        self.backend = FileSystemStorage(location=root) if root else InMemoryStorage()
+        self.base_url = base_url if base_url is not None else settings.MEDIA_URL
+        self.location = location
+        self.overwrite_files = overwrite_files
+        self.expiration_secs = expiration_secs
+        self.latency = per_operation(latency)
+        self.failure_rate = per_operation(failure_rate)
+        self.account_name = account_name
+        self.account_key = account_key
+        self.azure_container = container
+        self.requests = Counter()
+        self._random = random.Random(seed)
+
+    def _request(self, operation):
+        """Cuenta la petición, espera su latencia y falla si toca"""
+        self.requests[operation] += 1
+        delay = self.latency.get(operation)
+        if delay:
+            time.sleep(delay / 1000)
+        rate = self.failure_rate.get(operation)
+        if rate and self._random.random() < rate:
+            raise EmulatedStorageError(f"Fallo simulado en {operation}")
+
+    def reset(self):
+        """Pone a cero el contador de peticiones."""
+        self.requests.clear()
+
+    def get_available_name(self, name, max_length=None):
+        if self.overwrite_files:
+            return name
+        return super().get_available_name(name, max_length)
+
+    def exists(self, name):
+        self._request("exists")
+        return self.backend.exists(name)
+
+    def _save(self, name, content):
+        self._request("save")
+        if self.backend.exists(name):
+            self.backend.delete(name)
+        return self.backend._save(name, content)
+
+    def _open(self, name, mode="rb"):
+        self._request("open")
+        return self.backend._open(name, mode)
+
+    def delete(self, name):
+        self._request("delete")
+        self.backend.delete(name)
+
+    def size(self, name):
+        self._request("properties")
+        return self.backend.size(name)
+
+    def listdir(self, path):
+        self._request("listdir")
+        return self.backend.listdir(path)
+
+    def get_modified_time(self, name):
+        self._request("properties")
+        return self.backend.get_modified_time(name)
+
+    def url(self, name, expire=None):
+        """
+        URL del archivo con un token SAS de lectura, como AzureMediaStorage.
+
+        Args:
+            name (str): Nombre del archivo.
+            expire (int): Segundos mínimos de validez (por defecto, expiration_secs).
+
+        Returns:
+            str: URL firmada.
+        """
+        self._request("url")
+        if expire is None:
+            expire = self.expiration_secs
+        blob_name = f"{self.location}/{name}" if self.location else name
+        token = sas.signer(self.account_name, self.account_key, self.azure_container).token(
+            blob_name, expire
+        )
+        return f"{self.base_url}{filepath_to_uri(name)}?{token}"
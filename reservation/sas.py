@@ -0,0 +1,153 @@
+"""
+Firma de URLs SAS de Azure Blob Storage con caché.
+
+Las URLs firmadas caducan al final de un intervalo fijo (bucket) más el
+tiempo de expiración pedido, de modo que todas las firmas de un blob dentro
+del mismo intervalo son idénticas: se calculan una sola vez y el navegador
+puede cachear la imagen. Cada URL sigue siendo válida al menos `expire`
+segundos desde que se entrega y como mucho `expire + bucket_secs`.
+
+Las firmas se guardan en una caché LRU acotada por firmante; signer()
+devuelve el firmante compartido de cada cuenta y contenedor, que usan los
+backends de azure_storage_backends.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from azure.storage.blob import BlobSasPermissions, generate_blob_sas
+from django.conf import settings
+
+# Segundos de cada intervalo de caducidad
+BUCKET_SECS = 900
+# Firmas guardadas por firmante
+CACHE_SIZE = 4096
+
+
+class SasSigner:
+    """
+    Firmante de URLs de lectura de un contenedor con caché LRU acotada.
+
+    Atributos:
+        account_name (str): Cuenta de almacenamiento.
+        account_key (str): Clave de la cuenta.
+        container (str): Contenedor de los blobs.
+        bucket_secs (int): Duración de cada intervalo de caducidad.
+        max_entries (int): Firmas que guarda la caché (0 la desactiva).
+        signatures (int): Firmas calculadas, es decir, fallos de la caché.
+
+    Métodos:
+        expiry(expire, now): Instante de caducidad compartido por el intervalo actual.
+        token(blob_name, expire): Token SAS de lectura del blob.
+        url(blob_name, expire): URL del blob con el token SAS.
+        clear(): Vacía la caché.
+    """
+
+    def __init__(self, account_name, account_key, container, bucket_secs=BUCKET_SECS,
+                 max_entries=CACHE_SIZE, clock=time.time):
+        self.account_name = account_name
+        self.account_key = account_key
+        self.container = container
+        self.bucket_secs = bucket_secs
+        self.max_entries = max_entries
+        self.clock = clock
+        self.signatures = 0
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def expiry(self, expire, now=None):
+        """
+        Instante de caducidad (segundos Unix) de las firmas del intervalo actual.
+
+        Args:
+            expire (int): Segundos mínimos de validez.
+            now (float): Instante actual (por defecto, el reloj del firmante).
+
+        Returns:
+            int: Final del intervalo actual más `expire`.
+        """
+        if now is None:
+            now = self.clock()
+        bucket = int(now // self.bucket_secs)
+        return (bucket + 1) * self.bucket_secs + expire
+
+    def token(self, blob_name, expire):
+        """
+        Token SAS de lectura del blob, firmado una vez por intervalo.
+
+        Args:
+            blob_name (str): Ruta del blob dentro del contenedor.
+            expire (int): Segundos mínimos de validez.
+
+        Returns:
+            str: Token SAS.
+        """
+        key = (blob_name, self.expiry(expire))
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is not None:
+                self._tokens.move_to_end(key)
+                return token
+        token = generate_blob_sas(
+            account_name=self.account_name,
+            account_key=self.account_key,
+            container_name=self.container,
+            blob_name=blob_name,
+            permission=BlobSasPermissions(read=True),
+            expiry=datetime.fromtimestamp(key[1], timezone.utc),
+        )
+        with self._lock:
+            self.signatures += 1
+            if self.max_entries:
+                self._tokens[key] = token
+                self._tokens.move_to_end(key)
+                while len(self._tokens) > self.max_entries:
+                    self._tokens.popitem(last=False)
+        return token
+
+    def url(self, blob_name, expire):
+        """
+        URL del blob con un token SAS de lectura.
+
+        Args:
+            blob_name (str): Ruta del blob dentro del contenedor.
+            expire (int): Segundos mínimos de validez.
+
+        Returns:
+            str: URL firmada.
+        """
+        token = self.token(blob_name, expire)
+        return (
+            f"https://{self.account_name}.blob.core.windows.net/"
+            f"{self.container}/{blob_name}?{token}"
+        )
+
+    def clear(self):
+        """Vacía la caché de firmas."""
+        with self._lock:
+            self._tokens.clear()
+
+
+@lru_cache(maxsize=None)
+def signer(account_name, account_key, container):
+    """
+    Firmante compartido de una cuenta y un contenedor.
+
+    Args:
+        account_name (str): Cuenta de almacenamiento.
+        account_key (str): Clave de la cuenta.
+        container (str): Contenedor de los blobs.
+
+    Returns:
+        SasSigner: El mismo firmante en cada llamada con los mismos datos.
+    """
+    return SasSigner(
+        account_name,
+        account_key,
+        container,
+        bucket_secs=getattr(settings, "AZURE_URL_BUCKET_SECS", BUCKET_SECS),
+        max_entries=getattr(settings, "AZURE_SAS_CACHE_SIZE", CACHE_SIZE),
+    )
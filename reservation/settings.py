@@ -247,6 +247,9 @@ elif STORAGE_PROVIDER == 'azure':
 
     # SAS Token configuration for secure access
     AZURE_URL_EXPIRATION_SECS = int(os.getenv('AZURE_URL_EXPIRATION_SECS', '3600'))  # 1 hour default
+    # Signed URLs are shared within buckets of this many seconds (see reservation/sas.py)
+    AZURE_URL_BUCKET_SECS = int(os.getenv('AZURE_URL_BUCKET_SECS', '900'))
+    AZURE_SAS_CACHE_SIZE = int(os.getenv('AZURE_SAS_CACHE_SIZE', '4096'))
     AZURE_OVERWRITE_FILES = os.getenv('AZURE_OVERWRITE_FILES', 'False').lower() == 'true'
     
     # Django Storages Configuration for Azure using custom backends
@@ -262,6 +265,26 @@ elif STORAGE_PROVIDER == 'azure':
     # Media files configuration for Azure (SAS tokens will be generated dynamically)
     MEDIA_URL = f'https://{AZURE_ACCOUNT_NAME}.blob.core.windows.net/{AZURE_CONTAINER}/media/'
     
+elif STORAGE_PROVIDER == 'emulator':
+    # Local blob storage emulator with injected latency and failures
+    MEDIA_URL = '/media/'
+    MEDIA_ROOT = BASE_DIR / 'media'
+    STORAGES = {
+        'default': {
+            'BACKEND': 'reservation.emulated_storage.EmulatedBlobStorage',
+            'OPTIONS': {
+                # Empty STORAGE_EMULATOR_ROOT keeps the files in memory
+                'root': os.getenv('STORAGE_EMULATOR_ROOT', MEDIA_ROOT),
+                # Milliseconds or failure probability, e.g. "20" or "exists=20,save=40"
+                'latency': os.getenv('STORAGE_EMULATOR_LATENCY_MS', '0'),
+                'failure_rate': os.getenv('STORAGE_EMULATOR_FAILURE_RATE', '0'),
+            },
+        },
+        'staticfiles': {
+            'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+        },
+    }
+
 else:
     # Local File Storage Configuration
     STORAGES = {
@@ -309,5 +332,20 @@ LOGGING = {
     },
 }
 
+# In-memory availability engine (see room/availability.py)
+AVAILABILITY_ENGINE = os.getenv('AVAILABILITY_ENGINE', 'False').lower() == 'true'
+AVAILABILITY_HORIZON_DAYS = int(os.getenv('AVAILABILITY_HORIZON_DAYS', '730'))
+# Occupancy versions kept so that engines can catch up without a full rebuild
+OCCUPANCY_CHANGELOG_SIZE = int(os.getenv('OCCUPANCY_CHANGELOG_SIZE', '10000'))
+
+# Limits of the anonymous quote and availability searches
+STAY_MAX_PEOPLE = int(os.getenv('STAY_MAX_PEOPLE', '50'))
+STAY_MAX_NIGHTS = int(os.getenv('STAY_MAX_NIGHTS', '365'))
+
+# Image derivatives (thumbnails and WebP) generated after upload
+IMAGE_DERIVATIVE_WIDTHS = [320, 640, 1280]
+IMAGE_DERIVATIVES_ASYNC = os.getenv('IMAGE_DERIVATIVES_ASYNC', 'True').lower() == 'true'
+IMAGE_DERIVATIVE_WORKERS = int(os.getenv('IMAGE_DERIVATIVE_WORKERS', '2'))
+
 # Unsplash API Configuration
 UNSPLASH_ACCESS_KEY = os.getenv('UNSPLASH_ACCESS_KEY')
\ No newline at end of file
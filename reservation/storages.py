@@ -4,7 +4,9 @@ from django.conf import settings
 if hasattr(settings, 'AWS_STORAGE_BUCKET_NAME') and settings.AWS_STORAGE_BUCKET_NAME:
     from storages.backends.s3boto3 import S3Boto3Storage
 
-    class MediaStorage(S3Boto3Storage):
+    from .uploads import UniqueNameMixin
+
+    class MediaStorage(UniqueNameMixin, S3Boto3Storage):
         bucket_name = settings.AWS_STORAGE_BUCKET_NAME
         location = 'media'
         default_acl = None  # No ACLs - use bucket policy for public access
@@ -0,0 +1,80 @@
+"""
+Nombres de subida sin colisiones.
+
+Con la sobrescritura desactivada, Storage.get_available_name pregunta al
+almacenamiento si el nombre existe (una petición HEAD en Azure o S3) y
+repite con sufijos aleatorios mientras lo encuentre. UniqueUploadTo genera
+nombres `<directorio>/<uuid4>.<ext>`, que no pueden colisionar, y
+UniqueNameMixin los acepta sin consultar al almacenamiento, igual que los
+nombres por contenido de los derivados de imágenes (`<sha256>-<ancho>.<ext>`,
+ver reservation_app.derivatives); los demás nombres siguen el camino normal.
+"""
+
+import re
+import uuid
+from pathlib import PurePosixPath
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils.deconstruct import deconstructible
+
+UNIQUE_NAME = re.compile(r"(?:^|/)[0-9a-f]{32}(?:-[0-9]+)?(?:\.[0-9a-z]+)?$")
+
+
+@deconstructible
+class UniqueUploadTo:
+    """
+    upload_to que sustituye el nombre del archivo por un UUID.
+
+    Atributos:
+        directory (str): Directorio de destino, p. ej. "images".
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def __call__(self, instance, filename):
+        """
+        Args:
+            instance (Model): Objeto al que pertenece el archivo.
+            filename (str): Nombre original; solo se conserva la extensión.
+
+        Returns:
+            str: `<directorio>/<uuid4>.<ext>`.
+        """
+        extension = PurePosixPath(filename).suffix.lower()
+        if not re.fullmatch(r"\.[0-9a-z]+", extension):
+            extension = ""
+        return f"{self.directory}/{uuid.uuid4().hex}{extension}"
+
+    def __eq__(self, other):
+        return isinstance(other, UniqueUploadTo) and other.directory == self.directory
+
+
+def is_unique_name(name):
+    """
+    Indica si `name` es un nombre generado por UniqueUploadTo o un derivado.
+
+    Args:
+        name (str): Nombre del archivo en el almacenamiento.
+
+    Returns:
+        bool: True si el nombre acaba en un UUID o un hash (con ancho y
+            extensión opcionales).
+    """
+    return bool(UNIQUE_NAME.search(name))
+
+
+class UniqueNameMixin:
+    """
+    Mixin de almacenamiento que no comprueba la existencia de los nombres
+    generados por UniqueUploadTo.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        if not is_unique_name(name):
+            return super().get_available_name(name, max_length)
+        if max_length is not None and len(name) > max_length:
+            raise SuspiciousFileOperation(
+                f'Storage can not find an available filename for "{name}".'
+            )
+        return name
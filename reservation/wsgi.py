@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'reservation.settings')
 
 application = get_wsgi_application()
+
+# Build the in-memory availability engine before serving requests
+from django.conf import settings  # noqa: E402
+
+if settings.AVAILABILITY_ENGINE:
+    from room.availability import engine  # noqa: E402
+
+    engine.rebuild()
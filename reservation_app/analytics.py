@@ -0,0 +1,236 @@
+"""
+Exportación analítica en formato columnar (Parquet o Arrow IPC).
+
+Cada ejecución escribe, por tabla, un fichero nuevo con las filas
+modificadas desde la última marca de agua (updated_at) y un fichero con
+los ids vigentes, para que los análisis puedan descartar las filas
+borradas. Los ficheros solo se añaden: una fila modificada aparece de nuevo
+en exportaciones posteriores y la versión válida es la de mayor updated_at.
+
+Las filas se leen con un cursor del lado del servidor y se escriben por
+lotes, de modo que la memoria depende del tamaño del lote y no de la tabla.
+
+updated_at (auto_now) solo cambia al guardar con save(); los update() que
+no lo fijan no llegan a las exportaciones incrementales. Por eso ninguna
+columna exportada debe modificarse así: los que quedan tocan columnas que
+no se exportan (occupied_dates, en add_dates, remove_dates y la
+compactación) o tablas sin updated_at que no se exportan (Room e Image,
+en los derivados de imágenes). Un update() que cambie columnas exportadas
+debe fijar updated_at=Now().
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from django.db.models import F, Func
+from django.db.models.fields import DateField
+from django.utils import timezone
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from customer.models import Customer
+
+from .models import Reserve, RoomBooking
+
+BATCH_SIZE = 50000
+WATERMARK_FILE = "_watermark.json"
+# Margen para no perder filas de transacciones que confirman tarde
+OVERLAP = timedelta(minutes=5)
+
+
+def lower(field):
+    return Func(F(field), function="lower", output_field=DateField())
+
+
+def upper(field):
+    return Func(F(field), function="upper", output_field=DateField())
+
+
+def tables():
+    """
+    Tablas exportadas: consulta de filas y esquema Arrow de cada una.
+
+    Returns:
+        dict: nombre -> (QuerySet de diccionarios, esquema).
+    """
+    timestamp = pa.timestamp("us", tz="UTC")
+    return {
+        "reservations": (
+            Reserve.objects.values(
+                "id",
+                "user_id",
+                "customer_id",
+                "starting_date",
+                "end_date",
+                "nights",
+                "people",
+                "price",
+                "paid",
+                "updated_at",
+            ),
+            pa.schema(
+                [
+                    ("id", pa.int64()),
+                    ("user_id", pa.int64()),
+                    ("customer_id", pa.int64()),
+                    ("starting_date", pa.date32()),
+                    ("end_date", pa.date32()),
+                    ("nights", pa.int32()),
+                    ("people", pa.int32()),
+                    ("price", pa.float64()),
+                    ("paid", pa.bool_()),
+                    ("updated_at", timestamp),
+                ]
+            ),
+        ),
+        "room_assignments": (
+            RoomBooking.objects.annotate(
+                room_number=F("room__number"),
+                room_price=F("room__price"),
+                starting_date=lower("period"),
+                end_date=upper("period"),
+            ).values(
+                "id",
+                "reserve_id",
+                "room_id",
+                "room_number",
+                "room_price",
+                "starting_date",
+                "end_date",
+                "updated_at",
+            ),
+            pa.schema(
+                [
+                    ("id", pa.int64()),
+                    ("reserve_id", pa.int64()),
+                    ("room_id", pa.int64()),
+                    ("room_number", pa.int32()),
+                    ("room_price", pa.float64()),
+                    ("starting_date", pa.date32()),
+                    ("end_date", pa.date32()),
+                    ("updated_at", timestamp),
+                ]
+            ),
+        ),
+        # El número de tarjeta no se exporta
+        "customers": (
+            Customer.objects.values(
+                "id", "name", "last_name", "email", "phone", "address", "updated_at"
+            ),
+            pa.schema(
+                [
+                    ("id", pa.int64()),
+                    ("name", pa.string()),
+                    ("last_name", pa.string()),
+                    ("email", pa.string()),
+                    ("phone", pa.string()),
+                    ("address", pa.string()),
+                    ("updated_at", timestamp),
+                ]
+            ),
+        ),
+    }
+
+
+def open_writer(path, schema, output):
+    """Abre un escritor Parquet o Arrow IPC para `path`."""
+    if output == "parquet":
+        return pq.ParquetWriter(path, schema, compression="zstd")
+    return pa.ipc.new_file(path, schema)
+
+
+def write_batches(rows, schema, path, output, batch_size=BATCH_SIZE):
+    """
+    Escribe filas por lotes en un fichero columnar.
+
+    Args:
+        rows (iterable): Diccionarios con las columnas del esquema.
+        schema (Schema): Esquema Arrow.
+        path (Path): Fichero de salida.
+        output (str): "parquet" o "arrow".
+        batch_size (int): Filas por lote.
+
+    Returns:
+        int: Número de filas escritas.
+    """
+    count = 0
+    batch = []
+    with open_writer(path, schema, output) as writer:
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch or not count:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+def read_watermarks(directory):
+    """
+    Lee las marcas de agua de la exportación anterior.
+
+    Returns:
+        dict: nombre de tabla -> datetime de la última exportación.
+    """
+    path = directory / WATERMARK_FILE
+    if not path.exists():
+        return {}
+    with open(path) as watermark_file:
+        data = json.load(watermark_file)
+    return {table: datetime.fromisoformat(value) for table, value in data.items()}
+
+
+def write_watermarks(directory, watermarks):
+    """Guarda las marcas de agua de esta exportación."""
+    with open(directory / WATERMARK_FILE, "w") as watermark_file:
+        json.dump({table: value.isoformat() for table, value in watermarks.items()}, watermark_file)
+
+
+def export(directory, output="parquet", full=False, batch_size=BATCH_SIZE):
+    """
+    Exporta las filas modificadas desde la última ejecución.
+
+    Para cada tabla escribe `<tabla>/<marca>.<ext>` con las filas cuyo
+    updated_at es posterior a la marca anterior (menos OVERLAP) y
+    `<tabla>/<marca>.ids.<ext>` con todos los ids vigentes.
+
+    Args:
+        directory (Path): Directorio de salida.
+        output (str): "parquet" o "arrow".
+        full (bool): Si es True, ignora las marcas y exporta todo.
+        batch_size (int): Filas por lote.
+
+    Returns:
+        dict: nombre de tabla -> número de filas exportadas.
+    """
+    extension = "parquet" if output == "parquet" else "arrow"
+    watermarks = {} if full else read_watermarks(directory)
+    started = timezone.now()
+    stamp = started.strftime("%Y%m%dT%H%M%S%f")
+    exported = {}
+    for table, (queryset, schema) in tables().items():
+        table_directory = directory / table
+        table_directory.mkdir(parents=True, exist_ok=True)
+        changed = queryset.filter(updated_at__lte=started)
+        if table in watermarks:
+            changed = changed.filter(updated_at__gt=watermarks[table] - OVERLAP)
+        exported[table] = write_batches(
+            changed.order_by("updated_at", "id").iterator(chunk_size=batch_size),
+            schema,
+            table_directory / f"{stamp}.{extension}",
+            output,
+            batch_size,
+        )
+        write_batches(
+            queryset.order_by("id").values("id").iterator(chunk_size=batch_size),
+            pa.schema([("id", pa.int64())]),
+            table_directory / f"{stamp}.ids.{extension}",
+            output,
+            batch_size,
+        )
+    write_watermarks(directory, {table: started for table in exported})
+    return exported
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ReservationAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reservation_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
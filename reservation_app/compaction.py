@@ -0,0 +1,73 @@
+"""
+Compactación de las fechas pasadas de occupied_dates.
+
+Room.occupied_dates y Reserve.occupied_dates solo crecen: cada reserva
+añade sus noches y nunca se quitan las que ya han pasado. La disponibilidad
+se resuelve con RoomBooking, así que las fechas pasadas no se usan y solo
+ensanchan las filas.
+
+La compactación recorre las filas con fechas anteriores al corte por lotes
+en orden de id. Cada lote se actualiza en su propia transacción con un
+UPDATE que filtra el array en la base de datos, de modo que las filas solo
+quedan bloqueadas mientras se procesa su lote.
+"""
+
+from django.contrib.postgres.fields import ArrayField
+from django.db import transaction
+from django.db.models import BooleanField, DateField, F, Func, IntegerField, Sum
+from django.db.models.expressions import RawSQL
+
+BATCH_SIZE = 1000
+
+
+def dates_from(cutoff):
+    """
+    Expresión con occupied_dates sin las fechas anteriores a `cutoff`.
+
+    Args:
+        cutoff (date): Primera fecha que se conserva.
+
+    Returns:
+        RawSQL: Expresión para usar en update().
+    """
+    return RawSQL(
+        "ARRAY(SELECT day FROM unnest(occupied_dates) WITH ORDINALITY AS dates(day, position)"
+        " WHERE day >= %s ORDER BY position)",
+        [cutoff],
+        output_field=ArrayField(DateField()),
+    )
+
+
+def column_size():
+    """Tamaño en bytes de occupied_dates en la fila (pg_column_size)."""
+    return Func(F("occupied_dates"), function="pg_column_size", output_field=IntegerField())
+
+
+def compact(queryset, cutoff, batch_size=BATCH_SIZE):
+    """
+    Quita de occupied_dates las fechas anteriores a `cutoff`.
+
+    Args:
+        queryset (QuerySet): Filas a compactar (Room o Reserve).
+        cutoff (date): Primera fecha que se conserva.
+        batch_size (int): Filas por lote.
+
+    Yields:
+        tuple: (filas actualizadas, bytes liberados) de cada lote.
+    """
+    stale = queryset.alias(
+        stale=RawSQL("%s > ANY(occupied_dates)", [cutoff], output_field=BooleanField())
+    ).filter(stale=True)
+    last = None
+    while True:
+        pending = stale if last is None else stale.filter(pk__gt=last)
+        ids = list(pending.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return
+        last = ids[-1]
+        with transaction.atomic():
+            batch = queryset.model._base_manager.filter(pk__in=ids)
+            before = batch.aggregate(size=Sum(column_size()))["size"]
+            rows = batch.update(occupied_dates=dates_from(cutoff))
+            after = batch.aggregate(size=Sum(column_size()))["size"]
+        yield rows, before - after
@@ -0,0 +1,212 @@
+"""
+Derivados de las imágenes subidas: miniaturas JPEG y versiones WebP.
+
+Las fotos de las habitaciones (Room.photo) y los documentos de identidad
+(Image.image) se sirven a su tamaño original. Al subirlos, generate crea
+una versión JPEG y otra WebP para cada ancho de IMAGE_DERIVATIVE_WIDTHS
+menor que el original y guarda sus nombres en el campo JSON del modelo
+(Room.photo_derivatives, Image.derivatives), que las plantillas usan para
+construir srcset (ver templatetags/image_tags.py).
+
+Los nombres dependen del contenido (`<directorio>/derivatives/<sha256>-<ancho>.<ext>`):
+una imagen repetida, como la foto por defecto, se procesa una sola vez.
+
+El trabajo pesado no ocupa la petición: schedule lo encarga a un
+ThreadPoolExecutor cuando se confirma la transacción, y el resultado se
+guarda con un UPDATE condicionado a que el archivo no haya cambiado.
+"""
+
+import hashlib
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connection, transaction
+from PIL import Image as PILImage
+from PIL import ImageOps
+
+from room.models import Room
+
+from .models import Image
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = (320, 640, 1280)
+FORMATS = {
+    "jpeg": ("jpg", {"quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("webp", {"quality": 80, "method": 4}),
+}
+WORKERS = 2
+# Modelo, campo de la imagen y campo JSON de sus derivados
+TARGETS = (
+    (Room, "photo", "photo_derivatives"),
+    (Image, "image", "derivatives"),
+)
+
+_executor = None
+
+
+def executor():
+    """ThreadPoolExecutor compartido, creado al primer uso"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "IMAGE_DERIVATIVE_WORKERS", WORKERS),
+            thread_name_prefix="image-derivatives",
+        )
+    return _executor
+
+
+def derivative_name(source, digest, width, extension):
+    """
+    Nombre de un derivado, a partir del contenido del original.
+
+    Args:
+        source (str): Nombre del archivo original, p. ej. "rooms/<uuid>.jpg".
+        digest (str): SHA-256 del contenido del original.
+        width (int): Ancho del derivado.
+        extension (str): Extensión del formato.
+
+    Returns:
+        str: `<directorio>/derivatives/<sha256>-<ancho>.<ext>`.
+    """
+    directory = posixpath.dirname(source)
+    return posixpath.join(directory, "derivatives", f"{digest[:32]}-{width}.{extension}")
+
+
+def encode(image, width, image_format, options):
+    """Redimensiona una copia de la imagen al ancho dado y la codifica"""
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), PILImage.Resampling.LANCZOS)
+    if image_format == "jpeg" and resized.mode != "RGB":
+        resized = resized.convert("RGB")
+    buffer = io.BytesIO()
+    resized.save(buffer, image_format.upper(), **options)
+    return buffer.getvalue()
+
+
+def generate(field_file, widths=None):
+    """
+    Genera los derivados de un archivo de imagen que aún no existan.
+
+    Args:
+        field_file (FieldFile): Archivo original.
+        widths (iterable): Anchos a generar (por defecto, IMAGE_DERIVATIVE_WIDTHS).
+
+    Returns:
+        dict: {"source": nombre del original, "width": ancho del original,
+            "jpeg": [[ancho, nombre], ...], "webp": [[ancho, nombre], ...]}.
+    """
+    if widths is None:
+        widths = getattr(settings, "IMAGE_DERIVATIVE_WIDTHS", WIDTHS)
+    storage = field_file.storage
+    with storage.open(field_file.name) as original:
+        content = original.read()
+    digest = hashlib.sha256(content).hexdigest()
+    with PILImage.open(io.BytesIO(content)) as opened:
+        image = ImageOps.exif_transpose(opened)
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    # Nunca se amplía: si el original es más estrecho, se usa su ancho
+    sizes = sorted({width for width in widths if width < image.width}) or [image.width]
+    derivatives = {"source": field_file.name, "width": image.width}
+    for image_format, (extension, options) in FORMATS.items():
+        derivatives[image_format] = []
+        for width in sizes:
+            name = derivative_name(field_file.name, digest, width, extension)
+            if not storage.exists(name):
+                name = storage.save(name, ContentFile(encode(image, width, image_format, options)))
+            derivatives[image_format].append([width, name])
+    return derivatives
+
+
+def process(model, pk, file_field, derivatives_field):
+    """
+    Genera los derivados de un objeto y los guarda sin emitir señales.
+
+    Si el archivo cambia mientras tanto, el UPDATE no afecta a ninguna fila
+    y el nuevo archivo tendrá su propia tarea.
+
+    Args:
+        model (Model): Clase del modelo.
+        pk (int): Clave primaria del objeto.
+        file_field (str): Campo con la imagen original.
+        derivatives_field (str): Campo JSON donde guardar los derivados.
+
+    Returns:
+        bool: True si se generaron los derivados.
+    """
+    try:
+        instance = model._default_manager.filter(pk=pk).only(file_field).first()
+        field_file = getattr(instance, file_field, None)
+        if not field_file:
+            return False
+        derivatives = generate(field_file)
+        model._default_manager.filter(pk=pk, **{file_field: field_file.name}).update(
+            **{derivatives_field: derivatives}
+        )
+        return True
+    except Exception:
+        logger.exception(f"Error generating derivatives for {model.__name__} {pk}")
+        return False
+
+
+def process_in_worker(*args):
+    """process() en un hilo del executor, con su propia conexión"""
+    close_old_connections()
+    try:
+        return process(*args)
+    finally:
+        connection.close()
+
+
+def schedule(instance, file_field, derivatives_field):
+    """
+    Encarga los derivados de un objeto al confirmarse la transacción.
+
+    Con IMAGE_DERIVATIVES_ASYNC = False se generan en el mismo hilo, lo que
+    conviene en las pruebas.
+
+    Args:
+        instance (Model): Objeto con la imagen.
+        file_field (str): Campo con la imagen original.
+        derivatives_field (str): Campo JSON donde guardar los derivados.
+    """
+    args = (type(instance), instance.pk, file_field, derivatives_field)
+
+    def submit():
+        if getattr(settings, "IMAGE_DERIVATIVES_ASYNC", True):
+            executor().submit(process_in_worker, *args)
+        else:
+            process(*args)
+
+    transaction.on_commit(submit)
+
+
+def is_stale(instance, file_field, derivatives_field, include_default=False):
+    """
+    Indica si los derivados guardados no corresponden al archivo actual.
+
+    El archivo por defecto del campo (la foto genérica de las habitaciones)
+    no cuenta como subida: sus derivados los crea generate_image_derivatives.
+
+    Args:
+        instance (Model): Objeto con la imagen.
+        file_field (str): Campo con la imagen original.
+        derivatives_field (str): Campo JSON con los derivados.
+        include_default (bool): Tener en cuenta también el archivo por defecto.
+
+    Returns:
+        bool: True si hay archivo y sus derivados faltan o son de otro.
+    """
+    field_file = getattr(instance, file_field)
+    if not field_file:
+        return False
+    if not include_default and field_file.name == instance._meta.get_field(file_field).default:
+        return False
+    derivatives = getattr(instance, derivatives_field) or {}
+    return derivatives.get("source") != field_file.name
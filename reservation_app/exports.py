@@ -0,0 +1,159 @@
+"""
+Exportación de reservas y clientes en CSV o NDJSON.
+
+Las filas se leen con QuerySet.iterator(), que en PostgreSQL usa un cursor
+del lado del servidor y trae los resultados por bloques, y se escriben
+línea a línea. Así la memoria no depende del número de filas, tanto al
+responder con StreamingHttpResponse como desde el comando export_data.
+"""
+
+import csv
+import json
+
+from django.contrib.postgres.expressions import ArraySubquery
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import OuterRef
+
+from room.models import Room
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+RESERVATION_FIELDS = (
+    "id",
+    "customer_id",
+    "customer__name",
+    "customer__last_name",
+    "starting_date",
+    "end_date",
+    "nights",
+    "people",
+    "price",
+    "paid",
+    "room_numbers",
+)
+# El número de tarjeta no se exporta
+CUSTOMER_FIELDS = ("id", "name", "last_name", "email", "phone", "address")
+# Caracteres con los que una hoja de cálculo interpreta una celda como fórmula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class Echo:
+    """Objeto con write() que devuelve lo escrito, para usar csv.writer al vuelo."""
+
+    def write(self, value):
+        return value
+
+
+def reservation_rows(reservations):
+    """
+    Filas exportables de las reservas, con los números de sus habitaciones.
+
+    Las habitaciones se obtienen con una subconsulta por fila en lugar de
+    un GROUP BY, para que PostgreSQL pueda enviar filas desde el principio.
+
+    Args:
+        reservations (QuerySet): Reservas ya filtradas.
+
+    Returns:
+        iterator: Diccionarios con RESERVATION_FIELDS.
+    """
+    return (
+        reservations.annotate(
+            room_numbers=ArraySubquery(
+                Room.objects.filter(bookings__reserve=OuterRef("pk"))
+                .order_by("number")
+                .values("number")
+            )
+        )
+        .order_by("id")
+        .values(*RESERVATION_FIELDS)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def customer_rows(customers):
+    """
+    Filas exportables de los clientes.
+
+    Args:
+        customers (QuerySet): Clientes a exportar.
+
+    Returns:
+        iterator: Diccionarios con CUSTOMER_FIELDS.
+    """
+    return customers.order_by("id").values(*CUSTOMER_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+
+def csv_cell(value):
+    """
+    Valor de una celda CSV que no se interpreta como fórmula al abrirlo.
+
+    Los textos que empiezan por FORMULA_PREFIXES (p. ej. un nombre de
+    cliente "=HYPERLINK(...)") se prefijan con una comilla simple; los
+    números, negativos incluidos, se dejan tal cual.
+
+    Args:
+        value: Valor de la columna.
+
+    Returns:
+        Valor a escribir en la celda.
+    """
+    if isinstance(value, list):
+        # Las listas (números de habitación) van en una sola celda
+        value = " ".join(map(str, value))
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(rows, fields):
+    """
+    Convierte filas en líneas CSV, empezando por la cabecera.
+
+    Args:
+        rows (iterable): Diccionarios con las columnas.
+        fields (tuple): Columnas en orden.
+
+    Yields:
+        str: Una línea CSV.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([csv_cell(row[field]) for field in fields])
+
+
+def ndjson_lines(rows, fields):
+    """
+    Convierte filas en líneas JSON (un objeto por línea).
+
+    Args:
+        rows (iterable): Diccionarios con las columnas.
+        fields (tuple): Columnas (no se usan; se mantiene la firma de csv_lines).
+
+    Yields:
+        str: Una línea JSON terminada en salto de línea.
+    """
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def export_lines(rows, fields, output):
+    """
+    Genera las líneas de una exportación en el formato pedido.
+
+    Args:
+        rows (iterable): Diccionarios con las columnas.
+        fields (tuple): Columnas en orden.
+        output (str): "csv" o "ndjson".
+
+    Returns:
+        iterator: Líneas de texto.
+    """
+    if output == "ndjson":
+        return ndjson_lines(rows, fields)
+    return csv_lines(rows, fields)
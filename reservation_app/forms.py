@@ -1,6 +1,14 @@
 from datetime import datetime
 from django import forms
+from django.conf import settings
+from django.core.validators import MaxValueValidator
+from django.contrib.postgres.search import SearchRank
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+
+from customer.models import search_query
 from .models import Reserve, Image
+from .solver import FEWEST_ROOMS, LOWEST_PRICE
 
 
 class ReservationForm(forms.ModelForm):
@@ -32,6 +40,154 @@ class ReservationForm(forms.ModelForm):
         return end_date
 
 
+class StayForm(ReservationForm):
+    """
+    Estancia de las búsquedas anónimas (presupuesto y disponibilidad).
+
+    El número de personas y de noches está acotado por STAY_MAX_PEOPLE y
+    STAY_MAX_NIGHTS: el reparto en habitaciones (solver.py) crece con el
+    número de personas y el desglose del presupuesto con el de noches.
+    """
+
+    objective = forms.ChoiceField(
+        choices=((FEWEST_ROOMS, "Menos habitaciones"), (LOWEST_PRICE, "Menor precio")),
+        required=False,
+    )
+
+    class Meta(ReservationForm.Meta):
+        fields = ("starting_date", "end_date", "people")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        people = self.fields["people"]
+        people.max_value = settings.STAY_MAX_PEOPLE
+        people.validators.append(MaxValueValidator(people.max_value))
+        people.widget.attrs["max"] = people.max_value
+
+    def clean_people(self):
+        people = self.cleaned_data.get("people")
+        if people < 1:
+            self.add_error("people", "Debe haber al menos una persona.")
+        return people
+
+    def clean_objective(self):
+        return self.cleaned_data.get("objective") or FEWEST_ROOMS
+
+    def clean_end_date(self):
+        # Las fechas se comparan en clean(), cuando ambas son válidas
+        return self.cleaned_data.get("end_date")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        starting_date = cleaned_data.get("starting_date")
+        end_date = cleaned_data.get("end_date")
+        if starting_date and end_date:
+            if end_date <= starting_date:
+                self.add_error("end_date", "La fecha de fin debe ser posterior a la fecha de inicio.")
+            elif (end_date - starting_date).days > settings.STAY_MAX_NIGHTS:
+                self.add_error(
+                    "end_date", f"La estancia no puede superar {settings.STAY_MAX_NIGHTS} noches."
+                )
+        return cleaned_data
+
+
+class QuoteForm(StayForm):
+    room = forms.IntegerField(required=False, min_value=1)
+
+
+class AvailabilityForm(StayForm):
+    page = forms.IntegerField(required=False, min_value=1)
+    page_size = forms.IntegerField(required=False, min_value=1, max_value=100)
+
+
+class ReservationFilterForm(forms.Form):
+    """
+    Filtros del listado de reservas, compartidos por show_reservations, la
+    exportación y el comando export_data.
+    """
+
+    ARRIVALS = "arrivals"
+    DEPARTURES = "departures"
+    IN_HOUSE = "in_house"
+
+    search = forms.CharField(required=False)
+    start_date = forms.DateField(required=False)
+    payment_status = forms.ChoiceField(
+        choices=(("", "Todos"), ("paid", "Pagado"), ("unpaid", "Pendiente de pago")),
+        required=False,
+    )
+    stay = forms.ChoiceField(
+        choices=(
+            (IN_HOUSE, "Alojados"),
+            (ARRIVALS, "Llegadas"),
+            (DEPARTURES, "Salidas"),
+        ),
+        required=False,
+    )
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get("date_from")
+        date_to = cleaned_data.get("date_to")
+        if date_from and date_to and date_to < date_from:
+            self.add_error("date_to", "La fecha final debe ser igual o posterior a la inicial.")
+        return cleaned_data
+
+    def filter(self, reservations):
+        """
+        Aplica los filtros válidos a las reservas.
+
+        La búsqueda usa el índice de texto completo de Customer y anota la
+        relevancia en `rank`. El filtro por fechas devuelve llegadas, salidas
+        o alojados entre date_from y date_to (por defecto, alojados).
+
+        Args:
+            reservations (QuerySet): Reservas a filtrar.
+
+        Returns:
+            QuerySet: Reservas filtradas.
+        """
+        data = self.cleaned_data if hasattr(self, "cleaned_data") else {}
+        search = data.get("search")
+        if search:
+            query = search_query(search)
+            if query is None:
+                return reservations.none()
+            reservations = reservations.filter(customer__search_vector=query).annotate(
+                # En double precision, como Customer.objects.search (ver customer.models)
+                rank=Cast(SearchRank(F("customer__search_vector"), query), FloatField())
+            )
+        if data.get("start_date"):
+            reservations = reservations.filter(starting_date=data["start_date"])
+        if data.get("payment_status"):
+            reservations = reservations.filter(paid=data["payment_status"] == "paid")
+
+        date_from = data.get("date_from")
+        if not date_from or "date_to" in self.errors:
+            return reservations
+        date_to = data.get("date_to") or date_from
+        stay = data.get("stay") or self.IN_HOUSE
+        if stay == self.ARRIVALS:
+            return reservations.arriving(date_from, date_to)
+        if stay == self.DEPARTURES:
+            return reservations.departing(date_from, date_to)
+        return reservations.in_house(date_from, date_to)
+
+    def ordering(self):
+        """
+        Clave de ordenación del listado: por relevancia si hay búsqueda.
+
+        Returns:
+            list: Campos de la clave para reservation_app.pagination.
+        """
+        data = self.cleaned_data if hasattr(self, "cleaned_data") else {}
+        if data.get("search") and search_query(data["search"]) is not None:
+            return ["-rank", "-starting_date", "id"]
+        return ["-starting_date", "id"]
+
+
 class ImageForm(forms.ModelForm):
     class Meta:
         model = Image
@@ -0,0 +1,53 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from reservation_app.solver import FEWEST_ROOMS, LOWEST_PRICE, solve
+
+
+class Command(BaseCommand):
+    help = "Mide la latencia del solver de asignación de habitaciones"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[10, 100, 1000, 10000],
+            help="Números de habitaciones libres a probar",
+        )
+        parser.add_argument(
+            "--people",
+            type=int,
+            nargs="+",
+            default=[2, 8, 30],
+            help="Números de personas a alojar",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=50,
+            help="Repeticiones por medición",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'habitaciones':>12} {'personas':>9} {'habitaciones (ms)':>18} {'precio (ms)':>12}")
+        for size in options["sizes"]:
+            rooms = [
+                (i, random.randint(1, 6), float(random.randint(20, 200)))
+                for i in range(size)
+            ]
+            for people in options["people"]:
+                timings = {}
+                for objective in (FEWEST_ROOMS, LOWEST_PRICE):
+                    samples = []
+                    for _ in range(options["repeat"]):
+                        start = time.perf_counter()
+                        solve(rooms, people, objective)
+                        samples.append((time.perf_counter() - start) * 1000)
+                    timings[objective] = statistics.median(samples)
+                self.stdout.write(
+                    f"{size:>12} {people:>9} {timings[FEWEST_ROOMS]:>18.3f} {timings[LOWEST_PRICE]:>12.3f}"
+                )
@@ -0,0 +1,135 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.backends.postgresql.psycopg_any import DateRange
+
+from customer.models import Customer
+from reservation_app.models import Reserve, Room, RoomBooking
+from room.availability import AvailabilityEngine
+
+
+class Command(BaseCommand):
+    help = "Mide la latencia de la búsqueda de habitaciones libres según el número de habitaciones"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[10, 100, 1000, 10000],
+            help="Números de habitaciones a probar",
+        )
+        parser.add_argument(
+            "--stays",
+            type=int,
+            default=12,
+            help="Estancias reservadas por habitación en el próximo año",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Repeticiones por medición",
+        )
+
+    def measure(self, func, repeat):
+        """Devuelve la mediana en milisegundos de `repeat` ejecuciones"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def legacy_free_rooms(self, reservation):
+        """Implementación anterior: intersección de conjuntos en Python"""
+        return [
+            room
+            for room in Room.objects.with_occupied_dates()
+            if not set(reservation.occupied_dates).intersection(set(room.occupied_dates))
+        ]
+
+    def populate(self, size, stays):
+        """Crea `size` habitaciones con `stays` estancias aleatorias cada una"""
+        user = User.objects.create(username="benchmark_availability")
+        customer = Customer.objects.create(user=user, name="Benchmark")
+        today = date.today()
+        reserves = Reserve.objects.bulk_create(
+            [
+                Reserve(
+                    user=user,
+                    customer=customer,
+                    starting_date=today,
+                    nights=1,
+                    end_date=today + timedelta(days=1),
+                    people=1,
+                )
+                for _ in range(stays)
+            ]
+        )
+        rooms = Room.objects.bulk_create(
+            [
+                Room(number=i + 1, price=random.randint(20, 100), capacity=random.randint(2, 4))
+                for i in range(size)
+            ],
+            batch_size=1000,
+        )
+        # Cada estancia cae en su propio tramo del año para no solaparse
+        segment = 365 // stays
+        bookings = []
+        for room in rooms:
+            for i, reserve in enumerate(reserves):
+                start = today + timedelta(days=i * segment + random.randint(0, segment - 8))
+                end = start + timedelta(days=random.randint(1, 7))
+                bookings.append(RoomBooking(reserve=reserve, room=room, period=DateRange(start, end)))
+                room.occupied_dates.extend(
+                    start + timedelta(days=n) for n in range((end - start).days)
+                )
+        RoomBooking.objects.bulk_create(bookings, batch_size=5000)
+        Room.objects.bulk_update(rooms, ["occupied_dates"], batch_size=1000)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Room._meta.db_table}")
+            cursor.execute(f"ANALYZE {RoomBooking._meta.db_table}")
+
+    def handle(self, *args, **options):
+        starting_date = date.today() + timedelta(days=30)
+        reservation = Reserve(
+            starting_date=starting_date,
+            nights=3,
+            end_date=starting_date + timedelta(days=3),
+        )
+        reservation.occupied_dates = reservation.compute_occupied_dates()
+
+        self.stdout.write(
+            f"{'habitaciones':>12} {'consulta (ms)':>14} {'motor (ms)':>11} "
+            f"{'carga motor (ms)':>17} {'anterior (ms)':>14}"
+        )
+        for size in options["sizes"]:
+            # Todo se deshace al salir: la base de datos queda intacta
+            with transaction.atomic():
+                Room.objects.all().delete()
+                self.populate(size, options["stays"])
+                query_ms = self.measure(
+                    lambda: list(reservation.find_free_rooms().values_list("id", "capacity")),
+                    options["repeat"],
+                )
+                engine = AvailabilityEngine()
+                build_ms = self.measure(engine.rebuild, 1)
+                engine_ms = self.measure(
+                    lambda: engine.free_rooms(reservation.starting_date, reservation.end_date),
+                    options["repeat"],
+                )
+                legacy_ms = self.measure(
+                    lambda: self.legacy_free_rooms(reservation),
+                    max(1, options["repeat"] // 4),
+                )
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f"{size:>12} {query_ms:>14.2f} {engine_ms:>11.2f} "
+                f"{build_ms:>17.2f} {legacy_ms:>14.2f}"
+            )
@@ -0,0 +1,89 @@
+import re
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from customer.models import Customer
+from reservation_app import partitions
+from reservation_app.models import Reserve
+
+
+class Command(BaseCommand):
+    help = "Muestra los planes de los filtros por fechas de reservas sobre una tabla grande"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=1000000,
+            help="Número de reservas a generar",
+        )
+
+    def populate(self, rows):
+        """Crea `rows` reservas repartidas en diez años hasta el año próximo, un 10% sin pagar"""
+        user = User.objects.create(username="benchmark_reservation_filters")
+        customer = Customer.objects.create(user=user, name="Benchmark")
+        first_day = date.today() - timedelta(days=3285)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Reserve._meta.db_table}
+                    (user_id, customer_id, starting_date, nights, end_date, people, price, paid,
+                     occupied_dates, updated_at)
+                SELECT %s, %s, start, nights, start + nights, 2, 100, random() > 0.1, '{{}}', now()
+                FROM (
+                    SELECT %s::date + (random() * 3650)::int AS start,
+                           1 + (random() * 6)::int AS nights
+                    FROM generate_series(1, %s)
+                ) AS stays
+                """,
+                [user.id, customer.id, first_day, rows],
+            )
+        return user
+
+    def explain(self, label, queryset):
+        """Muestra el nodo principal del plan, las particiones leídas y el tiempo de ejecución"""
+        plan = queryset.explain(analyze=True)
+        node = plan.splitlines()[0].split("  (")[0]
+        elapsed = re.search(r"Execution Time: ([\d.]+) ms", plan).group(1)
+        scanned = len(set(re.findall(rf" on ({Reserve._meta.db_table}_\w+) ", plan)))
+        self.stdout.write(f"{label:<26} {elapsed:>9} ms  {scanned:>2} particiones  {node}")
+
+    def handle(self, *args, **options):
+        user = self.populate(options["rows"])
+        try:
+            # Mueve las reservas de la partición por defecto a particiones anuales
+            partitions.create_partitions()
+            with connection.cursor() as cursor:
+                cursor.execute(f"VACUUM ANALYZE {Reserve._meta.db_table}")
+            today = date.today()
+            week = today + timedelta(days=7)
+            reserves = Reserve.objects.all()
+            self.explain(
+                "alojados hoy",
+                reserves.in_house(today).values_list("starting_date", "end_date"),
+            )
+            self.explain(
+                "alojados próxima semana",
+                reserves.in_house(today, week).values_list("starting_date", "end_date"),
+            )
+            self.explain(
+                "llegadas próxima semana",
+                reserves.arriving(today, week).values_list("starting_date"),
+            )
+            self.explain(
+                "salidas próxima semana",
+                reserves.departing(today, week).values_list("end_date", "starting_date"),
+            )
+            self.explain(
+                "sin pagar alojados hoy",
+                reserves.filter(paid=False).in_house(today).values_list("starting_date", "end_date"),
+            )
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {Reserve._meta.db_table} WHERE user_id = %s", [user.id]
+                )
+            user.delete()
@@ -0,0 +1,112 @@
+import base64
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from azure.storage.blob import BlobSasPermissions, generate_blob_sas
+from django.core.management.base import BaseCommand
+
+from reservation import sas
+from reservation.azure_storage_backends import AzureMediaStorage
+
+ACCOUNT_NAME = "benchmark"
+ACCOUNT_KEY = base64.b64encode(b"benchmark-account-key").decode()
+CONTAINER = "media"
+
+
+class Command(BaseCommand):
+    help = "Cuenta las firmas SAS por página de reservas con y sin la caché de firmas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reservations",
+            type=int,
+            default=20,
+            help="Reservas por página",
+        )
+        parser.add_argument(
+            "--rooms",
+            type=int,
+            default=3,
+            help="Habitaciones (tarjetas con foto) por reserva",
+        )
+        parser.add_argument(
+            "--photos",
+            type=int,
+            default=15,
+            help="Fotos distintas entre las que se reparten las tarjetas",
+        )
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=50,
+            help="Páginas servidas por variante",
+        )
+
+    def legacy_url(self, storage, name, counter):
+        """Implementación anterior de AzureMediaStorage.url: una firma por llamada"""
+        counter[0] += 1
+        sas_token = generate_blob_sas(
+            account_name=storage.account_name,
+            account_key=storage.account_key,
+            container_name=storage.azure_container,
+            blob_name=f"{storage.location}/{name}",
+            permission=BlobSasPermissions(read=True),
+            expiry=datetime.utcnow() + timedelta(seconds=storage.expiration_secs),
+        )
+        blob_url = f"https://{storage.account_name}.blob.core.windows.net/{storage.azure_container}/{storage.location}/{name}"
+        return f"{blob_url}?{sas_token}"
+
+    def serve(self, url, cards, pages):
+        """Sirve `pages` páginas; devuelve firmas por página, URLs distintas y ms por página"""
+        timings = []
+        signatures = []
+        urls = set()
+        for _ in range(pages):
+            before = url.signatures()
+            start = time.perf_counter()
+            urls.update(url(name) for name in cards)
+            timings.append((time.perf_counter() - start) * 1000)
+            signatures.append(url.signatures() - before)
+        return signatures, len(urls), statistics.median(timings)
+
+    def handle(self, *args, **options):
+        storage = AzureMediaStorage(
+            account_name=ACCOUNT_NAME, account_key=ACCOUNT_KEY, azure_container=CONTAINER
+        )
+        photos = ["rooms/default.jpg"] + [f"rooms/room_{i}.jpg" for i in range(1, options["photos"])]
+        cards = [
+            random.choice(photos)
+            for _ in range(options["reservations"] * options["rooms"])
+        ]
+
+        counter = [0]
+
+        def legacy(name):
+            return self.legacy_url(storage, name, counter)
+
+        legacy.signatures = lambda: counter[0]
+
+        signer = sas.signer(ACCOUNT_NAME, ACCOUNT_KEY, CONTAINER)
+        signer.clear()
+
+        def cached(name):
+            return storage.url(name)
+
+        cached.signatures = lambda: signer.signatures
+
+        self.stdout.write(
+            f"{len(cards)} fotos por página, {len(set(cards))} distintas, "
+            f"{options['pages']} páginas"
+        )
+        self.stdout.write(
+            f"{'variante':>9} {'firmas 1ª página':>17} {'firmas/página':>14} "
+            f"{'URLs distintas':>15} {'ms/página':>10}"
+        )
+        for label, url in (("antes", legacy), ("después", cached)):
+            signatures, distinct, elapsed = self.serve(url, cards, options["pages"])
+            self.stdout.write(
+                f"{label:>9} {signatures[0]:>17} {statistics.mean(signatures):>14.2f} "
+                f"{distinct:>15} {elapsed:>10.2f}"
+            )
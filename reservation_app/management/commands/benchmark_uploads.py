@@ -0,0 +1,55 @@
+import statistics
+import time
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+
+from reservation.emulated_storage import EmulatedBlobStorage
+from reservation.uploads import UniqueUploadTo
+
+
+class Command(BaseCommand):
+    help = "Mide la latencia de subir imágenes con nombres fijos y con nombres únicos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--uploads",
+            type=int,
+            default=50,
+            help="Imágenes subidas por variante",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=20,
+            help="Latencia simulada por petición al almacenamiento (ms)",
+        )
+
+    def upload(self, storage, names):
+        """Sube un archivo por nombre; devuelve peticiones por subida y mediana en ms"""
+        timings = []
+        for name in names:
+            start = time.perf_counter()
+            storage.save(name, ContentFile(b"\xff\xd8\xff\xe0", name=name))
+            timings.append((time.perf_counter() - start) * 1000)
+        return sum(storage.requests.values()) / len(names), statistics.median(timings)
+
+    def handle(self, *args, **options):
+        latency = options["latency"]
+        uploads = options["uploads"]
+        # Los móviles suben casi siempre con el mismo nombre de archivo
+        upload_to = UniqueUploadTo("images")
+        variants = (
+            ("antes", EmulatedBlobStorage(latency=latency), ["images/image.jpg"] * uploads),
+            (
+                "después",
+                EmulatedBlobStorage(latency=latency),
+                [upload_to(None, "image.jpg") for _ in range(uploads)],
+            ),
+        )
+        self.stdout.write(
+            f"{'variante':>9} {'peticiones/subida':>18} {'ms/subida':>10}"
+        )
+        for label, storage, names in variants:
+            requests, elapsed = self.upload(storage, names)
+            self.stdout.write(f"{label:>9} {requests:>18.2f} {elapsed:>10.1f}")
@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from reservation_app import compaction
+from reservation_app.models import Reserve
+from room.models import Room
+
+
+class Command(BaseCommand):
+    help = (
+        "Quita las fechas pasadas de occupied_dates en habitaciones y reservas, por lotes. "
+        "Pensado para ejecutarse periódicamente (cron)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=0,
+            help="Días pasados que se conservan",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=compaction.BATCH_SIZE,
+            help="Filas por transacción",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = date.today() - timedelta(days=options["keep_days"])
+        for model in (Room, Reserve):
+            rows = reclaimed = 0
+            for batch_rows, batch_bytes in compaction.compact(
+                model.objects.all(), cutoff, options["batch_size"]
+            ):
+                rows += batch_rows
+                reclaimed += batch_bytes
+            self.stdout.write(
+                f"{model.__name__}: {rows} filas compactadas, "
+                f"{reclaimed} bytes liberados"
+            )
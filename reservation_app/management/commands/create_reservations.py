@@ -1,6 +1,7 @@
 import random
 from django.core.management.base import BaseCommand
 from reservation_app.models import Reserve, Room
+from reservation_app.services import BookingError, create_reservation
 from customer.models import Customer
 from datetime import datetime, timedelta
 from django.contrib.auth.models import User
@@ -44,12 +45,10 @@ class Command(BaseCommand):
                     end_date=starting_date + timedelta(days=nights),
                     people=people
                 )
-                reserve.save()
-                
-                reserve.assign_room()
-                reserve.occupied_dates = reserve.compute_occupied_dates()
-                reserve.calculate_price()
-                reserve.save()
+                try:
+                    create_reservation(reserve)
+                except BookingError:
+                    continue
                 
                 reservations.append(reserve)
             
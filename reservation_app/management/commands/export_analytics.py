@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from reservation_app import analytics
+
+
+class Command(BaseCommand):
+    help = "Exporta reservas, habitaciones asignadas y clientes a Parquet o Arrow de forma incremental"
+
+    def add_arguments(self, parser):
+        parser.add_argument("output_dir", help="Directorio de la exportación")
+        parser.add_argument(
+            "--format",
+            choices=["parquet", "arrow"],
+            default="parquet",
+            help="Formato de salida",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=analytics.BATCH_SIZE,
+            help="Filas por lote",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Exporta todas las filas, ignorando la marca de agua",
+        )
+
+    def handle(self, *args, **options):
+        exported = analytics.export(
+            Path(options["output_dir"]),
+            options["format"],
+            options["full"],
+            options["batch_size"],
+        )
+        for table, count in exported.items():
+            self.stdout.write(f"{table}: {count} filas")
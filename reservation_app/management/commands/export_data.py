@@ -0,0 +1,60 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customer.models import Customer
+from reservation_app import exports
+from reservation_app.forms import ReservationFilterForm
+from reservation_app.models import Reserve
+
+
+class Command(BaseCommand):
+    help = "Exporta reservas o clientes en CSV o NDJSON con memoria constante"
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=["reservations", "customers"])
+        parser.add_argument(
+            "--format",
+            choices=sorted(exports.FORMATS),
+            default="csv",
+            help="Formato de salida",
+        )
+        parser.add_argument(
+            "--output",
+            help="Fichero de salida (por defecto, la salida estándar)",
+        )
+        parser.add_argument("--search", help="Texto de búsqueda de clientes")
+        parser.add_argument("--start-date", help="Reservas con esta fecha de entrada (AAAA-MM-DD)")
+        parser.add_argument("--payment-status", choices=["paid", "unpaid"])
+        parser.add_argument("--stay", choices=["arrivals", "departures", "in_house"])
+        parser.add_argument("--date-from", help="Inicio del filtro por fechas (AAAA-MM-DD)")
+        parser.add_argument("--date-to", help="Fin del filtro por fechas (AAAA-MM-DD)")
+
+    def rows(self, options):
+        """Filas a exportar, con los mismos filtros que los listados"""
+        if options["model"] == "customers":
+            customers = Customer.objects.all()
+            if options["search"]:
+                customers = customers.search(options["search"])
+            return exports.customer_rows(customers), exports.CUSTOMER_FIELDS
+
+        filter_form = ReservationFilterForm(
+            {
+                field: options[field]
+                for field in ReservationFilterForm.base_fields
+                if options.get(field)
+            }
+        )
+        if not filter_form.is_valid():
+            raise CommandError(filter_form.errors.as_text())
+        rows = exports.reservation_rows(filter_form.filter(Reserve.objects.all()))
+        return rows, exports.RESERVATION_FIELDS
+
+    def handle(self, *args, **options):
+        rows, fields = self.rows(options)
+        lines = exports.export_lines(rows, fields, options["format"])
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as output:
+                output.writelines(lines)
+        else:
+            sys.stdout.writelines(lines)
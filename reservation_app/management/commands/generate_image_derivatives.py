@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from reservation_app import derivatives
+
+
+class Command(BaseCommand):
+    help = "Genera las miniaturas y versiones WebP que falten, incluida la foto por defecto"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Vuelve a procesar también las imágenes que ya tienen derivados",
+        )
+
+    def handle(self, *args, **options):
+        for model, file_field, derivatives_field in derivatives.TARGETS:
+            processed = 0
+            instances = model._default_manager.only(file_field, derivatives_field)
+            for instance in instances.iterator():
+                if options["force"] or derivatives.is_stale(
+                    instance, file_field, derivatives_field, include_default=True
+                ):
+                    processed += derivatives.process(
+                        model, instance.pk, file_field, derivatives_field
+                    )
+            self.stdout.write(f"{model.__name__}: {processed} imágenes procesadas")
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from reservation_app import partitions
+
+
+class Command(BaseCommand):
+    help = "Crea las particiones anuales de reservas por adelantado o separa las antiguas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=partitions.YEARS_AHEAD,
+            help="Años futuros que deben tener partición",
+        )
+        parser.add_argument(
+            "--detach",
+            type=int,
+            metavar="AÑO",
+            help="Separa la partición de ese año para archivarla",
+        )
+        parser.add_argument("--list", action="store_true", help="Muestra las particiones")
+        parser.add_argument(
+            "--every",
+            type=int,
+            metavar="SEGUNDOS",
+            help="Repite la creación de particiones cada SEGUNDOS, sin terminar",
+        )
+
+    def create(self, years_ahead):
+        for year in partitions.create_partitions(years_ahead):
+            self.stdout.write(f"Creada {partitions.partition_name(year)}")
+
+    def handle(self, *args, **options):
+        if options["detach"]:
+            try:
+                archived = partitions.detach_partition(options["detach"])
+            except DatabaseError as error:
+                raise CommandError(error)
+            self.stdout.write(f"Separada {partitions.partition_name(options['detach'])}")
+            for name in archived:
+                self.stdout.write(f"Trasladadas sus filas a {name}")
+        elif options["every"]:
+            # Para un servicio o contenedor dedicado, sin depender de los despliegues
+            while True:
+                try:
+                    self.create(options["ahead"])
+                except DatabaseError as error:
+                    self.stderr.write(str(error))
+                finally:
+                    connection.close()
+                time.sleep(options["every"])
+        elif not options["list"]:
+            self.create(options["ahead"])
+        if options["list"]:
+            for name, bounds in partitions.list_partitions():
+                self.stdout.write(f"{name}: {bounds}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from reservation_app import summaries
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los resúmenes diarios de ocupación e ingresos"
+
+    def handle(self, *args, **options):
+        days = summaries.rebuild()
+        self.stdout.write(f"Resúmenes recalculados: {days} días")
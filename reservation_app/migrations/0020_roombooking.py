@@ -0,0 +1,46 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:05
+
+import django.contrib.postgres.fields.ranges
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Convierte la tabla intermedia automática de Reserve.rooms en el modelo
+    RoomBooking sin recrearla, y añade el periodo ocupado (aún opcional).
+    """
+
+    dependencies = [
+        ('reservation_app', '0019_alter_reserve_price'),
+        ('room', '0009_remove_room_occupied_dates_gin'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='RoomBooking',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('reserve', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='reservation_app.reserve')),
+                        ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='room.room')),
+                    ],
+                    options={
+                        'db_table': 'reservation_app_reserve_rooms',
+                        'unique_together': {('reserve', 'room')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='reserve',
+                    name='rooms',
+                    field=models.ManyToManyField(through='reservation_app.RoomBooking', to='room.room'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='roombooking',
+            name='period',
+            field=django.contrib.postgres.fields.ranges.DateRangeField(null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:05
+
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.backends.postgresql.psycopg_any import DateRange
+
+
+def backfill_period(apps, schema_editor):
+    """
+    Rellena RoomBooking.period a partir de Reserve.occupied_dates, o de
+    starting_date/end_date si la reserva no tiene fechas ocupadas.
+    """
+    RoomBooking = apps.get_model('reservation_app', 'RoomBooking')
+    bookings = RoomBooking.objects.select_related('reserve').filter(period__isnull=True)
+    batch = []
+    for booking in bookings.iterator(chunk_size=1000):
+        reserve = booking.reserve
+        if reserve.occupied_dates:
+            booking.period = DateRange(
+                min(reserve.occupied_dates),
+                max(reserve.occupied_dates) + timedelta(days=1),
+            )
+        else:
+            booking.period = DateRange(reserve.starting_date, reserve.end_date)
+        batch.append(booking)
+        if len(batch) == 1000:
+            RoomBooking.objects.bulk_update(batch, ['period'])
+            batch = []
+    RoomBooking.objects.bulk_update(batch, ['period'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_app', '0020_roombooking'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_period, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:05
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_app', '0021_backfill_roombooking_period'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='roombooking',
+            name='period',
+            field=django.contrib.postgres.fields.ranges.DateRangeField(),
+        ),
+        migrations.AddConstraint(
+            model_name='roombooking',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(expressions=[(models.Func('room', 'room', models.Value('[]'), function='int8range', output_field=django.contrib.postgres.fields.ranges.BigIntegerRangeField()), '&&'), ('period', '&&')], name='roombooking_no_overlap'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0005_customer_customer_last_name_id_idx'),
+        ('reservation_app', '0022_roombooking_no_overlap'),
+        ('room', '0010_occupancy_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserve',
+            index=models.Index(fields=['-starting_date', 'id'], name='reserve_start_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserve',
+            index=models.Index(fields=['user', '-starting_date', 'id'], name='reserve_user_start_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0006_customer_search_vector'),
+        ('reservation_app', '0023_reserve_reserve_start_id_idx_and_more'),
+        ('room', '0010_occupancy_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserve',
+            index=models.Index(fields=['end_date', 'starting_date'], name='reserve_end_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserve',
+            index=models.Index(condition=models.Q(('paid', False)), fields=['end_date', 'starting_date'], name='reserve_unpaid_dates_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0007_updated_at'),
+        ('reservation_app', '0024_reserve_date_filter_indexes'),
+        ('room', '0010_occupancy_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserve',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='roombooking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='reserve',
+            index=models.Index(fields=['updated_at'], name='reserve_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roombooking',
+            index=models.Index(fields=['updated_at'], name='roombooking_updated_at_idx'),
+        ),
+    ]
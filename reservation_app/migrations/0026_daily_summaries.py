@@ -0,0 +1,106 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_app', '0025_updated_at'),
+        ('room', '0010_occupancy_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('room_nights', models.IntegerField(default=0)),
+                ('revenue', models.FloatField(default=0)),
+                ('paid_revenue', models.FloatField(default=0)),
+                ('unpaid_revenue', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyRoomSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('room_nights', models.IntegerField(default=0)),
+                ('revenue', models.FloatField(default=0)),
+                ('paid_revenue', models.FloatField(default=0)),
+                ('unpaid_revenue', models.FloatField(default=0)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='room.room')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'room'), name='dailyroomsummary_date_room')],
+            },
+        ),
+        migrations.RunSQL(
+            """
+            CREATE FUNCTION refresh_occupancy_summary(
+                window_start date, window_end date, room_ids bigint[] DEFAULT NULL
+            ) RETURNS void LANGUAGE plpgsql AS $$
+            BEGIN
+                -- Serializa los recálculos con un único bloqueo: se llama en
+                -- transacciones breves, después de confirmar las reservas
+                -- (ver summaries.py), y cada sentencia ve lo confirmado antes.
+                PERFORM pg_advisory_xact_lock(hashtext('refresh_occupancy_summary'));
+
+                DELETE FROM reservation_app_dailyroomsummary
+                WHERE date >= window_start AND date < window_end
+                    AND (room_ids IS NULL OR room_id = ANY(room_ids));
+
+                INSERT INTO reservation_app_dailyroomsummary
+                    (date, room_id, room_nights, revenue, paid_revenue, unpaid_revenue)
+                SELECT
+                    day::date,
+                    booking.room_id,
+                    count(*),
+                    sum(booking.nightly),
+                    coalesce(sum(booking.nightly) FILTER (WHERE booking.paid), 0),
+                    coalesce(sum(booking.nightly) FILTER (WHERE NOT booking.paid), 0)
+                FROM (
+                    SELECT
+                        rb.room_id,
+                        rb.period,
+                        reserve.paid,
+                        reserve.price / greatest(upper(rb.period) - lower(rb.period), 1)
+                            * coalesce(room.price / nullif(share.total, 0), 1.0 / share.rooms)
+                            AS nightly
+                    FROM reservation_app_reserve_rooms rb
+                    JOIN reservation_app_reserve reserve ON reserve.id = rb.reserve_id
+                    JOIN room_room room ON room.id = rb.room_id
+                    CROSS JOIN LATERAL (
+                        SELECT sum(other.price) AS total, count(*) AS rooms
+                        FROM reservation_app_reserve_rooms sibling
+                        JOIN room_room other ON other.id = sibling.room_id
+                        WHERE sibling.reserve_id = rb.reserve_id
+                    ) share
+                    WHERE rb.period && daterange(window_start, window_end)
+                        AND (room_ids IS NULL OR rb.room_id = ANY(room_ids))
+                ) booking
+                CROSS JOIN generate_series(
+                    greatest(lower(booking.period), window_start),
+                    least(upper(booking.period), window_end) - 1,
+                    interval '1 day'
+                ) AS day
+                GROUP BY 1, 2;
+
+                DELETE FROM reservation_app_dailysummary
+                WHERE date >= window_start AND date < window_end;
+
+                INSERT INTO reservation_app_dailysummary
+                    (date, room_nights, revenue, paid_revenue, unpaid_revenue)
+                SELECT date, sum(room_nights), sum(revenue), sum(paid_revenue), sum(unpaid_revenue)
+                FROM reservation_app_dailyroomsummary
+                WHERE date >= window_start AND date < window_end
+                GROUP BY date;
+            END;
+            $$;
+            """,
+            "DROP FUNCTION refresh_occupancy_summary(date, date, bigint[]);",
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_app', '0026_daily_summaries'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='image',
+            name='reserve',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='reservation_app.reserve'),
+        ),
+        migrations.AlterField(
+            model_name='reserve',
+            name='images',
+            field=models.ManyToManyField(db_constraint=False, max_length=models.IntegerField(), related_name='image_set', to='reservation_app.image'),
+        ),
+        migrations.AlterField(
+            model_name='roombooking',
+            name='reserve',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='reservation_app.reserve'),
+        ),
+    ]
@@ -0,0 +1,160 @@
+from django.db import migrations
+
+# Convierte reservation_app_reserve en una tabla particionada por rangos de
+# starting_date, con una partición por año y una partición por defecto para
+# las fechas sin partición propia. La clave primaria pasa a ser
+# (id, starting_date), como exige PostgreSQL; el id sigue siendo único
+# porque lo asigna una secuencia. Los índices y las claves ajenas de la
+# tabla se recrean con los mismos nombres sobre la tabla particionada.
+
+CREATE_PARTITION_FUNCTION = """
+CREATE FUNCTION create_reserve_partition(partition_year integer) RETURNS boolean
+LANGUAGE plpgsql AS $$
+DECLARE
+    name text := 'reservation_app_reserve_' || partition_year;
+    lower_bound date := make_date(partition_year, 1, 1);
+    upper_bound date := make_date(partition_year + 1, 1, 1);
+BEGIN
+    -- Sin partición por defecto, las reservas de un año sin partición
+    -- fallarían al insertarse; se recrea si alguien la ha separado.
+    IF to_regclass('reservation_app_reserve_default') IS NULL THEN
+        CREATE TABLE reservation_app_reserve_default PARTITION OF reservation_app_reserve DEFAULT;
+    END IF;
+    IF to_regclass(name) IS NOT NULL THEN
+        RETURN false;
+    END IF;
+    -- Las reservas de ese año que hubieran caído en la partición por
+    -- defecto se trasladan antes de adjuntar la nueva partición.
+    EXECUTE format('CREATE TABLE %I (LIKE reservation_app_reserve INCLUDING DEFAULTS)', name);
+    EXECUTE format(
+        'WITH moved AS (
+            DELETE FROM reservation_app_reserve_default
+            WHERE starting_date >= %L AND starting_date < %L
+            RETURNING *
+        ) INSERT INTO %I SELECT * FROM moved',
+        lower_bound, upper_bound, name
+    );
+    EXECUTE format(
+        'ALTER TABLE reservation_app_reserve ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        name, lower_bound, upper_bound
+    );
+    RETURN true;
+END;
+$$;
+"""
+
+PARTITION_RESERVE = """
+DO $$
+DECLARE
+    statements text[];
+    statement text;
+    first_year integer;
+    last_year integer := extract(year FROM current_date)::integer + 2;
+BEGIN
+    ALTER TABLE reservation_app_reserve RENAME TO reservation_app_reserve_unpartitioned;
+
+    SELECT array_agg(
+        replace(indexdef, 'reservation_app_reserve_unpartitioned', 'reservation_app_reserve')
+    ) INTO statements
+    FROM pg_indexes
+    WHERE tablename = 'reservation_app_reserve_unpartitioned'
+        AND indexname <> 'reservation_app_reserve_pkey';
+    SELECT statements || array_agg(
+        format('ALTER TABLE reservation_app_reserve ADD CONSTRAINT %I %s', conname, pg_get_constraintdef(oid))
+    ) INTO statements
+    FROM pg_constraint
+    WHERE conrelid = 'reservation_app_reserve_unpartitioned'::regclass AND contype = 'f';
+
+    CREATE TABLE reservation_app_reserve (
+        LIKE reservation_app_reserve_unpartitioned INCLUDING DEFAULTS INCLUDING IDENTITY
+    ) PARTITION BY RANGE (starting_date);
+    CREATE TABLE reservation_app_reserve_default PARTITION OF reservation_app_reserve DEFAULT;
+
+    SELECT coalesce(extract(year FROM min(starting_date))::integer, last_year - 2)
+    INTO first_year FROM reservation_app_reserve_unpartitioned;
+    FOR partition_year IN first_year .. last_year LOOP
+        PERFORM create_reserve_partition(partition_year);
+    END LOOP;
+
+    INSERT INTO reservation_app_reserve OVERRIDING SYSTEM VALUE
+    SELECT * FROM reservation_app_reserve_unpartitioned;
+    PERFORM setval(
+        pg_get_serial_sequence('reservation_app_reserve', 'id'),
+        coalesce((SELECT max(id) FROM reservation_app_reserve), 0) + 1,
+        false
+    );
+    DROP TABLE reservation_app_reserve_unpartitioned;
+    EXECUTE format(
+        'ALTER SEQUENCE %s RENAME TO reservation_app_reserve_id_seq',
+        pg_get_serial_sequence('reservation_app_reserve', 'id')
+    );
+
+    ALTER TABLE reservation_app_reserve
+        ADD CONSTRAINT reservation_app_reserve_pkey PRIMARY KEY (id, starting_date);
+    FOREACH statement IN ARRAY coalesce(statements, '{}') LOOP
+        EXECUTE statement;
+    END LOOP;
+END;
+$$;
+"""
+
+UNPARTITION_RESERVE = """
+DO $$
+DECLARE
+    statements text[];
+    statement text;
+BEGIN
+    ALTER TABLE reservation_app_reserve RENAME TO reservation_app_reserve_partitioned;
+
+    SELECT array_agg(
+        replace(indexdef, 'reservation_app_reserve_partitioned', 'reservation_app_reserve')
+    ) INTO statements
+    FROM pg_indexes
+    WHERE tablename = 'reservation_app_reserve_partitioned'
+        AND indexname <> 'reservation_app_reserve_pkey';
+    SELECT statements || array_agg(
+        format('ALTER TABLE reservation_app_reserve ADD CONSTRAINT %I %s', conname, pg_get_constraintdef(oid))
+    ) INTO statements
+    FROM pg_constraint
+    WHERE conrelid = 'reservation_app_reserve_partitioned'::regclass AND contype = 'f';
+
+    CREATE TABLE reservation_app_reserve (
+        LIKE reservation_app_reserve_partitioned INCLUDING DEFAULTS INCLUDING IDENTITY
+    );
+    INSERT INTO reservation_app_reserve OVERRIDING SYSTEM VALUE
+    SELECT * FROM reservation_app_reserve_partitioned;
+    PERFORM setval(
+        pg_get_serial_sequence('reservation_app_reserve', 'id'),
+        coalesce((SELECT max(id) FROM reservation_app_reserve), 0) + 1,
+        false
+    );
+    DROP TABLE reservation_app_reserve_partitioned CASCADE;
+    EXECUTE format(
+        'ALTER SEQUENCE %s RENAME TO reservation_app_reserve_id_seq',
+        pg_get_serial_sequence('reservation_app_reserve', 'id')
+    );
+
+    ALTER TABLE reservation_app_reserve
+        ADD CONSTRAINT reservation_app_reserve_pkey PRIMARY KEY (id);
+    FOREACH statement IN ARRAY coalesce(statements, '{}') LOOP
+        EXECUTE statement;
+    END LOOP;
+END;
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_app', '0027_reservations_without_constraint'),
+        ('room', '0011_reservations_without_constraint'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            CREATE_PARTITION_FUNCTION,
+            "DROP FUNCTION create_reserve_partition(integer);",
+        ),
+        migrations.RunSQL(PARTITION_RESERVE, UNPARTITION_RESERVE),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:29
+
+import reservation.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_app', '0028_partition_reserve'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='image',
+            name='image',
+            field=models.ImageField(upload_to=reservation.uploads.UniqueUploadTo('images')),
+        ),
+    ]
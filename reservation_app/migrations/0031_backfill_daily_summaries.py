@@ -0,0 +1,34 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_app', '0030_image_derivatives'),
+    ]
+
+    operations = [
+        # Los resúmenes solo se mantienen al cambiar una reserva: se rellenan
+        # aquí con las reservas que ya existían al crearlos.
+        migrations.RunSQL(
+            """
+            DO $$
+            DECLARE
+                day date;
+                last_day date;
+            BEGIN
+                SELECT min(starting_date), max(end_date) INTO day, last_day
+                FROM reservation_app_reserve;
+                -- Por tramos de un mes, como summaries.rebuild
+                WHILE day < last_day LOOP
+                    PERFORM refresh_occupancy_summary(day, least(day + 31, last_day));
+                    day := day + 31;
+                END LOOP;
+            END;
+            $$;
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
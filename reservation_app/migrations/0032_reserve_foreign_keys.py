@@ -0,0 +1,105 @@
+from django.db import migrations
+
+# Desde 0028_partition_reserve la clave primaria de reservation_app_reserve
+# es (id, starting_date) y ninguna tabla puede referenciar solo su id. Las
+# tablas que apuntan a una reserva guardan también su fecha de entrada en
+# reserve_starting_date, que rellena un trigger al insertar, y la clave
+# ajena compuesta (reserve_id, reserve_starting_date) vuelve a garantizar
+# que la reserva existe. ON UPDATE CASCADE sigue los cambios de fecha de la
+# reserva, aunque la muevan de partición. Las columnas no están en los
+# modelos: Django sigue usando solo reserve_id.
+#
+# 0027 y 0011 quitaron además, sin necesidad, las claves ajenas de las
+# tablas intermedias hacia image y room, que no están particionadas.
+
+RESERVE_TABLES = (
+    "reservation_app_reserve_rooms",
+    "reservation_app_image",
+    "reservation_app_reserve_images",
+    "room_room_reservations",
+)
+
+# Tablas intermedias, columna y tabla referenciada
+TARGET_FOREIGN_KEYS = (
+    ("reservation_app_reserve_images", "image_id", "reservation_app_image"),
+    ("room_room_reservations", "room_id", "room_room"),
+)
+
+CREATE_TRIGGER_FUNCTION = """
+CREATE FUNCTION set_reserve_starting_date() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    SELECT starting_date INTO NEW.reserve_starting_date
+    FROM reservation_app_reserve WHERE id = NEW.reserve_id;
+    IF NOT FOUND THEN
+        RAISE foreign_key_violation USING MESSAGE = format(
+            'insert or update on table "%s" violates foreign key constraint: '
+            'reservation_app_reserve id %s does not exist',
+            TG_TABLE_NAME, NEW.reserve_id
+        );
+    END IF;
+    RETURN NEW;
+END;
+$$;
+"""
+
+ADD_RESERVE_FOREIGN_KEY = """
+ALTER TABLE {table} ADD COLUMN reserve_starting_date date;
+UPDATE {table} SET reserve_starting_date = reserve.starting_date
+FROM reservation_app_reserve reserve WHERE reserve.id = {table}.reserve_id;
+-- Filas de reservas ya eliminadas que la falta de clave ajena dejó huérfanas
+DELETE FROM {table} WHERE reserve_starting_date IS NULL;
+ALTER TABLE {table} ALTER COLUMN reserve_starting_date SET NOT NULL;
+CREATE TRIGGER {table}_reserve_starting_date
+    BEFORE INSERT OR UPDATE OF reserve_id ON {table}
+    FOR EACH ROW EXECUTE FUNCTION set_reserve_starting_date();
+ALTER TABLE {table} ADD CONSTRAINT {table}_reserve_fk
+    FOREIGN KEY (reserve_id, reserve_starting_date)
+    REFERENCES reservation_app_reserve (id, starting_date)
+    ON UPDATE CASCADE DEFERRABLE INITIALLY DEFERRED;
+"""
+
+DROP_RESERVE_FOREIGN_KEY = """
+ALTER TABLE {table} DROP CONSTRAINT {table}_reserve_fk;
+DROP TRIGGER {table}_reserve_starting_date ON {table};
+ALTER TABLE {table} DROP COLUMN reserve_starting_date;
+"""
+
+ADD_TARGET_FOREIGN_KEY = """
+DELETE FROM {table} WHERE NOT EXISTS (SELECT FROM {target} WHERE id = {table}.{column});
+ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_fk_{target}_id
+    FOREIGN KEY ({column}) REFERENCES {target} (id) DEFERRABLE INITIALLY DEFERRED;
+"""
+
+DROP_TARGET_FOREIGN_KEY = """
+ALTER TABLE {table} DROP CONSTRAINT {table}_{column}_fk_{target}_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_app', '0031_backfill_daily_summaries'),
+        ('room', '0013_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            CREATE_TRIGGER_FUNCTION,
+            "DROP FUNCTION set_reserve_starting_date();",
+        ),
+        *(
+            migrations.RunSQL(
+                ADD_RESERVE_FOREIGN_KEY.format(table=table),
+                DROP_RESERVE_FOREIGN_KEY.format(table=table),
+            )
+            for table in RESERVE_TABLES
+        ),
+        *(
+            migrations.RunSQL(
+                ADD_TARGET_FOREIGN_KEY.format(table=table, column=column, target=target),
+                DROP_TARGET_FOREIGN_KEY.format(table=table, column=column, target=target),
+            )
+            for table, column, target in TARGET_FOREIGN_KEYS
+        ),
+    ]
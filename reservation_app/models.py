@@ -1,18 +1,129 @@
 """
-Reserve e Image 
+Reserve, RoomBooking, Image y los resúmenes diarios de ocupación
 """
 
 from datetime import timedelta
 
 from django.contrib.auth.models import User
-from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import (
+    ArrayField,
+    BigIntegerRangeField,
+    DateRangeField,
+    RangeOperators,
+)
 from django.db import models
+from django.db.backends.postgresql.psycopg_any import DateRange
 
+from reservation.uploads import UniqueUploadTo
 from room.models import Room
 
+from .solver import FEWEST_ROOMS
+
 # Create your models here.
 
 
+class ReserveQuerySet(models.QuerySet):
+    """
+    QuerySet de reservas.
+
+    Métodos:
+        for_listing(): Prepara las reservas para el listado de reservas.
+        arriving(date_from, date_to): Reservas que llegan entre dos fechas.
+        departing(date_from, date_to): Reservas que salen entre dos fechas.
+        in_house(date_from, date_to): Reservas con alguna noche entre dos fechas.
+        with_occupied_dates(): Carga también occupied_dates.
+
+    Los filtros por fechas comparan directamente starting_date y end_date
+    para que puedan resolverse con los índices de Reserve, y siempre acotan
+    starting_date para que PostgreSQL descarte las particiones anuales que
+    no pueden contener resultados (ver partitions.py).
+    """
+
+    def with_occupied_dates(self):
+        """
+        Carga occupied_dates, que ReserveManager aplaza por defecto.
+
+        Anula cualquier defer() u only() anterior.
+
+        Returns:
+            QuerySet: Reservas con todos sus campos.
+        """
+        return self.defer(None)
+
+    def arriving(self, date_from, date_to):
+        """
+        Filtra las reservas cuya fecha de entrada está en [date_from, date_to].
+
+        Returns:
+            QuerySet: Reservas filtradas.
+        """
+        return self.filter(starting_date__gte=date_from, starting_date__lte=date_to)
+
+    def departing(self, date_from, date_to):
+        """
+        Filtra las reservas cuya fecha de salida está en [date_from, date_to].
+
+        Returns:
+            QuerySet: Reservas filtradas.
+        """
+        # starting_date < end_date <= date_to: descarta las particiones futuras
+        return self.filter(
+            end_date__gte=date_from, end_date__lte=date_to, starting_date__lt=date_to
+        )
+
+    def in_house(self, date_from, date_to=None):
+        """
+        Filtra las reservas alojadas alguna noche entre date_from y date_to.
+
+        Con una sola fecha, devuelve las reservas alojadas esa noche.
+
+        Returns:
+            QuerySet: Reservas filtradas.
+        """
+        return self.filter(starting_date__lte=date_to or date_from, end_date__gt=date_from)
+
+    def for_listing(self):
+        """
+        Carga en un número fijo de consultas todo lo que muestra el listado.
+
+        El cliente se obtiene con un JOIN y las habitaciones con una única
+        consulta adicional, limitando ambos a los campos que se muestran.
+
+        Returns:
+            QuerySet: Reservas con cliente y habitaciones precargados.
+        """
+        return self.select_related("customer").only(
+            "starting_date",
+            "end_date",
+            "people",
+            "price",
+            "paid",
+            "customer__name",
+            "customer__last_name",
+        ).prefetch_related(
+            models.Prefetch(
+                "rooms",
+                queryset=Room.objects.only(
+                    "number", "price", "photo", "photo_derivatives"
+                ).order_by("number"),
+            )
+        )
+
+
+class ReserveManager(models.Manager.from_queryset(ReserveQuerySet)):
+    """
+    Gestor por defecto de Reserve: aplaza occupied_dates.
+
+    Las noches de una reserva se obtienen de sus fechas con
+    compute_occupied_dates(); quien necesite el array guardado debe pedirlo
+    con with_occupied_dates().
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer("occupied_dates")
+
+
 class Reserve(models.Model):
     """
     Modelo que representa una reserva.
@@ -24,18 +135,26 @@ class Reserve(models.Model):
         nights (IntegerField): Número de noches de la reserva.
         end_date (DateField): Fecha de finalización de la reserva.
         people (IntegerField): Número de personas en la reserva.
-        rooms (ManyToManyField): Habitaciones reservadas.
+        rooms (ManyToManyField): Habitaciones reservadas, a través de RoomBooking.
         price (FloatField): Precio total de la reserva.
         images (ManyToManyField): Imágenes asociadas a la reserva.
         paid (BooleanField): Indica si la reserva ha sido pagada.
         occupied_dates (ArrayField): Fechas ocupadas por la reserva.
+        updated_at (DateTimeField): Última modificación, para exportaciones incrementales.
 
     Métodos:
         assign_room(): Asigna habitaciones a la reserva según la capacidad requerida.
         compute_occupied_dates(): Calcula las fechas ocupadas por la reserva.
         find_free_rooms(): Encuentra habitaciones libres para las fechas de la reserva.
+        period: Intervalo [starting_date, end_date) de la reserva.
         calculate_price(): Calcula el precio total de la reserva.
         __str__(): Representación en cadena de la reserva.
+
+    La tabla está particionada por año de starting_date (ver partitions.py);
+    su clave primaria en la base de datos es (id, starting_date). Las claves
+    ajenas hacia la reserva no pueden crearse desde Django (db_constraint=False):
+    la migración 0032_reserve_foreign_keys las crea sobre (reserve_id,
+    reserve_starting_date), una columna que solo existe en la base de datos.
     """
         
 
@@ -45,43 +164,56 @@ class Reserve(models.Model):
     nights = models.IntegerField()
     end_date = models.DateField()
     people = models.IntegerField()
-    rooms = models.ManyToManyField(Room)
+    rooms = models.ManyToManyField(Room, through="RoomBooking")
     price = models.FloatField(default=0)
     images = models.ManyToManyField(
-        "Image", related_name="image_set", max_length=people
+        "Image", related_name="image_set", max_length=people, db_constraint=False
     )
     paid = models.BooleanField(default=False)
     occupied_dates = ArrayField(models.DateField(), blank=True, default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ReserveManager()
+
+    class Meta:
+        indexes = [
+            # Paginación por clave del listado de reservas (ver pagination.py)
+            models.Index(fields=["-starting_date", "id"], name="reserve_start_id_idx"),
+            models.Index(
+                fields=["user", "-starting_date", "id"], name="reserve_user_start_id_idx"
+            ),
+            # Salidas y estancias (end_date > X AND starting_date <= Y)
+            models.Index(fields=["end_date", "starting_date"], name="reserve_end_start_idx"),
+            models.Index(
+                fields=["end_date", "starting_date"],
+                name="reserve_unpaid_dates_idx",
+                condition=models.Q(paid=False),
+            ),
+            models.Index(fields=["updated_at"], name="reserve_updated_at_idx"),
+        ]
 
-    def assign_room(self):
+    def assign_room(self, objective=FEWEST_ROOMS):
         """
         Asigna habitaciones a la reserva según la capacidad requerida.
 
-        Este método busca habitaciones libres y las asigna a la reserva
-        según la cantidad de personas. Si hay una habitación con la capacidad
-        exacta, se asigna directamente. De lo contrario, se asignan varias
-        habitaciones hasta cubrir la capacidad requerida.
-        """
-        people = self.people
-        while people > 0:
-            free_rooms = Reserve.find_free_rooms(self)
-            if Room.objects.filter(capacity=people).exists():
-                room = Room.objects.filter(capacity=people).first()
-                room.reserve_dates(self)
-                room.save()
-                self.rooms.add(room)
-                people -= room.capacity
-            else:
-                capacities = {room.id: room.capacity for room in free_rooms}
-                for room_id, capacity in capacities.items():
-                    room = Room.objects.get(id=room_id)
-                    room.reserve_dates(self)
-                    room.save()
-                    self.rooms.add(room)
-                    people -= capacity
-                    if people <= 0:
-                        break
-            self.save()
+        Elige con reservation_app.solver la combinación de habitaciones libres
+        que cubre a todas las personas con menos habitaciones o menor precio y
+        la guarda con reservation_app.services.book_rooms. Las habitaciones
+        que la reserva ya ocupa descuentan su capacidad.
+
+        Args:
+            objective (str): solver.FEWEST_ROOMS o solver.LOWEST_PRICE.
+
+        Returns:
+            bool: True si la reserva queda cubierta, False si no hay habitaciones suficientes.
+        """
+        from .services import BookingError, book_rooms
+
+        try:
+            book_rooms(self, objective=objective)
+        except BookingError:
+            return False
+        return True
 
     def compute_occupied_dates(self):
         """
@@ -102,28 +234,41 @@ class Reserve(models.Model):
         """
         Encuentra habitaciones libres para las fechas de la reserva.
 
-        Este método busca todas las habitaciones y filtra aquellas que no
-        tienen intersección con las fechas ocupadas de la reserva.
+        La disponibilidad se resuelve en una única consulta de rangos sobre
+        RoomBooking (ver RoomQuerySet.free_between). Las habitaciones que ya
+        ocupa la propia reserva se consideran libres; si aún no ocupa
+        ninguna, la consulta puede resolverse con el motor en memoria.
         
         Returns:
-            list: Lista de habitaciones libres.
+            QuerySet: Habitaciones libres.
         """
-        rooms = Room.objects.all()
-        free_rooms = []
-        for room in rooms:
-            if not set(self.occupied_dates).intersection(set(room.occupied_dates)):
-                free_rooms.append(room)
-        return free_rooms
+        reservation = self if self.pk and self.bookings.exists() else None
+        return Room.objects.free_between(self.starting_date, self.end_date, reservation)
+
+    @property
+    def period(self):
+        """
+        Intervalo de fechas ocupado por la reserva.
+
+        Returns:
+            DateRange: Rango [starting_date, end_date).
+        """
+        return DateRange(self.starting_date, self.end_date)
 
-    def calculate_price(self):
+    def calculate_price(self, rooms=None):
         """
         Calcula el precio total de la reserva.
 
         Este método suma el precio de todas las habitaciones reservadas
         multiplicado por el número de noches.
+
+        Args:
+            rooms (iterable): Habitaciones a usar en lugar de las reservadas
+                (opcional, permite presupuestar sin guardar la reserva).
         """
         price = 0
-        rooms = self.rooms.all()
+        if rooms is None:
+            rooms = self.rooms.all()
         for room in rooms:
             price += room.price * self.nights
         self.price = price
@@ -132,13 +277,121 @@ class Reserve(models.Model):
         return f"{self.customer} - {self.starting_date}"
 
 
+class RoomBooking(models.Model):
+    """
+    Modelo intermedio entre Reserve y Room: ocupación de una habitación.
+
+    La restricción de exclusión impide que dos reservas ocupen la misma
+    habitación en fechas solapadas. La habitación se compara como un rango
+    [room_id, room_id] para que el índice GiST no necesite btree_gist.
+
+    Atributos:
+        reserve (ForeignKey): Reserva a la que pertenece la ocupación.
+        room (ForeignKey): Habitación ocupada.
+        period (DateRangeField): Intervalo [entrada, salida) ocupado.
+        updated_at (DateTimeField): Última modificación, para exportaciones incrementales.
+    """
+
+    reserve = models.ForeignKey(
+        Reserve, on_delete=models.CASCADE, related_name="bookings", db_constraint=False
+    )
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="bookings")
+    period = DateRangeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "reservation_app_reserve_rooms"
+        unique_together = [("reserve", "room")]
+        constraints = [
+            ExclusionConstraint(
+                name="roombooking_no_overlap",
+                expressions=[
+                    (
+                        models.Func(
+                            "room",
+                            "room",
+                            models.Value("[]"),
+                            function="int8range",
+                            output_field=BigIntegerRangeField(),
+                        ),
+                        RangeOperators.OVERLAPS,
+                    ),
+                    ("period", RangeOperators.OVERLAPS),
+                ],
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["updated_at"], name="roombooking_updated_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.room} - {self.period}"
+
+
 class Image(models.Model):
     """
     Modelo que representa el documento de identidad de un huésped.
 
     Atributos:
         image (ImageField): Archivo de imagen.
+        derivatives (JSONField): Miniaturas y versiones WebP de la imagen (ver derivatives.py).
         reserve (ForeignKey): Reserva a la que pertenece la imagen.
     """
-    image = models.ImageField(upload_to="images")
-    reserve = models.ForeignKey(Reserve, on_delete=models.CASCADE)
+    image = models.ImageField(upload_to=UniqueUploadTo("images"))
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    reserve = models.ForeignKey(Reserve, on_delete=models.CASCADE, db_constraint=False)
+
+
+class DailyRoomSummary(models.Model):
+    """
+    Resumen diario de una habitación: noches vendidas e ingresos.
+
+    Se mantiene de forma incremental (ver reservation_app.summaries); los
+    días sin ocupación no tienen fila. El precio de cada reserva se reparte
+    por noches y entre sus habitaciones en proporción a su precio.
+
+    Atributos:
+        date (DateField): Noche resumida.
+        room (ForeignKey): Habitación.
+        room_nights (IntegerField): Noches vendidas (0 o 1).
+        revenue (FloatField): Ingresos de la noche.
+        paid_revenue (FloatField): Parte de los ingresos ya pagada.
+        unpaid_revenue (FloatField): Parte de los ingresos pendiente de pago.
+    """
+
+    date = models.DateField()
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="daily_summaries")
+    room_nights = models.IntegerField(default=0)
+    revenue = models.FloatField(default=0)
+    paid_revenue = models.FloatField(default=0)
+    unpaid_revenue = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "room"], name="dailyroomsummary_date_room"),
+        ]
+
+    def __str__(self):
+        return f"{self.room} - {self.date}"
+
+
+class DailySummary(models.Model):
+    """
+    Resumen diario del alojamiento: suma de los resúmenes de sus habitaciones.
+
+    Atributos:
+        date (DateField): Noche resumida.
+        room_nights (IntegerField): Noches de habitación vendidas.
+        revenue (FloatField): Ingresos de la noche.
+        paid_revenue (FloatField): Parte de los ingresos ya pagada.
+        unpaid_revenue (FloatField): Parte de los ingresos pendiente de pago.
+    """
+
+    date = models.DateField(unique=True)
+    room_nights = models.IntegerField(default=0)
+    revenue = models.FloatField(default=0)
+    paid_revenue = models.FloatField(default=0)
+    unpaid_revenue = models.FloatField(default=0)
+
+    def __str__(self):
+        return str(self.date)
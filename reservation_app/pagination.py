@@ -0,0 +1,186 @@
+"""
+Paginación por clave (keyset).
+
+En lugar de OFFSET, cada página se pide a partir de un cursor con los
+valores de la clave de ordenación del último (o primer) elemento visto, y
+la consulta filtra con una comparación lexicográfica sobre esa clave. Con
+un índice compuesto que coincida con la ordenación, el coste de cada
+página es proporcional a su tamaño y no a su profundidad.
+
+La clave debe terminar en un campo único (normalmente el id) para que el
+orden sea total. Puede incluir anotaciones, como la relevancia de una
+búsqueda.
+"""
+
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+PAGE_SIZE = 20
+
+
+def encode_cursor(values):
+    """
+    Codifica los valores de una clave como cursor opaco para la URL.
+
+    Args:
+        values (list): Valores de la clave de ordenación.
+
+    Returns:
+        str: Cursor en base64 apto para URL.
+    """
+    data = json.dumps(
+        [value.isoformat() if hasattr(value, "isoformat") else value for value in values]
+    )
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, model, ordering):
+    """
+    Decodifica un cursor a los valores de la clave de ordenación.
+
+    Args:
+        cursor (str): Cursor generado por encode_cursor.
+        model (Model): Modelo paginado.
+        ordering (list): Campos de la clave, con "-" si son descendentes.
+
+    Returns:
+        list: Valores de la clave, o None si el cursor no es válido.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(data)
+        if len(values) != len(ordering):
+            return None
+        return [to_python(model, field.lstrip("-"), value) for field, value in zip(ordering, values)]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def to_python(model, name, value):
+    """Convierte un valor del cursor al tipo del campo; las anotaciones se dejan tal cual."""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        if not isinstance(value, (int, float, str)):
+            raise TypeError(name)
+        return value
+    return field.to_python(value)
+
+
+def keyset_filter(ordering, values, reverse=False):
+    """
+    Construye el filtro de los elementos posteriores a una clave.
+
+    Para la ordenación (a, -b, c) y la clave (x, y, z) equivale a
+    a >= x AND (a > x OR (a = x AND b < y) OR (a = x AND b = y AND c > z)).
+
+    La cota inclusiva sobre el primer campo es redundante, pero permite a
+    PostgreSQL usarla como condición del índice y empezar a leer en la
+    posición del cursor en lugar de descartar las filas anteriores.
+
+    Args:
+        ordering (list): Campos de la clave, con "-" si son descendentes.
+        values (list): Valores de la clave.
+        reverse (bool): Si es True, filtra los elementos anteriores.
+
+    Returns:
+        Q: Filtro de la página siguiente (o anterior).
+    """
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        after = "lt" if field.startswith("-") else "gt"
+        before = "gt" if after == "lt" else "lt"
+        condition |= Q(**equal, **{f"{name}__{before if reverse else after}": value})
+        equal[name] = value
+    leading = ordering[0]
+    bound = "lte" if leading.startswith("-") != reverse else "gte"
+    return Q(**{f"{leading.lstrip('-')}__{bound}": values[0]}) & condition
+
+
+class KeysetPage:
+    """
+    Página de resultados obtenida por clave.
+
+    Atributos:
+        object_list (list): Elementos de la página.
+        next_cursor (str): Cursor de la página siguiente, o None si es la última.
+        previous_cursor (str): Cursor de la página anterior, o None si es la primera.
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def keyset_page(queryset, ordering, after=None, before=None, page_size=PAGE_SIZE):
+    """
+    Obtiene una página de un QuerySet ordenado por clave.
+
+    Args:
+        queryset (QuerySet): Elementos ya filtrados.
+        ordering (list): Campos de la clave, con "-" si son descendentes; el
+            último debe ser único.
+        after (str): Cursor de la página siguiente (opcional).
+        before (str): Cursor de la página anterior (opcional).
+        page_size (int): Número de elementos por página.
+
+    Returns:
+        KeysetPage: Página de resultados.
+    """
+    model = queryset.model
+    names = [field.lstrip("-") for field in ordering]
+    reverse = False
+    cursor = None
+    if before:
+        cursor = decode_cursor(before, model, ordering)
+        reverse = cursor is not None
+    elif after:
+        cursor = decode_cursor(after, model, ordering)
+
+    if reverse:
+        queryset = queryset.order_by(
+            *(field[1:] if field.startswith("-") else f"-{field}" for field in ordering)
+        )
+    else:
+        queryset = queryset.order_by(*ordering)
+    if cursor is not None:
+        queryset = queryset.filter(keyset_filter(ordering, cursor, reverse))
+
+    items = list(queryset[: page_size + 1])
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if reverse:
+        items.reverse()
+
+    def key(item):
+        return encode_cursor([getattr(item, name) for name in names])
+
+    if not items:
+        return KeysetPage(items, None, None)
+    has_next = has_more if not reverse else True
+    has_previous = has_more if reverse else cursor is not None
+    return KeysetPage(
+        items,
+        key(items[-1]) if has_next else None,
+        key(items[0]) if has_previous else None,
+    )
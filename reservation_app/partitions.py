@@ -0,0 +1,135 @@
+"""
+Particiones anuales de la tabla de reservas.
+
+reservation_app_reserve está particionada por rangos de starting_date, con
+una partición por año (reservation_app_reserve_<año>) y una partición por
+defecto que recoge las fechas sin partición propia (ver la migración
+0028_partition_reserve). Los filtros por starting_date permiten a
+PostgreSQL descartar las particiones que no pueden contener resultados.
+
+create_partitions crea por adelantado las particiones de los próximos
+años y traslada a su partición las reservas que hubieran caído en la
+partición por defecto (que recrea si falta). Debe ejecutarse
+periódicamente, no solo al desplegar (ver `partition_reservations
+--every`). detach_partition separa un año de la tabla, junto con las filas
+que referencian sus reservas, para archivarlo sin afectar a las consultas
+sobre las reservas actuales.
+"""
+
+from datetime import date
+
+from django.db import connection, transaction
+
+from .models import Reserve
+
+YEARS_AHEAD = 2
+DEFAULT_PARTITION = f"{Reserve._meta.db_table}_default"
+# Tablas con clave ajena a la reserva (ver la migración 0032_reserve_foreign_keys),
+# en orden de borrado: las intermedias de imágenes antes que las imágenes
+REFERENCING_TABLES = (
+    "reservation_app_reserve_rooms",
+    "reservation_app_reserve_images",
+    "reservation_app_image",
+    "room_room_reservations",
+)
+
+
+def partition_name(year):
+    """Nombre de la partición de un año."""
+    return f"{Reserve._meta.db_table}_{year}"
+
+
+def create_partitions(years_ahead=YEARS_AHEAD):
+    """
+    Crea las particiones que falten hasta dentro de `years_ahead` años.
+
+    También crea las de los años que tengan reservas en la partición por
+    defecto, moviendo esas reservas a su partición.
+
+    Args:
+        years_ahead (int): Años futuros que deben tener partición.
+
+    Returns:
+        list: Años cuyas particiones se han creado.
+    """
+    current_year = date.today().year
+    with connection.cursor() as cursor:
+        years = set()
+        # create_reserve_partition recrea la partición por defecto si falta
+        cursor.execute("SELECT to_regclass(%s)", [DEFAULT_PARTITION])
+        if cursor.fetchone()[0]:
+            cursor.execute(
+                f"SELECT DISTINCT extract(year FROM starting_date)::integer FROM {DEFAULT_PARTITION}"
+            )
+            years.update(year for (year,) in cursor.fetchall())
+        years.update(range(current_year, current_year + years_ahead + 1))
+        created = []
+        for year in sorted(years):
+            cursor.execute("SELECT create_reserve_partition(%s)", [year])
+            if cursor.fetchone()[0]:
+                created.append(year)
+    return created
+
+
+def list_partitions():
+    """
+    Particiones adjuntas a la tabla de reservas.
+
+    Returns:
+        list: Tuplas (nombre, límites) ordenadas por nombre.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT partition.relname, pg_get_expr(partition.relpartbound, partition.oid)
+            FROM pg_inherits
+            JOIN pg_class partition ON partition.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            ORDER BY partition.relname
+            """,
+            [Reserve._meta.db_table],
+        )
+        return cursor.fetchall()
+
+
+def detach_partition(year):
+    """
+    Separa la partición de un año de la tabla de reservas.
+
+    La partición queda como una tabla independiente que puede archivarse
+    (por ejemplo con pg_dump) y eliminarse. Las filas que referencian sus
+    reservas (RoomBooking, imágenes y tablas intermedias) se trasladan a
+    tablas `<partición>_<tabla>` junto a ella, porque las claves ajenas
+    impiden separar reservas referenciadas. La separación solo modifica el
+    catálogo, por lo que el bloqueo de la tabla es breve; DETACH PARTITION
+    CONCURRENTLY no está disponible porque la tabla tiene partición por
+    defecto.
+
+    Args:
+        year (int): Año de la partición.
+
+    Returns:
+        list: Nombres de las tablas con las filas trasladadas.
+    """
+    quote = connection.ops.quote_name
+    partition = partition_name(year)
+    archived = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in REFERENCING_TABLES:
+            archive = f"{partition}_{table}"
+            cursor.execute(f"CREATE TABLE {quote(archive)} (LIKE {quote(table)})")
+            cursor.execute(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {quote(table)}
+                    WHERE reserve_starting_date >= %s AND reserve_starting_date < %s
+                    RETURNING *
+                ) INSERT INTO {quote(archive)} SELECT * FROM moved
+                """,
+                [date(year, 1, 1), date(year + 1, 1, 1)],
+            )
+            archived.append(archive)
+        cursor.execute(
+            f"ALTER TABLE {quote(Reserve._meta.db_table)} DETACH PARTITION {quote(partition)}"
+        )
+    return archived
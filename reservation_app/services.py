@@ -0,0 +1,240 @@
+"""
+Servicio de creación de reservas.
+
+La creación se divide en dos fases. Primero se planifica sin escribir nada:
+se eligen las habitaciones y se calcula el precio. Después se persiste todo
+en una transacción con un número fijo de sentencias, independiente del
+número de habitaciones: bloqueo de las habitaciones, INSERT de la reserva,
+INSERT masivo de sus RoomBooking y un único UPDATE que añade las fechas
+ocupadas a las habitaciones. Los resúmenes diarios se recalculan después
+de confirmar (ver summaries.py).
+
+quote_reservation solo ejecuta la primera fase: presupuesta una estancia
+sin escribir nada, por lo que puede servirse desde réplicas de lectura.
+"""
+
+from django.db import IntegrityError, transaction
+
+from room.availability import commit_occupancy_change, engine
+from room.models import Room
+
+from . import summaries
+from .models import Reserve, RoomBooking
+from .solver import FEWEST_ROOMS, solve
+
+ASSIGN_ATTEMPTS = 3
+
+
+class BookingError(Exception):
+    """La reserva no puede alojarse en las fechas solicitadas."""
+
+
+def plan_rooms(reservation, room_number=None, objective=FEWEST_ROOMS):
+    """
+    Elige las habitaciones de una reserva sin escribir en la base de datos.
+
+    Si la reserva ya está guardada, las habitaciones que ocupa descuentan su
+    capacidad y no se vuelven a elegir.
+
+    Args:
+        reservation (Reserve): Reserva con fechas y número de personas.
+        room_number (int): Número de una habitación concreta (opcional).
+        objective (str): solver.FEWEST_ROOMS o solver.LOWEST_PRICE.
+
+    Raises:
+        BookingError: Si no hay habitaciones que alojen la reserva.
+
+    Returns:
+        list: Tuplas (id, capacidad, precio) de las habitaciones elegidas.
+    """
+    if room_number:
+        rooms = list(
+            Room.objects.filter(number=room_number).values_list("id", "capacity", "price")
+        )
+        if not rooms:
+            raise BookingError("La habitación seleccionada no existe")
+        return rooms
+
+    people = reservation.people
+    free_rooms = Reserve.find_free_rooms(reservation)
+    if reservation.pk:
+        people -= sum(reservation.rooms.values_list("capacity", flat=True))
+        free_rooms = free_rooms.exclude(bookings__reserve=reservation)
+    if people <= 0:
+        return []
+    free_rooms = list(free_rooms.values_list("id", "capacity", "price"))
+    if not free_rooms:
+        raise BookingError("No hay habitaciones disponibles para la fecha seleccionada")
+    room_ids = solve(free_rooms, people, objective)
+    if room_ids is None:
+        raise BookingError("No hay habitaciones suficientes para el número de personas")
+    chosen = set(room_ids)
+    return [room for room in free_rooms if room[0] in chosen]
+
+
+def persist_booking(reservation, rooms):
+    """
+    Guarda la reserva y ocupa sus habitaciones en una transacción.
+
+    Args:
+        reservation (Reserve): Reserva a guardar (nueva o existente).
+        rooms (list): Tuplas (id, capacidad, precio) de las habitaciones.
+
+    Raises:
+        IntegrityError: Si alguna habitación ya está ocupada en esas fechas.
+    """
+    room_ids = [room_id for room_id, _, _ in rooms]
+    dates = Reserve.compute_occupied_dates(reservation)
+    is_new = reservation.pk is None
+    with transaction.atomic():
+        if room_ids:
+            Room.objects.filter(id__in=room_ids).locked()
+        reservation.save()
+        if room_ids:
+            RoomBooking.objects.bulk_create(
+                RoomBooking(reserve=reservation, room_id=room_id, period=reservation.period)
+                for room_id in room_ids
+            )
+            Room.objects.filter(id__in=room_ids).add_dates(dates)
+            # bulk_create y update() no emiten señales. El reparto del precio
+            # cambia también en las habitaciones que la reserva ya ocupaba.
+            summary_room_ids = room_ids
+            if not is_new:
+                summary_room_ids = reservation.bookings.values_list("room_id", flat=True)
+            summaries.refresh(reservation.starting_date, reservation.end_date, summary_room_ids)
+            transaction.on_commit(lambda: commit_occupancy_change(room_ids))
+
+
+def book_rooms(reservation, room_number=None, objective=FEWEST_ROOMS, set_price=False):
+    """
+    Planifica y persiste las habitaciones de una reserva.
+
+    Si otra transacción ocupa alguna habitación elegida entre la
+    planificación y la escritura, se vuelve a planificar.
+
+    Args:
+        reservation (Reserve): Reserva con fechas y número de personas.
+        room_number (int): Número de una habitación concreta (opcional).
+        objective (str): solver.FEWEST_ROOMS o solver.LOWEST_PRICE.
+        set_price (bool): Si es True, fija el precio a partir de las habitaciones elegidas.
+
+    Raises:
+        BookingError: Si no hay habitaciones que alojen la reserva.
+
+    Returns:
+        Reserve: La reserva guardada.
+    """
+    is_new = reservation.pk is None
+    for _ in range(ASSIGN_ATTEMPTS):
+        rooms = plan_rooms(reservation, room_number, objective)
+        if set_price:
+            reservation.price = sum(price for _, _, price in rooms) * reservation.nights
+        try:
+            persist_booking(reservation, rooms)
+            return reservation
+        except IntegrityError as error:
+            if "roombooking_no_overlap" not in str(error):
+                raise
+            # El motor en memoria de este proceso puede no conocer la otra reserva
+            engine.refresh_rooms(room_id for room_id, _, _ in rooms)
+            if is_new:
+                reservation.pk = None
+            if room_number:
+                break
+    raise BookingError("La habitación ya está ocupada en las fechas seleccionadas")
+
+
+def create_reservation(reservation, room_number=None, objective=FEWEST_ROOMS):
+    """
+    Crea una reserva nueva con sus habitaciones y su precio.
+
+    Args:
+        reservation (Reserve): Reserva sin guardar, con fechas, noches y personas.
+        room_number (int): Número de una habitación concreta (opcional).
+        objective (str): solver.FEWEST_ROOMS o solver.LOWEST_PRICE.
+
+    Raises:
+        BookingError: Si no hay habitaciones que alojen la reserva.
+
+    Returns:
+        Reserve: La reserva guardada.
+    """
+    reservation.occupied_dates = Reserve.compute_occupied_dates(reservation)
+    return book_rooms(reservation, room_number, objective, set_price=True)
+
+
+def quote_reservation(reservation, room_number=None, objective=FEWEST_ROOMS):
+    """
+    Presupuesta una estancia sin guardar la reserva.
+
+    Args:
+        reservation (Reserve): Reserva sin guardar, con fechas, noches y personas.
+        room_number (int): Número de una habitación concreta (opcional).
+        objective (str): solver.FEWEST_ROOMS o solver.LOWEST_PRICE.
+
+    Raises:
+        BookingError: Si no hay habitaciones que alojen la reserva.
+
+    Returns:
+        dict: Habitaciones propuestas, desglose por noche y precio total.
+    """
+    planned = plan_rooms(reservation, room_number, objective)
+    if room_number and not Reserve.find_free_rooms(reservation).filter(
+        id=planned[0][0]
+    ).exists():
+        raise BookingError("La habitación ya está ocupada en las fechas seleccionadas")
+    rooms = list(
+        Room.objects.filter(id__in=[room_id for room_id, _, _ in planned])
+        .only("id", "number", "capacity", "price")
+        .order_by("number")
+    )
+    reservation.calculate_price(rooms)
+    nightly = sum(room.price for room in rooms)
+    return {
+        "starting_date": reservation.starting_date,
+        "end_date": reservation.end_date,
+        "nights": reservation.nights,
+        "people": reservation.people,
+        "rooms": [
+            {"id": room.id, "number": room.number, "capacity": room.capacity, "price": room.price}
+            for room in rooms
+        ],
+        "breakdown": [
+            {"date": night, "price": nightly}
+            for night in Reserve.compute_occupied_dates(reservation)
+        ],
+        "total": reservation.price,
+    }
+
+
+def search_availability(reservation, objective=FEWEST_ROOMS):
+    """
+    Busca las habitaciones libres para una estancia y la mejor combinación.
+
+    Args:
+        reservation (Reserve): Reserva sin guardar, con fechas y personas.
+        objective (str): solver.FEWEST_ROOMS o solver.LOWEST_PRICE.
+
+    Returns:
+        dict: Habitaciones libres ordenadas por número y combinación propuesta
+        (None si no caben todas las personas).
+    """
+    rooms = list(
+        Reserve.find_free_rooms(reservation)
+        .order_by("number")
+        .values("id", "number", "capacity", "price")
+    )
+    room_ids = solve(
+        [(room["id"], room["capacity"], room["price"]) for room in rooms],
+        reservation.people,
+        objective,
+    )
+    combination = None
+    if room_ids is not None:
+        chosen = set(room_ids)
+        combination = {
+            "rooms": [room["id"] for room in rooms if room["id"] in chosen],
+            "total": sum(room["price"] for room in rooms if room["id"] in chosen)
+            * reservation.nights,
+        }
+    return {"rooms": rooms, "combination": combination}
@@ -0,0 +1,120 @@
+"""
+Señales que mantienen sincronizados el motor de disponibilidad en memoria,
+la versión de ocupación y los resúmenes diarios de ocupación e ingresos, y
+que encargan los derivados de las imágenes subidas.
+"""
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from room.availability import commit_occupancy_change
+from room.models import Room
+
+from . import derivatives, summaries
+from .models import Image, Reserve, RoomBooking
+
+
+@receiver(post_save, sender=RoomBooking)
+@receiver(post_delete, sender=RoomBooking)
+def refresh_room_availability(sender, instance, **kwargs):
+    """
+    Avanza la versión de ocupación, con la habitación afectada, cuando se
+    confirma la transacción; los motores la recargan en su próxima consulta.
+
+    Si la transacción se deshace, la versión no cambia.
+    """
+    transaction.on_commit(lambda: commit_occupancy_change([instance.room_id]))
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def update_room_availability(sender, instance, created=True, **kwargs):
+    """
+    Avanza la versión de ocupación cuando cambian las habitaciones: las
+    altas y bajas obligan a reconstruir los motores y las modificaciones
+    (la capacidad) recargan solo la habitación.
+    """
+    if created:
+        transaction.on_commit(commit_occupancy_change)
+    else:
+        transaction.on_commit(lambda: commit_occupancy_change([instance.id]))
+
+
+def reserve_room_ids(reserve_id):
+    """Ids de las habitaciones que ocupa una reserva."""
+    return RoomBooking.objects.filter(reserve_id=reserve_id).values_list("room_id", flat=True)
+
+
+@receiver(pre_save, sender=RoomBooking)
+def remember_booking_period(sender, instance, **kwargs):
+    """Guarda el periodo anterior de una ocupación que se modifica."""
+    instance.previous_period = None
+    if instance.pk:
+        instance.previous_period = (
+            RoomBooking.objects.filter(pk=instance.pk).values_list("period", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=RoomBooking)
+@receiver(post_delete, sender=RoomBooking)
+def refresh_booking_summary(sender, instance, **kwargs):
+    """Recalcula los resúmenes de las noches ocupadas antes y después del cambio."""
+    periods = [instance.period, getattr(instance, "previous_period", None)]
+    periods = [period for period in periods if period]
+    # El reparto del precio depende de todas las habitaciones de la reserva
+    room_ids = {instance.room_id, *reserve_room_ids(instance.reserve_id)}
+    summaries.refresh(
+        min(period.lower for period in periods),
+        max(period.upper for period in periods),
+        room_ids,
+    )
+
+
+@receiver(post_save, sender=Reserve)
+def refresh_reserve_summary(sender, instance, created, **kwargs):
+    """
+    Recalcula los resúmenes cuando cambian el precio, el pago o las fechas.
+
+    Una reserva nueva todavía no ocupa habitaciones; sus ocupaciones
+    recalculan los resúmenes al crearse.
+    """
+    if created:
+        return
+    summaries.refresh(instance.starting_date, instance.end_date, reserve_room_ids(instance.pk))
+
+
+@receiver(m2m_changed, sender=RoomBooking)
+def refresh_rooms_summary(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Recalcula los resúmenes al añadir o quitar habitaciones con rooms.add(),
+    rooms.remove() o rooms.clear(), que no emiten post_save ni post_delete.
+    """
+    if not reverse:
+        if action in ("post_add", "post_remove"):
+            room_ids = pk_set | set(reserve_room_ids(instance.pk))
+            summaries.refresh(instance.starting_date, instance.end_date, room_ids)
+        elif action == "post_clear":
+            summaries.refresh(instance.starting_date, instance.end_date, None)
+        return
+    # Desde la habitación: se recalcula la habitación en cada reserva afectada
+    if action == "pre_clear":
+        instance.cleared_periods = list(instance.bookings.values_list("period", flat=True))
+    elif action in ("post_add", "post_remove"):
+        for reservation in Reserve.objects.filter(pk__in=pk_set).only(
+            "starting_date", "end_date"
+        ):
+            room_ids = {instance.pk, *reserve_room_ids(reservation.pk)}
+            summaries.refresh(reservation.starting_date, reservation.end_date, room_ids)
+    elif action == "post_clear":
+        for period in instance.cleared_periods:
+            summaries.refresh(period.lower, period.upper, None)
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_save, sender=Image)
+def schedule_derivatives(sender, instance, **kwargs):
+    """Genera fuera de la petición los derivados de una imagen nueva."""
+    for model, file_field, derivatives_field in derivatives.TARGETS:
+        if sender is model and derivatives.is_stale(instance, file_field, derivatives_field):
+            derivatives.schedule(instance, file_field, derivatives_field)
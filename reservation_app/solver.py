@@ -0,0 +1,82 @@
+"""
+Asignación óptima de habitaciones a una reserva.
+
+Dado un conjunto de habitaciones libres, elige la combinación que cubre el
+número de personas con el menor número de habitaciones (desempatando por
+precio) o con el menor precio (desempatando por número de habitaciones).
+
+Se resuelve como una mochila 0/1 de cobertura mediante programación
+dinámica sobre las plazas cubiertas (0..people). Antes se descartan las
+habitaciones que nunca pueden formar parte de una solución óptima: de cada
+capacidad basta con las ceil(people / capacidad) más baratas, y todas las
+habitaciones con capacidad >= people son equivalentes. La poda es lineal
+en el número de habitaciones y la programación dinámica solo depende del
+número de personas.
+"""
+
+from collections import defaultdict
+from heapq import nsmallest
+from math import ceil
+
+FEWEST_ROOMS = "rooms"
+LOWEST_PRICE = "price"
+
+
+def candidate_rooms(rooms, people):
+    """
+    Reduce las habitaciones libres a las que pueden aparecer en una solución.
+
+    Args:
+        rooms (iterable): Tuplas (id, capacidad, precio).
+        people (int): Número de personas a alojar.
+
+    Returns:
+        list: Tuplas (id, capacidad útil, precio) candidatas.
+    """
+    by_capacity = defaultdict(list)
+    for room_id, capacity, price in rooms:
+        if capacity > 0:
+            by_capacity[min(capacity, people)].append((price, room_id))
+    candidates = []
+    for capacity in sorted(by_capacity, reverse=True):
+        cheapest = nsmallest(ceil(people / capacity), by_capacity[capacity])
+        candidates.extend((room_id, capacity, price) for price, room_id in cheapest)
+    return candidates
+
+
+def solve(rooms, people, objective=FEWEST_ROOMS):
+    """
+    Elige las habitaciones que alojan a `people` personas.
+
+    Args:
+        rooms (iterable): Tuplas (id, capacidad, precio) de habitaciones libres.
+        people (int): Número de personas a alojar.
+        objective (str): FEWEST_ROOMS o LOWEST_PRICE.
+
+    Returns:
+        list: Ids de las habitaciones elegidas, o None si no caben.
+    """
+    if people <= 0:
+        return []
+    if objective not in (FEWEST_ROOMS, LOWEST_PRICE):
+        raise ValueError(f"Objetivo de asignación desconocido: {objective}")
+
+    # best[c]: (clave, ids) de la mejor selección que cubre c plazas
+    best = [None] * (people + 1)
+    best[0] = ((0, 0), ())
+    for room_id, capacity, price in candidate_rooms(rooms, people):
+        for covered in range(people - 1, -1, -1):
+            if best[covered] is None:
+                continue
+            (first, second), ids = best[covered]
+            if objective == FEWEST_ROOMS:
+                key = (first + 1, second + price)
+            else:
+                key = (first + price, second + 1)
+            target = min(people, covered + capacity)
+            if best[target] is None or key < best[target][0]:
+                best[target] = (key, ids + (room_id,))
+
+    if best[people] is None:
+        return None
+    return list(best[people][1])
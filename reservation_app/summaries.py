@@ -0,0 +1,97 @@
+"""
+Resúmenes diarios de ocupación e ingresos.
+
+DailyRoomSummary y DailySummary se recalculan por ventanas de fechas con la
+función refresh_occupancy_summary de PostgreSQL (migración
+0026_daily_summaries): una sola sentencia desde Python que borra y vuelve a
+calcular los días de la ventana a partir de RoomBooking. Al ser un
+recálculo y no un incremento, los resúmenes no acumulan errores.
+
+Cada cambio en una reserva recalcula solo sus noches, pero no dentro de su
+transacción: refresh lo encarga a transaction.on_commit y se ejecuta en una
+transacción propia y breve, de modo que la reserva no retiene el bloqueo
+que serializa los recálculos. Si el proceso termina entre la confirmación
+y el recálculo, rebuild_summaries lo corrige.
+
+Los cambios se detectan con señales (ver signals.py); las escrituras que no
+emiten señales, como el bulk_create de services.persist_booking, llaman a
+refresh directamente. rebuild recalcula todo desde cero; la migración
+0031_backfill_daily_summaries rellena los resúmenes de las reservas
+anteriores a ellos.
+"""
+
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from .models import DailyRoomSummary, DailySummary, Reserve
+
+# Días por sentencia al reconstruir, para acotar la memoria de cada una
+REBUILD_DAYS = 31
+
+
+def refresh(starting_date, end_date, room_ids=None):
+    """
+    Recalcula los resúmenes de las noches [starting_date, end_date) cuando
+    se confirme la transacción en curso (o ya, si no hay ninguna).
+
+    Args:
+        starting_date (date): Primera noche a recalcular.
+        end_date (date): Día siguiente a la última noche.
+        room_ids (iterable): Habitaciones a recalcular (por defecto, todas).
+    """
+    if starting_date >= end_date:
+        return
+    if room_ids is not None:
+        room_ids = list(room_ids)
+    transaction.on_commit(lambda: refresh_now(starting_date, end_date, room_ids))
+
+
+def refresh_now(starting_date, end_date, room_ids=None):
+    """
+    Recalcula los resúmenes de las noches [starting_date, end_date) en la
+    transacción en curso.
+
+    Args:
+        starting_date (date): Primera noche a recalcular.
+        end_date (date): Día siguiente a la última noche.
+        room_ids (list): Habitaciones a recalcular (por defecto, todas).
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT refresh_occupancy_summary(%s, %s, %s::bigint[])",
+            [starting_date, end_date, room_ids],
+        )
+
+
+def rebuild():
+    """
+    Reconstruye todos los resúmenes a partir de las reservas.
+
+    Todo ocurre en una transacción: hasta que termina, las consultas siguen
+    viendo los resúmenes anteriores completos y nunca unos a medio rellenar.
+    Las tablas se bloquean frente a otras escrituras (no frente a lecturas)
+    y se recalculan por tramos de REBUILD_DAYS días.
+
+    Returns:
+        int: Número de días recalculados.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "LOCK TABLE {}, {} IN EXCLUSIVE MODE".format(
+                    DailyRoomSummary._meta.db_table, DailySummary._meta.db_table
+                )
+            )
+        dates = Reserve.objects.aggregate(start=Min("starting_date"), end=Max("end_date"))
+        DailyRoomSummary.objects.all().delete()
+        DailySummary.objects.all().delete()
+        if dates["start"] is None:
+            return 0
+        day = dates["start"]
+        while day < dates["end"]:
+            stop = min(day + timedelta(days=REBUILD_DAYS), dates["end"])
+            refresh_now(day, stop)
+            day = stop
+    return (dates["end"] - dates["start"]).days
@@ -1,69 +1,95 @@
 # Template tags for Azure storage SAS URLs
 from django import template
 from django.conf import settings
-from datetime import datetime, timedelta
-from azure.storage.blob import generate_blob_sas, BlobSasPermissions
+from django.core.files.storage import default_storage
 import logging
 
+from reservation import sas
+
 register = template.Library()
 logger = logging.getLogger(__name__)
 
+# Attribute of the request that memoizes the URLs signed while rendering it
+REQUEST_MEMO = "_azure_urls"
+
+
+def _configured():
+    return bool(getattr(settings, 'AZURE_ACCOUNT_NAME', None))
+
 
-@register.simple_tag
-def azure_media_url(file_path, expire_hours=1):
+def _signer():
+    """Signer shared with AzureMediaStorage and AzureStaticStorage"""
+    return sas.signer(settings.AZURE_ACCOUNT_NAME, settings.AZURE_ACCOUNT_KEY, settings.AZURE_CONTAINER)
+
+
+def _memo(context):
+    """
+    URLs already signed for this request, or a throwaway dict when the
+    template is rendered without one
+    """
+    request = context.get('request')
+    if request is None:
+        return {}
+    memo = getattr(request, REQUEST_MEMO, None)
+    if memo is None:
+        memo = {}
+        setattr(request, REQUEST_MEMO, memo)
+    return memo
+
+
+def _signed_url(memo, location, file_path, expire_secs, fallback):
+    """
+    Signed URL for `location/file_path`, computed at most once per request
+    """
+    key = (location, file_path, expire_secs)
+    url = memo.get(key)
+    if url is None:
+        try:
+            url = _signer().url(f"{location}/{file_path}", expire_secs)
+        except Exception as e:
+            logger.error(f"Error generating SAS token for {location}/{file_path}: {e}")
+            url = fallback(file_path)
+        memo[key] = url
+    return url
+
+
+def media_url(context, name, expire_hours=1):
+    """
+    URL of a media file: signed at most once per request with Azure, from
+    the default storage otherwise
+    """
+    if _configured():
+        return _signed_url(
+            _memo(context), 'media', name, int(expire_hours * 3600), default_storage.url
+        )
+    return default_storage.url(name)
+
+
+@register.simple_tag(takes_context=True)
+def azure_media_url(context, file_path, expire_hours=1):
     """
     Generate a secure URL with SAS token for media files
     Usage: {% azure_media_url "path/to/file.jpg" %}
     """
-    if not hasattr(settings, 'AZURE_ACCOUNT_NAME') or not settings.AZURE_ACCOUNT_NAME:
+    if not _configured():
         return file_path
-        
-    try:
-        # Generate SAS token
-        sas_token = generate_blob_sas(
-            account_name=settings.AZURE_ACCOUNT_NAME,
-            account_key=settings.AZURE_ACCOUNT_KEY,
-            container_name=settings.AZURE_CONTAINER,
-            blob_name=f"media/{file_path}",
-            permission=BlobSasPermissions(read=True),
-            expiry=datetime.utcnow() + timedelta(hours=expire_hours)
-        )
-        
-        # Build URL with SAS token
-        blob_url = f"https://{settings.AZURE_ACCOUNT_NAME}.blob.core.windows.net/{settings.AZURE_CONTAINER}/media/{file_path}"
-        return f"{blob_url}?{sas_token}"
-        
-    except Exception as e:
-        logger.error(f"Error generating SAS token for {file_path}: {e}")
-        # Fallback to MEDIA_URL + file_path
-        return f"{settings.MEDIA_URL}{file_path}"
-
-
-@register.simple_tag
-def azure_static_url(file_path, expire_hours=24):
+
+    return _signed_url(
+        _memo(context), 'media', file_path, int(expire_hours * 3600),
+        lambda path: f"{settings.MEDIA_URL}{path}",
+    )
+
+
+@register.simple_tag(takes_context=True)
+def azure_static_url(context, file_path, expire_hours=24):
     """
     Generate a secure URL with SAS token for static files
     Usage: {% azure_static_url "css/style.css" %}
     """
-    if not hasattr(settings, 'AZURE_ACCOUNT_NAME') or not settings.AZURE_ACCOUNT_NAME:
+    if not _configured():
         return file_path
-        
-    try:
-        # Generate SAS token
-        sas_token = generate_blob_sas(
-            account_name=settings.AZURE_ACCOUNT_NAME,
-            account_key=settings.AZURE_ACCOUNT_KEY,
-            container_name=settings.AZURE_CONTAINER,
-            blob_name=f"static/{file_path}",
-            permission=BlobSasPermissions(read=True),
-            expiry=datetime.utcnow() + timedelta(hours=expire_hours)
-        )
-        
-        # Build URL with SAS token
-        blob_url = f"https://{settings.AZURE_ACCOUNT_NAME}.blob.core.windows.net/{settings.AZURE_CONTAINER}/static/{file_path}"
-        return f"{blob_url}?{sas_token}"
-        
-    except Exception as e:
-        logger.error(f"Error generating SAS token for static file {file_path}: {e}")
-        # Fallback to STATIC_URL + file_path
-        return f"{settings.STATIC_URL}{file_path}"
+
+    return _signed_url(
+        _memo(context), 'static', file_path, int(expire_hours * 3600),
+        lambda path: f"{settings.STATIC_URL}{path}",
+    )
@@ -0,0 +1,49 @@
+# Template tags for responsive, lazily loaded images (see reservation_app/derivatives.py)
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from .azure_tags import media_url
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def srcset(context, derivatives, image_format="webp"):
+    """
+    srcset attribute value for the derivatives of one format
+    Usage: <source srcset="{% srcset room.photo_derivatives "webp" %}">
+    """
+    return ", ".join(
+        f"{media_url(context, name)} {width}w"
+        for width, name in (derivatives or {}).get(image_format, [])
+    )
+
+
+@register.simple_tag(takes_context=True)
+def responsive_image(context, field_file, derivatives, sizes="100vw", **attrs):
+    """
+    Lazily loaded <picture> with WebP and JPEG srcsets and the original as fallback
+    Usage: {% responsive_image room.photo room.photo_derivatives sizes="40vw" class="card-img-top" alt="..." %}
+
+    Without derivatives (not generated yet) it renders a plain lazy <img>.
+    """
+    if not field_file:
+        return ''
+    attributes = format_html_join(
+        ' ', '{}="{}"', ((key.replace('_', '-'), value) for key, value in attrs.items())
+    )
+    src = media_url(context, field_file.name)
+    if not derivatives or derivatives.get('source') != field_file.name:
+        return format_html(
+            '<img src="{}" loading="lazy" decoding="async" {}>', src, attributes
+        )
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" loading="lazy" decoding="async" {}></picture>',
+        srcset(context, derivatives, 'webp'),
+        sizes,
+        src,
+        srcset(context, derivatives, 'jpeg'),
+        sizes,
+        attributes,
+    )
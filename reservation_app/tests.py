@@ -1,8 +1,40 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import re
+import tempfile
+import threading
+import time
+import unittest
+import unittest.mock
+from importlib import import_module
+from pathlib import Path
+
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
 from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image as PILImage
+from django.core.files.storage import InMemoryStorage
+from django.core.management import call_command
+from django.utils import timezone
+from django.utils.html import escape
 from room.models import Room
-from .models import Reserve, Image
+from .models import DailyRoomSummary, DailySummary, Reserve, Image, RoomBooking
+from . import analytics, derivatives, exports, partitions, services, summaries
+from .pagination import keyset_filter
+from .solver import LOWEST_PRICE, solve
 from customer.models import Customer
+from reservation import sas
+from reservation.azure_storage_backends import AzureMediaStorage
+from reservation.emulated_storage import EmulatedBlobStorage, EmulatedStorageError, per_operation
+from reservation.uploads import UniqueNameMixin, UniqueUploadTo, is_unique_name
 from datetime import date, timedelta
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
@@ -22,7 +54,7 @@ class ReserveModelTest(TestCase):
             people=2,
             price=300.00
         )
-        cls.reserve.rooms.add(cls.room)
+        cls.reserve.rooms.add(cls.room, through_defaults={"period": cls.reserve.period})
 
     def test_reserve_creation(self):
         self.assertEqual(self.reserve.user.username, 'testuser')
@@ -45,6 +77,246 @@ class ReserveModelTest(TestCase):
         self.reserve.assign_room()
         self.assertTrue(self.reserve.rooms.filter(number=101).exists())
 
+    def test_assign_room_covers_people_with_fewest_rooms(self):
+        Room.objects.create(number=102, capacity=2, price=50.00)
+        Room.objects.create(number=103, capacity=4, price=150.00)
+        reserve = Reserve.objects.create(
+            user=self.user,
+            customer=self.customer,
+            starting_date=date.today(),
+            nights=3,
+            end_date=date.today() + timedelta(days=3),
+            people=4,
+        )
+        self.assertTrue(reserve.assign_room())
+        self.assertEqual(list(reserve.rooms.values_list("number", flat=True)), [103])
+
+    def test_assign_room_without_capacity(self):
+        reserve = Reserve.objects.create(
+            user=self.user,
+            customer=self.customer,
+            starting_date=date.today(),
+            nights=3,
+            end_date=date.today() + timedelta(days=3),
+            people=2,
+        )
+        self.assertFalse(reserve.assign_room())
+        self.assertFalse(reserve.rooms.exists())
+
+    def test_find_free_rooms_excludes_occupied_rooms(self):
+        free_room = Room.objects.create(number=102, capacity=2, price=80.00)
+        other = Reserve(
+            starting_date=date.today() + timedelta(days=1),
+            end_date=date.today() + timedelta(days=2),
+        )
+        free_rooms = other.find_free_rooms()
+        self.assertIn(free_room, free_rooms)
+        self.assertNotIn(self.room, free_rooms)
+        self.assertIn(self.room, self.reserve.find_free_rooms())
+
+    def test_overlapping_booking_is_rejected(self):
+        other = Reserve.objects.create(
+            user=self.user,
+            customer=self.customer,
+            starting_date=date.today() + timedelta(days=2),
+            nights=2,
+            end_date=date.today() + timedelta(days=4),
+            people=2,
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.room.reserve_dates(other)
+        self.assertFalse(RoomBooking.objects.filter(reserve=other).exists())
+
+    def test_adjacent_booking_is_allowed(self):
+        other = Reserve.objects.create(
+            user=self.user,
+            customer=self.customer,
+            starting_date=date.today() + timedelta(days=3),
+            nights=2,
+            end_date=date.today() + timedelta(days=5),
+            people=2,
+        )
+        self.room.reserve_dates(other)
+        self.assertTrue(other.rooms.filter(id=self.room.id).exists())
+
+class CreateReservationServiceTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser', password='12345')
+        cls.customer = Customer.objects.create(user=cls.user, name="Test Customer")
+        for number in range(1, 6):
+            Room.objects.create(number=number, capacity=2, price=50.00)
+
+    def build(self, people):
+        return Reserve(
+            user=self.user,
+            customer=self.customer,
+            starting_date=date.today(),
+            nights=2,
+            end_date=date.today() + timedelta(days=2),
+            people=people,
+        )
+
+    def test_create_reservation(self):
+        reservation = services.create_reservation(self.build(4))
+        self.assertEqual(reservation.rooms.count(), 2)
+        self.assertEqual(reservation.price, 200.00)
+        self.assertEqual(len(reservation.occupied_dates), 2)
+        for room in reservation.rooms.all():
+            self.assertEqual(room.occupied_dates, reservation.occupied_dates)
+
+    def test_query_count_does_not_depend_on_rooms(self):
+        with CaptureQueriesContext(connection) as one_room:
+            services.create_reservation(self.build(2))
+        with CaptureQueriesContext(connection) as three_rooms:
+            services.create_reservation(self.build(6))
+        self.assertEqual(len(one_room), len(three_rooms))
+        self.assertLessEqual(len(three_rooms), 8)
+
+    def test_not_enough_rooms(self):
+        with self.assertRaises(services.BookingError):
+            services.create_reservation(self.build(20))
+        self.assertFalse(Reserve.objects.exists())
+
+
+
+class DailySummaryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser', password='12345')
+        cls.customer = Customer.objects.create(user=cls.user, name="Test Customer")
+        Room.objects.create(number=1, capacity=2, price=100.00)
+        Room.objects.create(number=2, capacity=2, price=50.00)
+
+    def create(self, people=4, offset=0, nights=2):
+        starting_date = date.today() + timedelta(days=offset)
+        with self.captureOnCommitCallbacks(execute=True):
+            return services.create_reservation(
+                Reserve(
+                    user=self.user,
+                    customer=self.customer,
+                    starting_date=starting_date,
+                    nights=nights,
+                    end_date=starting_date + timedelta(days=nights),
+                    people=people,
+                )
+            )
+
+    def summary(self):
+        return list(
+            DailySummary.objects.order_by('date').values_list(
+                'date', 'room_nights', 'revenue', 'paid_revenue', 'unpaid_revenue'
+            )
+        )
+
+    def test_new_reservation(self):
+        self.create()
+        today = date.today()
+        self.assertEqual(
+            self.summary(),
+            [(today, 2, 150.0, 0.0, 150.0), (today + timedelta(days=1), 2, 150.0, 0.0, 150.0)],
+        )
+        # El precio se reparte entre habitaciones según su precio
+        room_revenue = DailyRoomSummary.objects.filter(date=today).order_by('room__number')
+        self.assertEqual([row.revenue for row in room_revenue], [100.0, 50.0])
+
+    def test_payment_and_cancellation(self):
+        reservation = self.create()
+        other = self.create(people=1, offset=2, nights=1)
+        reservation.paid = True
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.save()
+        self.assertEqual(self.summary()[0][3:], (150.0, 0.0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.delete()
+        self.assertEqual(
+            self.summary(), [(date.today() + timedelta(days=2), 1, other.price, 0.0, other.price)]
+        )
+
+    def test_changed_dates(self):
+        reservation = self.create(people=1)
+        room = reservation.rooms.get()
+        reservation.starting_date += timedelta(days=5)
+        reservation.end_date += timedelta(days=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.save()
+            room.reserve_dates(reservation)
+        self.assertEqual(
+            [row[0] for row in self.summary()],
+            [date.today() + timedelta(days=5), date.today() + timedelta(days=6)],
+        )
+
+    def test_rebuild_matches_incremental(self):
+        reservation = self.create()
+        self.create(people=2, offset=3, nights=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.rooms.remove(reservation.rooms.order_by('number').last())
+        incremental = self.summary()
+        DailySummary.objects.all().delete()
+        # Por tramos de dos días, para recorrer varios
+        with unittest.mock.patch.object(summaries, 'REBUILD_DAYS', 2):
+            call_command('rebuild_summaries', stdout=io.StringIO())
+        self.assertEqual(self.summary(), incremental)
+        self.assertEqual(len(incremental), 5)
+
+    def test_refresh_after_commit(self):
+        """La reserva no bloquea los resúmenes: se recalculan al confirmarse."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            services.create_reservation(
+                Reserve(
+                    user=self.user,
+                    customer=self.customer,
+                    starting_date=date.today(),
+                    nights=2,
+                    end_date=date.today() + timedelta(days=2),
+                    people=4,
+                )
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()"
+                )
+                self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertEqual(self.summary(), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(self.summary()), 2)
+
+    def test_backfill_migration(self):
+        """La migración rellena los resúmenes de las reservas existentes."""
+        self.create()
+        self.create(people=2, offset=3, nights=3)
+        expected = self.summary()
+        DailyRoomSummary.objects.all().delete()
+        DailySummary.objects.all().delete()
+        backfill = import_module('reservation_app.migrations.0031_backfill_daily_summaries')
+        with connection.cursor() as cursor:
+            cursor.execute(backfill.Migration.operations[0].sql)
+        self.assertEqual(self.summary(), expected)
+
+class SolverTest(TestCase):
+    rooms = [(1, 2, 50.0), (2, 2, 40.0), (3, 4, 120.0), (4, 6, 200.0), (5, 1, 10.0)]
+
+    def test_exact_fit_single_room(self):
+        self.assertEqual(solve(self.rooms, 4), [3])
+
+    def test_fewest_rooms(self):
+        self.assertEqual(solve(self.rooms, 6), [4])
+
+    def test_lowest_price(self):
+        self.assertEqual(sorted(solve(self.rooms, 5, LOWEST_PRICE)), [1, 2, 5])
+
+    def test_overshoot_prefers_cheapest_covering_room(self):
+        self.assertEqual(solve(self.rooms, 3), [3])
+
+    def test_not_enough_capacity(self):
+        self.assertIsNone(solve(self.rooms, 20))
+
+    def test_nobody_left(self):
+        self.assertEqual(solve(self.rooms, 0), [])
+
+
 class ImageModelTest(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -102,6 +374,175 @@ class ReserveViewTest(TestCase):
         self.assertEqual(response.status_code, 302)
         self.assertTrue(Reserve.objects.filter(customer=self.customer).exists())
 
+class QuoteViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser', password='12345')
+        Room.objects.create(number=101, capacity=2, price=100.00)
+        Room.objects.create(number=102, capacity=4, price=150.00)
+
+    def setUp(self):
+        self.client.login(username='testuser', password='12345')
+
+    def quote(self, **params):
+        data = {
+            'starting_date': date.today() + timedelta(days=1),
+            'end_date': date.today() + timedelta(days=3),
+            'people': 3,
+        }
+        data.update(params)
+        return self.client.get(reverse('quote_reservation'), data)
+
+    def test_quote(self):
+        response = self.quote()
+        self.assertEqual(response.status_code, 200)
+        quote = response.json()
+        self.assertEqual([room['number'] for room in quote['rooms']], [102])
+        self.assertEqual(len(quote['breakdown']), 2)
+        self.assertEqual(quote['breakdown'][0]['price'], 150.00)
+        self.assertEqual(quote['total'], 300.00)
+
+    def test_quote_does_not_write(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.quote(people=6)
+        self.assertFalse(Reserve.objects.exists())
+        self.assertFalse(
+            any(query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE')) for query in queries)
+        )
+
+    def test_quote_unavailable(self):
+        response = self.quote(people=7)
+        self.assertEqual(response.status_code, 409)
+
+    def test_quote_booked_room(self):
+        customer = Customer.objects.create(user=self.user, name="Test Customer")
+        reserve = Reserve.objects.create(
+            user=self.user,
+            customer=customer,
+            starting_date=date.today(),
+            nights=2,
+            end_date=date.today() + timedelta(days=2),
+            people=2,
+        )
+        reserve.rooms.add(
+            Room.objects.get(number=101), through_defaults={"period": reserve.period}
+        )
+        self.assertEqual(self.quote(room=101, people=2).status_code, 409)
+
+    def test_quote_invalid(self):
+        response = self.quote(people=0)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('people', response.json()['errors'])
+
+    def test_quote_missing_starting_date(self):
+        response = self.client.get(
+            reverse('quote_reservation'), {'end_date': '2030-01-05', 'people': 2}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('starting_date', response.json()['errors'])
+
+    def test_quote_bad_dates(self):
+        response = self.quote(starting_date='2030-13-40')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('starting_date', response.json()['errors'])
+        response = self.quote(end_date=date.today())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('end_date', response.json()['errors'])
+
+    @override_settings(STAY_MAX_PEOPLE=20, STAY_MAX_NIGHTS=30)
+    def test_quote_limits(self):
+        response = self.quote(people=10**8)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('people', response.json()['errors'])
+        response = self.quote(end_date=date.today() + timedelta(days=10000))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('end_date', response.json()['errors'])
+
+
+class AvailabilitySearchViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser', password='12345')
+        cls.customer = Customer.objects.create(user=cls.user, name="Test Customer")
+        for number in range(1, 6):
+            Room.objects.create(number=number, capacity=2, price=50.00)
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='testuser', password='12345')
+
+    def search(self, **extra):
+        params = {
+            'starting_date': date.today() + timedelta(days=1),
+            'end_date': date.today() + timedelta(days=3),
+            'people': 3,
+        }
+        params.update(extra.pop('params', {}))
+        return self.client.get(reverse('search_availability'), params, **extra)
+
+    def test_search(self):
+        response = self.search()
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(len(data['combination']['rooms']), 2)
+        self.assertEqual(data['combination']['total'], 200.00)
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_pagination(self):
+        data = self.search(params={'page': 2, 'page_size': 2}).json()
+        self.assertEqual([room['number'] for room in data['rooms']], [3, 4])
+        self.assertEqual(data['num_pages'], 3)
+
+    def test_not_modified(self):
+        etag = self.search()['ETag']
+        response = self.search(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_booking_changes_etag(self):
+        etag = self.search()['ETag']
+        reservation = Reserve(
+            user=self.user,
+            customer=self.customer,
+            starting_date=date.today() + timedelta(days=2),
+            nights=1,
+            end_date=date.today() + timedelta(days=3),
+            people=2,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            services.create_reservation(reservation)
+        response = self.search(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['count'], 4)
+
+    def test_missing_or_bad_starting_date(self):
+        for starting_date in (None, 'mañana'):
+            params = {'end_date': date.today() + timedelta(days=3), 'people': 3}
+            if starting_date:
+                params['starting_date'] = starting_date
+            response = self.client.get(reverse('search_availability'), params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('starting_date', response.json()['errors'])
+
+    @override_settings(STAY_MAX_PEOPLE=20, STAY_MAX_NIGHTS=30)
+    def test_limits(self):
+        start = date.today() + timedelta(days=1)
+        for params in (
+            {'end_date': start + timedelta(days=3), 'people': 10**8},
+            {'end_date': start + timedelta(days=10000), 'people': 2},
+        ):
+            response = self.client.get(reverse('search_availability'), dict(params, starting_date=start))
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(len(response.json()['errors']), 1)
+
+    def test_repeated_search_is_cached(self):
+        self.search()
+        with CaptureQueriesContext(connection) as queries:
+            self.search()
+        self.assertFalse(any('room_room' in query['sql'] for query in queries))
+
+
 class ShowReservationsViewTest(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -123,7 +564,7 @@ class ShowReservationsViewTest(TestCase):
             people=2,
             price=300.00
         )
-        cls.reserve.rooms.add(cls.room)
+        cls.reserve.rooms.add(cls.room, through_defaults={"period": cls.reserve.period})
 
     def test_show_reservations(self):
         self.client.login(username='testuser', password='12345')
@@ -132,6 +573,483 @@ class ShowReservationsViewTest(TestCase):
         self.assertTemplateUsed(response, 'reservation_app/show_reservations.html')
         self.assertContains(response, 'Test Customer')        
 
+    def test_query_count_does_not_depend_on_rows(self):
+        self.client.login(username='testuser', password='12345')
+        with CaptureQueriesContext(connection) as one_reservation:
+            self.client.get(reverse('show_reservations'))
+        for i in range(5):
+            user = User.objects.create_user(username=f'guest{i}')
+            customer = Customer.objects.create(user=user, name=f"Guest {i}")
+            starting_date = date.today() + timedelta(days=10 * (i + 1))
+            reserve = Reserve.objects.create(
+                user=self.user,
+                customer=customer,
+                starting_date=starting_date,
+                nights=2,
+                end_date=starting_date + timedelta(days=2),
+                people=4,
+            )
+            for number in (200 + 2 * i, 201 + 2 * i):
+                room = Room.objects.create(number=number, capacity=2, price=50.00)
+                reserve.rooms.add(room, through_defaults={"period": reserve.period})
+        with CaptureQueriesContext(connection) as many_reservations:
+            response = self.client.get(reverse('show_reservations'))
+        self.assertContains(response, 'Guest 4')
+        self.assertContains(response, 'Habitación 209')
+        self.assertEqual(len(one_reservation), len(many_reservations))
+
+
+class ReservationPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='staff', password='12345', is_staff=True)
+        cls.user.user_permissions.add(Permission.objects.get(codename='view_reserve'))
+        cls.customer = Customer.objects.create(user=cls.user, name="Staff")
+        # Varias reservas por fecha para que el id desempate
+        for i in range(30):
+            starting_date = date.today() + timedelta(days=i // 3)
+            Reserve.objects.create(
+                user=cls.user,
+                customer=cls.customer,
+                starting_date=starting_date,
+                nights=1,
+                end_date=starting_date + timedelta(days=1),
+                people=1,
+                paid=i % 2 == 0,
+            )
+
+    def setUp(self):
+        self.client.login(username='staff', password='12345')
+
+    def collect(self, params):
+        seen = []
+        page = self.client.get(reverse('show_reservations'), params).context['page']
+        seen.extend(page)
+        while page.has_next:
+            params = dict(params, after=page.next_cursor)
+            page = self.client.get(reverse('show_reservations'), params).context['page']
+            seen.extend(page)
+        return seen
+
+    def test_pages_follow_ordering(self):
+        seen = self.collect({})
+        expected = list(Reserve.objects.order_by('-starting_date', 'id'))
+        self.assertEqual(seen, expected)
+
+    def test_pages_keep_filters(self):
+        seen = self.collect({'payment_status': 'unpaid'})
+        self.assertEqual(len(seen), 15)
+        self.assertFalse(any(reserve.paid for reserve in seen))
+
+    def test_previous_page(self):
+        first = self.client.get(reverse('show_reservations')).context['page']
+        second = self.client.get(
+            reverse('show_reservations'), {'after': first.next_cursor}
+        ).context['page']
+        previous = self.client.get(
+            reverse('show_reservations'), {'before': second.previous_cursor}
+        ).context['page']
+        self.assertEqual(previous.object_list, first.object_list)
+        self.assertFalse(previous.has_previous)
+
+    def test_deep_page_seeks_into_index(self):
+        first_day = date.today() - timedelta(days=4000)
+        Reserve.objects.bulk_create(
+            Reserve(
+                user=self.user,
+                customer=self.customer,
+                starting_date=first_day + timedelta(days=i),
+                nights=1,
+                end_date=first_day + timedelta(days=i + 1),
+                people=1,
+            )
+            for i in range(3000)
+        )
+        ordering = ['-starting_date', 'id']
+        deep = Reserve.objects.order_by(*ordering)[2500]
+        queryset = Reserve.objects.order_by(*ordering).filter(
+            keyset_filter(ordering, [deep.starting_date, deep.id])
+        )[:21]
+        self.assertEqual(queryset[0].starting_date, deep.starting_date - timedelta(days=1))
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE reservation_app_reserve")
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        plan = json.dumps(plan)
+        # Sin la cota sobre starting_date se descartan las 2500 filas anteriores
+        removed = sum(int(n) for n in re.findall(r'"Rows Removed by Filter": (\d+)', plan))
+        self.assertLess(removed, 100)
+        self.assertIn("starting_date <=", plan)
+
+    def test_search(self):
+        other = Customer.objects.create(
+            user=User.objects.create_user(username='guest'), name="Lucía", last_name="Pérez"
+        )
+        Reserve.objects.create(
+            user=self.user,
+            customer=other,
+            starting_date=date.today(),
+            nights=1,
+            end_date=date.today() + timedelta(days=1),
+            people=1,
+        )
+        response = self.client.get(reverse('show_reservations'), {'search': 'luc pér'})
+        self.assertEqual([reserve.customer.name for reserve in response.context['page']], ["Lucía"])
+
+    def test_search_pages(self):
+        """Las páginas de una búsqueda, ordenadas por relevancia, no pierden ni repiten reservas."""
+        seen = self.collect({'search': 'staff'})
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(len({reserve.id for reserve in seen}), 30)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('show_reservations'), {'after': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page'].has_previous)
+
+
+class ReservationDateFilterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='staff', password='12345', is_staff=True)
+        cls.user.user_permissions.add(Permission.objects.get(codename='view_reserve'))
+        cls.customer = Customer.objects.create(user=cls.user, name="Staff")
+        cls.today = date.today()
+        cls.reserves = {}
+        # Llega hoy, sale mañana / llegó ayer, sale hoy / llegó antes, sale después
+        for name, start, nights in (('today', 0, 1), ('leaving', -1, 1), ('long', -3, 6)):
+            starting_date = cls.today + timedelta(days=start)
+            cls.reserves[name] = Reserve.objects.create(
+                user=cls.user,
+                customer=cls.customer,
+                starting_date=starting_date,
+                nights=nights,
+                end_date=starting_date + timedelta(days=nights),
+                people=1,
+                paid=name == 'long',
+            )
+
+    def names(self, queryset):
+        ids = set(queryset.values_list('id', flat=True))
+        return sorted(name for name, reserve in self.reserves.items() if reserve.id in ids)
+
+    def test_in_house(self):
+        self.assertEqual(self.names(Reserve.objects.in_house(self.today)), ['long', 'today'])
+        self.assertEqual(
+            self.names(Reserve.objects.in_house(self.today - timedelta(days=1), self.today)),
+            ['leaving', 'long', 'today'],
+        )
+
+    def test_arrivals_and_departures(self):
+        self.assertEqual(self.names(Reserve.objects.arriving(self.today, self.today)), ['today'])
+        self.assertEqual(self.names(Reserve.objects.departing(self.today, self.today)), ['leaving'])
+
+    def test_view_filter(self):
+        self.client.login(username='staff', password='12345')
+        response = self.client.get(reverse('show_reservations'), {
+            'stay': 'in_house', 'date_from': self.today, 'payment_status': 'unpaid',
+        })
+        self.assertEqual(list(response.context['page']), [self.reserves['today']])
+
+    def test_view_invalid_range(self):
+        self.client.login(username='staff', password='12345')
+        response = self.client.get(reverse('show_reservations'), {
+            'date_from': self.today, 'date_to': self.today - timedelta(days=1),
+        })
+        self.assertEqual(len(response.context['page']), 3)
+
+
+
+class ReservePartitionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser', password='12345')
+        cls.customer = Customer.objects.create(user=cls.user, name="Test Customer")
+
+    def create(self, starting_date):
+        return Reserve.objects.create(
+            user=self.user,
+            customer=self.customer,
+            starting_date=starting_date,
+            nights=2,
+            end_date=starting_date + timedelta(days=2),
+            people=1,
+        )
+
+    def partition_of(self, reservation):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tableoid::regclass::text FROM reservation_app_reserve WHERE id = %s",
+                [reservation.id],
+            )
+            return cursor.fetchone()[0]
+
+    def test_future_partitions_and_default(self):
+        year = date.today().year
+        self.assertEqual(
+            self.partition_of(self.create(date(year + 2, 3, 1))), partitions.partition_name(year + 2)
+        )
+        far = self.create(date(year + 10, 3, 1))
+        self.assertEqual(self.partition_of(far), partitions.DEFAULT_PARTITION)
+
+        self.assertEqual(partitions.create_partitions(), [year + 10])
+        self.assertEqual(self.partition_of(far), partitions.partition_name(year + 10))
+        self.assertEqual(partitions.create_partitions(), [])
+
+    def test_date_filters_prune_partitions(self):
+        today = date.today()
+        plan = Reserve.objects.arriving(today, today + timedelta(days=7)).explain()
+        self.assertNotIn(partitions.partition_name(today.year + 2), plan)
+        self.assertNotIn(partitions.DEFAULT_PARTITION, plan)
+        plan = Reserve.objects.departing(today, today + timedelta(days=7)).explain()
+        self.assertNotIn(partitions.partition_name(today.year + 2), plan)
+
+    def test_detach_partition(self):
+        year = date.today().year
+        room = Room.objects.create(number=101, capacity=2, price=100.00)
+        current = self.create(date.today())
+        room.reserve_dates(current)
+        old = self.create(date(year + 1, 3, 1))
+        room.reserve_dates(old)
+        archived = partitions.detach_partition(year + 1)
+        self.assertEqual(list(Reserve.objects.all()), [current])
+        self.assertEqual(list(RoomBooking.objects.values_list('reserve_id', flat=True)), [current.id])
+        self.assertNotIn(
+            partitions.partition_name(year + 1), [name for name, _ in partitions.list_partitions()]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT reserve_id FROM "{archived[0]}"')
+            self.assertEqual(cursor.fetchall(), [(old.id,)])
+
+    def test_missing_default_partition(self):
+        """Sin partición por defecto, create_partitions la recrea antes de crear años."""
+        far = date(date.today().year + 10, 3, 1)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE reservation_app_reserve DETACH PARTITION {partitions.DEFAULT_PARTITION}"
+            )
+            cursor.execute(f"DROP TABLE {partitions.DEFAULT_PARTITION}")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.create(far)
+        self.assertEqual(partitions.create_partitions(), [])
+        self.assertEqual(self.partition_of(self.create(far)), partitions.DEFAULT_PARTITION)
+
+    def test_foreign_keys_reject_orphans(self):
+        """Las claves ajenas compuestas impiden filas de reservas inexistentes."""
+        reservation = self.create(date.today())
+        room = Room.objects.create(number=101, capacity=2, price=100.00)
+        room.reserve_dates(reservation)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RoomBooking.objects.create(reserve_id=reservation.id + 1000, room=room, period=reservation.period)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Image.objects.create(reserve_id=reservation.id + 1000, image='images/missing.jpg')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Reserve.objects.filter(id=reservation.id)._raw_delete(connection.alias)
+            connection.cursor().execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+    def test_foreign_keys_follow_date_changes(self):
+        """Cambiar la fecha de una reserva, incluso de año, no rompe sus referencias."""
+        reservation = self.create(date.today())
+        room = Room.objects.create(number=101, capacity=2, price=100.00)
+        room.reserve_dates(reservation)
+        Reserve.objects.filter(id=reservation.id).update(starting_date=date(date.today().year + 1, 3, 1))
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            cursor.execute(
+                'SELECT reserve_starting_date FROM reservation_app_reserve_rooms WHERE reserve_id = %s',
+                [reservation.id],
+            )
+            self.assertEqual(cursor.fetchone()[0], date(date.today().year + 1, 3, 1))
+
+    def test_image_foreign_key(self):
+        """La tabla intermedia de imágenes mantiene su clave ajena a las imágenes."""
+        reservation = self.create(date.today())
+        image = Image.objects.create(reserve=reservation, image='images/id.jpg')
+        reservation.images.add(image)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Image.objects.filter(id=image.id)._raw_delete(connection.alias)
+            connection.cursor().execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class CompactOccupiedDatesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser', password='12345')
+        cls.customer = Customer.objects.create(user=cls.user, name="Test Customer")
+        today = date.today()
+        cls.past = [today - timedelta(days=400 - i) for i in range(3)]
+        cls.future = [today + timedelta(days=i) for i in range(2)]
+        cls.rooms = [
+            Room.objects.create(
+                number=number, capacity=2, price=50.00, occupied_dates=cls.past + cls.future
+            )
+            for number in range(1, 4)
+        ]
+        cls.reserve = Reserve.objects.create(
+            user=cls.user,
+            customer=cls.customer,
+            starting_date=cls.past[0],
+            nights=3,
+            end_date=cls.past[0] + timedelta(days=3),
+            people=1,
+            occupied_dates=cls.past,
+        )
+
+    def test_compacts_past_dates_in_batches(self):
+        out = io.StringIO()
+        call_command('compact_occupied_dates', batch_size=2, stdout=out)
+        for room in Room.objects.all():
+            self.assertEqual(room.occupied_dates, self.future)
+        self.reserve.refresh_from_db()
+        self.assertEqual(self.reserve.occupied_dates, [])
+        self.assertIn("3 filas compactadas", out.getvalue())
+        self.assertNotIn(" 0 bytes liberados", out.getvalue())
+
+    def test_keep_days_and_release(self):
+        call_command('compact_occupied_dates', keep_days=399, stdout=io.StringIO())
+        room = Room.objects.get(number=1)
+        self.assertEqual(room.occupied_dates, self.past[1:] + self.future)
+        room.release_dates(self.future[:1])
+        room.refresh_from_db()
+        self.assertEqual(room.occupied_dates, self.past[1:] + self.future[1:])
+
+class ExportReservationsViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='staff', password='12345', is_staff=True)
+        cls.user.user_permissions.add(Permission.objects.get(codename='view_reserve'))
+        cls.customer = Customer.objects.create(user=cls.user, name="Ana", last_name="García")
+        room = Room.objects.create(number=101, capacity=2, price=50.00)
+        for i in range(3):
+            starting_date = date.today() + timedelta(days=i)
+            reserve = Reserve.objects.create(
+                user=cls.user,
+                customer=cls.customer,
+                starting_date=starting_date,
+                nights=1,
+                end_date=starting_date + timedelta(days=1),
+                people=1,
+                paid=i == 0,
+            )
+            reserve.rooms.add(room, through_defaults={"period": reserve.period})
+
+    def setUp(self):
+        self.client.login(username='staff', password='12345')
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_reservations'), params)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self.export())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['customer__last_name'], 'García')
+        self.assertEqual(rows[0]['room_numbers'], '101')
+
+    def test_csv_neutralizes_formulas(self):
+        """Los textos que una hoja de cálculo tomaría por fórmulas se prefijan con una comilla."""
+        Customer.objects.filter(id=self.customer.id).update(
+            name='=HYPERLINK("http://example.com")', last_name='@SUM(A1)'
+        )
+        Reserve.objects.update(price=-10)
+        row = next(csv.DictReader(io.StringIO(self.export())))
+        self.assertEqual(row['customer__name'], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(row['customer__last_name'], "'@SUM(A1)")
+        self.assertEqual(row['price'], '-10.0')
+        for value in ('+1', '-1', '\tcmd', '\rcmd'):
+            self.assertEqual(exports.csv_cell(value), "'" + value)
+        self.assertEqual(exports.csv_cell('Ana'), 'Ana')
+
+    def test_ndjson_with_filters(self):
+        lines = self.export(
+            format='ndjson', payment_status='unpaid', stay='arrivals',
+            date_from=date.today(), date_to=date.today() + timedelta(days=1),
+        )
+        rows = [json.loads(line) for line in lines.splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['starting_date'], str(date.today() + timedelta(days=1)))
+        self.assertEqual(rows[0]['room_numbers'], [101])
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse('export_reservations'), {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+
+
+class AnalyticsExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='staff', password='12345')
+        cls.customer = Customer.objects.create(
+            user=cls.user, name="Ana", last_name="García", card_number="4111111111111111"
+        )
+        cls.room = Room.objects.create(number=101, capacity=2, price=50.00)
+        cls.reserves = []
+        for i in range(3):
+            starting_date = date.today() + timedelta(days=2 * i)
+            reserve = Reserve.objects.create(
+                user=cls.user,
+                customer=cls.customer,
+                starting_date=starting_date,
+                nights=2,
+                end_date=starting_date + timedelta(days=2),
+                people=1,
+                price=100,
+            )
+            reserve.rooms.add(cls.room, through_defaults={"period": reserve.period})
+            cls.reserves.append(reserve)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def read(self, table, suffix=".parquet"):
+        files = sorted((self.directory / table).glob(f"*[0-9]{suffix}"))
+        if suffix == ".parquet":
+            return analytics.pq.read_table(files[-1]).to_pylist()
+        return analytics.pa.ipc.open_file(files[-1]).read_all().to_pylist()
+
+    def test_full_export(self):
+        call_command('export_analytics', str(self.directory), stdout=io.StringIO())
+        reservations = self.read("reservations")
+        self.assertEqual([row["id"] for row in reservations], [r.id for r in self.reserves])
+        self.assertEqual(reservations[0]["starting_date"], date.today())
+        assignments = self.read("room_assignments")
+        self.assertEqual(assignments[1]["room_number"], 101)
+        self.assertEqual(assignments[1]["starting_date"], date.today() + timedelta(days=2))
+        self.assertEqual(assignments[1]["end_date"], date.today() + timedelta(days=4))
+        customers = self.read("customers")
+        self.assertEqual(customers[0]["last_name"], "García")
+        self.assertNotIn("card_number", customers[0])
+
+    def test_incremental_export(self):
+        Reserve.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        analytics.export(self.directory)
+        self.reserves[1].paid = True
+        self.reserves[1].save()
+        self.reserves[2].delete()
+
+        exported = analytics.export(self.directory, output="arrow")
+        self.assertEqual(exported["reservations"], 1)
+        changed = self.read("reservations", ".arrow")
+        self.assertEqual(changed[0]["id"], self.reserves[1].id)
+        self.assertTrue(changed[0]["paid"])
+        live = self.read("reservations", ".ids.arrow")
+        self.assertEqual([row["id"] for row in live], [r.id for r in self.reserves[:2]])
+
+    def test_updates_without_updated_at_are_not_exported(self):
+        """Los update() que no fijan updated_at solo tocan columnas no exportadas."""
+        for queryset, schema in analytics.tables().values():
+            self.assertNotIn("occupied_dates", schema.names)
+        Reserve.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        analytics.export(self.directory)
+        Room.objects.all().add_dates([date.today() - timedelta(days=30)])
+        Reserve.objects.update(occupied_dates=[date.today() - timedelta(days=30)])
+        call_command('compact_occupied_dates', stdout=io.StringIO())
+        self.assertEqual(analytics.export(self.directory)["reservations"], 0)
 
 class UploadImagesViewTest(TestCase):
     @classmethod
@@ -157,7 +1075,7 @@ class UploadImagesViewTest(TestCase):
             people=2,
             price=300.00
         )
-        cls.reserve.rooms.add(cls.room)
+        cls.reserve.rooms.add(cls.room, through_defaults={"period": cls.reserve.period})
     def test_upload_images_get(self):
         self.client.login(username='testuser', password='12345')
         response = self.client.get(reverse('upload_images', args=[self.reserve.id]))
@@ -169,4 +1087,291 @@ class UploadImagesViewTest(TestCase):
         with open('media/rooms/default.jpg', 'rb') as img:
             response = self.client.post(reverse('upload_images', args=[self.reserve.id]), {'image': img})
         self.assertEqual(response.status_code, 302)
-        self.assertTrue(Image.objects.filter(reserve=self.reserve).exists())
\ No newline at end of file
+        self.assertTrue(Image.objects.filter(reserve=self.reserve).exists())
+
+
+class ConcurrentBookingTest(TransactionTestCase):
+    """Varias reservas simultáneas compiten por la única habitación libre."""
+
+    parallel = 8
+
+    def setUp(self):
+        content_type = ContentType.objects.get_for_model(Reserve)
+        permission = Permission.objects.get(codename='add_reserve', content_type=content_type)
+        self.users = []
+        for i in range(self.parallel):
+            user = User.objects.create_user(username=f'guest{i}', password='12345')
+            user.user_permissions.add(permission)
+            Customer.objects.create(user=user, name=f"Guest {i}")
+            self.users.append(user)
+        self.room = Room.objects.create(number=101, capacity=2, price=100.00)
+
+    def book(self, user, barrier, statuses):
+        try:
+            client = self.client_class()
+            client.force_login(user)
+            barrier.wait()
+            response = client.post(reverse('create_reservation'), {
+                'starting_date': date.today() + timedelta(days=1),
+                'end_date': date.today() + timedelta(days=4),
+                'people': 2,
+            })
+            statuses.append(response.url)
+        finally:
+            connection.close()
+
+    def test_only_one_booking_wins(self):
+        barrier = threading.Barrier(self.parallel)
+        statuses = []
+        threads = [
+            threading.Thread(target=self.book, args=(user, barrier, statuses))
+            for user in self.users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(statuses), self.parallel)
+        self.assertEqual(statuses.count(reverse('show_reservations')), 1)
+        self.assertEqual(Reserve.objects.count(), 1)
+        self.assertEqual(RoomBooking.objects.filter(room=self.room).count(), 1)
+        self.room.refresh_from_db()
+        self.assertEqual(len(self.room.occupied_dates), 3)
+
+
+class SasSignerTest(SimpleTestCase):
+    def setUp(self):
+        self.now = 1_000_000.0
+        self.signer = sas.SasSigner(
+            "account", base64.b64encode(b"key").decode(), "media",
+            bucket_secs=900, max_entries=2, clock=lambda: self.now,
+        )
+
+    def test_same_url_within_bucket(self):
+        first = self.signer.url("media/rooms/a.jpg", 3600)
+        self.now += 100
+        self.assertEqual(self.signer.url("media/rooms/a.jpg", 3600), first)
+        self.assertEqual(self.signer.signatures, 1)
+        self.assertTrue(first.startswith("https://account.blob.core.windows.net/media/media/rooms/a.jpg?"))
+
+    def test_new_url_in_next_bucket(self):
+        first = self.signer.url("media/rooms/a.jpg", 3600)
+        self.now += 900
+        self.assertNotEqual(self.signer.url("media/rooms/a.jpg", 3600), first)
+        self.assertEqual(self.signer.signatures, 2)
+
+    def test_expiry_covers_requested_time(self):
+        for offset in (0, 450, 899.9):
+            expiry = self.signer.expiry(3600, self.now + offset)
+            self.assertGreaterEqual(expiry, self.now + offset + 3600)
+            self.assertLessEqual(expiry, self.now + offset + 3600 + 900)
+
+    def test_lru_eviction(self):
+        self.signer.token("a", 60)
+        self.signer.token("b", 60)
+        self.signer.token("a", 60)
+        self.signer.token("c", 60)
+        self.assertEqual(self.signer.signatures, 3)
+        self.signer.token("a", 60)
+        self.assertEqual(self.signer.signatures, 3)
+        self.signer.token("b", 60)
+        self.assertEqual(self.signer.signatures, 4)
+
+    def test_storage_uses_shared_signer(self):
+        key = base64.b64encode(b"storage-key").decode()
+        storage = AzureMediaStorage(account_name="account", account_key=key, azure_container="media")
+        signer = sas.signer("account", key, "media")
+        signer.clear()
+        signatures = signer.signatures
+        url = storage.url("rooms/a.jpg")
+        self.assertEqual(storage.url("rooms/a.jpg"), url)
+        self.assertEqual(signer.signatures, signatures + 1)
+        self.assertIn("/media/media/rooms/a.jpg?", url)
+
+
+AZURE_TEST_KEY = base64.b64encode(b"tags-key").decode()
+
+
+class AzureTagsTest(SimpleTestCase):
+    template = Template(
+        '{% load azure_tags image_tags %}'
+        '{% for derivatives in photos %}{% srcset derivatives "jpeg" %}|{% endfor %}'
+        '{% azure_media_url "rooms/a.jpg" %}'
+    )
+
+    def render(self, request, names):
+        photos = [{"jpeg": [[320, name]]} for name in names]
+        output = self.template.render(Context({"request": request, "photos": photos}))
+        return output.replace(" 320w", "")
+
+    def test_without_azure_uses_default_storage(self):
+        self.assertEqual(
+            self.render(RequestFactory().get("/"), ["rooms/a.jpg"]),
+            "/media/rooms/a.jpg|rooms/a.jpg",
+        )
+
+    @override_settings(AZURE_ACCOUNT_NAME="tags", AZURE_ACCOUNT_KEY=AZURE_TEST_KEY, AZURE_CONTAINER="media")
+    def test_image_tags_share_signer_and_memo(self):
+        signer = sas.signer("tags", AZURE_TEST_KEY, "media")
+        signer.clear()
+        signatures = signer.signatures
+        request = RequestFactory().get("/")
+        photos = ["rooms/a.jpg", "rooms/b.jpg", "rooms/a.jpg"]
+        urls = self.render(request, photos).split("|")
+        self.assertEqual(signer.signatures, signatures + 2)
+        self.assertEqual(urls[0], urls[2])
+        self.assertEqual(urls[0], urls[3])
+        self.assertIn("/media/media/rooms/b.jpg?", urls[1])
+        storage = AzureMediaStorage(account_name="tags", account_key=AZURE_TEST_KEY, azure_container="media")
+        self.assertEqual(escape(storage.url("rooms/a.jpg")), urls[0])
+        # La segunda pasada de la misma petición sale de la memoria
+        signer.clear()
+        self.assertEqual(self.render(request, photos).split("|"), urls)
+        self.assertEqual(signer.signatures, signatures + 2)
+
+
+class CountingStorage(UniqueNameMixin, InMemoryStorage):
+    exists_calls = 0
+
+    def exists(self, name):
+        self.exists_calls += 1
+        return super().exists(name)
+
+
+class UniqueUploadNameTest(SimpleTestCase):
+    def test_upload_to_replaces_name_with_uuid(self):
+        upload_to = UniqueUploadTo("images")
+        name = upload_to(None, "DNI Frontal.JPG")
+        self.assertRegex(name, r"^images/[0-9a-f]{32}\.jpg$")
+        self.assertNotEqual(upload_to(None, "DNI Frontal.JPG"), name)
+        self.assertRegex(upload_to(None, "scan"), r"^images/[0-9a-f]{32}$")
+        self.assertTrue(is_unique_name(name))
+        self.assertFalse(is_unique_name("images/scan.jpg"))
+
+    def test_unique_names_skip_exists(self):
+        storage = CountingStorage()
+        name = UniqueUploadTo("rooms")(None, "photo.jpg")
+        self.assertEqual(storage.save(name, ContentFile(b"photo")), name)
+        self.assertEqual(storage.exists_calls, 0)
+        storage.save("rooms/photo.jpg", ContentFile(b"photo"))
+        self.assertEqual(storage.exists_calls, 1)
+
+
+class EmulatedBlobStorageTest(SimpleTestCase):
+    def test_save_list_open_and_signed_url(self):
+        storage = EmulatedBlobStorage(base_url="/media/")
+        name = storage.save(UniqueUploadTo("rooms")(None, "a.jpg"), ContentFile(b"photo"))
+        self.assertEqual(storage.listdir("rooms"), ([], [name.split("/")[1]]))
+        with storage.open(name) as stored:
+            self.assertEqual(stored.read(), b"photo")
+        url = storage.url(name)
+        self.assertTrue(url.startswith(f"/media/{name}?se="))
+        self.assertIn("&sig=", url)
+        self.assertEqual(storage.url(name), url)
+        self.assertEqual(storage.requests["exists"], 0)
+        self.assertEqual(storage.requests["url"], 2)
+
+    def test_disk_backend_and_name_collisions(self):
+        with tempfile.TemporaryDirectory() as root:
+            storage = EmulatedBlobStorage(root=root)
+            first = storage.save("images/scan.jpg", ContentFile(b"1"))
+            second = storage.save("images/scan.jpg", ContentFile(b"2"))
+            self.assertNotEqual(first, second)
+            self.assertTrue(Path(root, second).exists())
+            overwriting = EmulatedBlobStorage(root=root, overwrite_files=True)
+            self.assertEqual(overwriting.save(first, ContentFile(b"3")), first)
+            self.assertEqual(Path(root, first).read_bytes(), b"3")
+
+    def test_latency_injection(self):
+        storage = EmulatedBlobStorage(latency="exists=30")
+        start = time.perf_counter()
+        storage.exists("images/scan.jpg")
+        self.assertGreaterEqual(time.perf_counter() - start, 0.03)
+        start = time.perf_counter()
+        storage.url("images/scan.jpg")
+        self.assertLess(time.perf_counter() - start, 0.03)
+
+    def test_failure_injection(self):
+        storage = EmulatedBlobStorage(failure_rate={"save": 1})
+        with self.assertRaises(EmulatedStorageError):
+            storage.save("images/scan.jpg", ContentFile(b"1"))
+        self.assertFalse(storage.exists("images/scan.jpg"))
+
+    def test_per_operation(self):
+        self.assertEqual(per_operation("exists=20,save=40"), {"exists": 20.0, "save": 40.0})
+        self.assertEqual(per_operation(5)["listdir"], 5.0)
+        self.assertEqual(per_operation(None), {})
+        with self.assertRaises(ValueError):
+            per_operation("head=20")
+
+
+def image_file(name, width, height, image_format="PNG"):
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (width, height), (120, 80, 40)).save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(
+    IMAGE_DERIVATIVES_ASYNC=False,
+    IMAGE_DERIVATIVE_WIDTHS=[320, 640, 1280],
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+)
+class ImageDerivativesTest(TestCase):
+    def create_room(self, number, photo):
+        with self.captureOnCommitCallbacks(execute=True):
+            room = Room.objects.create(number=number, price=50, photo=photo)
+        room.refresh_from_db()
+        return room
+
+    def test_upload_generates_derivatives(self):
+        room = self.create_room(1, image_file("photo.png", 2000, 1000))
+        result = room.photo_derivatives
+        self.assertEqual(result["source"], room.photo.name)
+        self.assertEqual(result["width"], 2000)
+        self.assertEqual([width for width, _ in result["webp"]], [320, 640, 1280])
+        width, name = result["webp"][0]
+        self.assertRegex(name, r"^rooms/derivatives/[0-9a-f]{32}-320\.webp$")
+        with room.photo.storage.open(name) as stored, PILImage.open(stored) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (320, 160)))
+        with room.photo.storage.open(result["jpeg"][-1][1]) as stored, PILImage.open(stored) as image:
+            self.assertEqual((image.format, image.size), ("JPEG", (1280, 640)))
+
+    def test_same_content_shares_derivatives(self):
+        first = self.create_room(1, image_file("a.png", 800, 600))
+        second = self.create_room(2, image_file("b.png", 800, 600))
+        self.assertNotEqual(first.photo.name, second.photo.name)
+        self.assertEqual(first.photo_derivatives["webp"], second.photo_derivatives["webp"])
+        self.assertEqual([width for width, _ in first.photo_derivatives["jpeg"]], [320, 640])
+
+    def test_narrow_image_is_not_enlarged(self):
+        room = self.create_room(1, image_file("small.jpg", 200, 100, "JPEG"))
+        self.assertEqual(room.photo_derivatives["webp"][0][0], 200)
+
+    def test_default_photo_left_to_command(self):
+        room = Room.objects.create(number=1, price=50)
+        self.assertFalse(derivatives.is_stale(room, "photo", "photo_derivatives"))
+        self.assertTrue(
+            derivatives.is_stale(room, "photo", "photo_derivatives", include_default=True)
+        )
+
+    def test_responsive_image_tag(self):
+        room = self.create_room(1, image_file("photo.png", 1000, 500))
+        template = Template(
+            '{% load image_tags %}{% responsive_image room.photo room.photo_derivatives '
+            'sizes="50vw" class="card-img-top" alt="Foto" %}'
+        )
+        html = template.render(Context({"room": room}))
+        self.assertIn('<source type="image/webp" srcset="', html)
+        self.assertIn("-320.webp 320w, ", html)
+        self.assertIn("-640.jpg 640w", html)
+        self.assertIn(f'src="/media/{room.photo.name}"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('class="card-img-top" alt="Foto"', html)
+        room.photo_derivatives = {}
+        html = template.render(Context({"room": room}))
+        self.assertNotIn("<picture>", html)
+        self.assertIn('loading="lazy"', html)
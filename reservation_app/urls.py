@@ -5,9 +5,12 @@ from .views import (
     show_reservations,
     update_reservation,
     delete_reservation,
+    export_reservations,
     upload_images,
     select_room,
     change_room,
+    quote_reservation,
+    search_availability,
     welcome
 )
 
@@ -16,7 +19,10 @@ register_converter(converters.DateConverter, "date")
 
 urlpatterns = [
     path("create/", create_reservation, name="create_reservation"),
+    path("quote/", quote_reservation, name="quote_reservation"),
+    path("availability/", search_availability, name="search_availability"),
     path("show/", show_reservations, name="show_reservations"),
+    path("export/", export_reservations, name="export_reservations"),
     path("update/<int:id>/", update_reservation, name="update_reservation"),
     path("delete/<int:id>/", delete_reservation, name="delete_reservation"),
     path("upload/<int:id>/", upload_images, name="upload_images"),
@@ -1,17 +1,35 @@
+import hashlib
 from datetime import timedelta
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.views.decorators.http import require_GET
 
+from room.availability import occupancy_version
 from room.models import Room
 
-from .forms import ImageForm, ReservationForm
+from . import exports, services
+from .forms import (
+    AvailabilityForm,
+    ImageForm,
+    QuoteForm,
+    ReservationFilterForm,
+    ReservationForm,
+)
 from .models import Reserve
-from django.db.models import Q
+from .pagination import keyset_page
 
 # Create your views here.
 
+AVAILABILITY_PAGE_SIZE = 20
+AVAILABILITY_CACHE_SECONDS = 300
+
 
 @login_required
 @permission_required("reservation_app.add_reserve", raise_exception=True)
@@ -53,15 +71,11 @@ def handle_post_request(request, room):
         reservation.nights = (reservation.end_date - reservation.starting_date).days
         if not request.user.is_staff:
             reservation.customer = request.user.customer
-        reservation.occupied_dates = Reserve.compute_occupied_dates(reservation)
-        # Save first to get an ID
-        reservation.save()
-        
-        if not handle_room_assignment(request, reservation, room):
+        try:
+            services.create_reservation(reservation, room)
+        except services.BookingError as error:
+            messages.error(request, str(error))
             return redirect("create_reservation")
-            
-        Reserve.calculate_price(reservation)
-        reservation.save()
         return redirect("show_reservations")
     else:
         for field, errors in form.errors.items():
@@ -94,63 +108,146 @@ def handle_get_request(request, room, date):
     return render(request, "reservation_app/reservation_form.html", context)
 
 
-def handle_room_assignment(request, reservation, room):
+def render_form(request, form):
     """
-    Maneja la asignación de habitaciones para una reserva.
+    Renderiza el formulario de reserva.
 
     Args:
         request: La solicitud HTTP.
-        reservation: La instancia de la reserva.
-        room: El número de la habitación (opcional).
+        form: El formulario de reserva.
 
     Returns:
-        True si la asignación fue exitosa, False en caso contrario.
+        Un renderizado de la plantilla de formulario de reserva.
     """
-    free_rooms = Reserve.find_free_rooms(reservation)
-    if not free_rooms:
-        messages.error(
-            request, "No hay habitaciones disponibles para la fecha seleccionada"
-        )
-        reservation.delete()
-        return False
-    if room:
-        assign_specific_room(reservation, room)
-    else:
-        Reserve.assign_room(reservation)
-    reservation.save()
-    return True
+    context = {"form": form}
+    return render(request, "reservation_app/reservation_form.html", context)
 
 
-def assign_specific_room(reservation, room_number):
+@login_required
+@require_GET
+def quote_reservation(request):
     """
-    Asigna una habitación específica a una reserva.
+    Presupuesta una estancia sin crear la reserva.
+
+    Acepta los parámetros `starting_date`, `end_date` y `people`, y
+    opcionalmente `room` (número de habitación) y `objective`
+    ("rooms" o "price"). No escribe en la base de datos.
 
     Args:
-        reservation: La instancia de la reserva.
-        room_number: El número de la habitación.
+        request: La solicitud HTTP.
 
     Returns:
-        None
+        JsonResponse: Habitaciones propuestas, desglose por noche y total.
+            - 400 si los parámetros no son válidos.
+            - 409 si no hay habitaciones que alojen la estancia.
+
+    Ejemplo de solicitud:
+    GET /reservation/quote/?starting_date=2025-07-01&end_date=2025-07-03&people=3
+
+    Ejemplo de respuesta:
+    {
+        "status": "success",
+        "nights": 2,
+        "rooms": [{"id": 4, "number": 104, "capacity": 4, "price": 80.0}],
+        "breakdown": [{"date": "2025-07-01", "price": 80.0}, ...],
+        "total": 160.0,
+        ...
+    }
     """
-    room = Room.objects.get(number=room_number)
-    reservation.rooms.set([room])
-    room.reserve_dates(reservation)
-    room.save()
+    form = QuoteForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"status": "failed", "errors": form.errors}, status=400)
+    reservation = form.save(commit=False)
+    reservation.nights = (reservation.end_date - reservation.starting_date).days
+    try:
+        quote = services.quote_reservation(
+            reservation,
+            form.cleaned_data["room"],
+            form.cleaned_data["objective"],
+        )
+    except services.BookingError as error:
+        return JsonResponse({"status": "unavailable", "message": str(error)}, status=409)
+    return JsonResponse({"status": "success", **quote})
 
 
-def render_form(request, form):
+@login_required
+@require_GET
+def search_availability(request):
     """
-    Renderiza el formulario de reserva.
+    Busca habitaciones libres para una estancia.
+
+    Acepta los parámetros `starting_date`, `end_date` y `people`, y
+    opcionalmente `objective` ("rooms" o "price"), `page` y `page_size`.
+
+    La respuesta lleva un ETag fuerte derivado de la versión de ocupación
+    (room.availability.occupancy_version) y de los parámetros, de modo que
+    una búsqueda repetida sin cambios en la ocupación responde 304. Las
+    búsquedas se guardan en caché con la versión en la clave: cualquier
+    cambio confirmado la invalida.
 
     Args:
         request: La solicitud HTTP.
-        form: El formulario de reserva.
 
     Returns:
-        Un renderizado de la plantilla de formulario de reserva.
+        JsonResponse: Página de habitaciones libres y combinación propuesta.
+            - 304 si el ETag de If-None-Match sigue vigente.
+            - 400 si los parámetros no son válidos.
+
+    Ejemplo de solicitud:
+    GET /reservation/availability/?starting_date=2025-07-01&end_date=2025-07-03&people=3
+
+    Ejemplo de respuesta:
+    {
+        "status": "success",
+        "version": 42,
+        "rooms": [{"id": 4, "number": 104, "capacity": 4, "price": 80.0}, ...],
+        "combination": {"rooms": [4], "total": 160.0},
+        "page": 1,
+        "num_pages": 3,
+        "count": 57
+    }
     """
-    context = {"form": form}
-    return render(request, "reservation_app/reservation_form.html", context)
+    form = AvailabilityForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"status": "failed", "errors": form.errors}, status=400)
+    reservation = form.save(commit=False)
+    reservation.nights = (reservation.end_date - reservation.starting_date).days
+    objective = form.cleaned_data["objective"]
+    page_number = form.cleaned_data["page"] or 1
+    page_size = form.cleaned_data["page_size"] or AVAILABILITY_PAGE_SIZE
+
+    version = occupancy_version()
+    search = f"{reservation.starting_date}:{reservation.end_date}:{reservation.people}:{objective}"
+    digest = hashlib.sha1(f"{search}:{page_number}:{page_size}".encode()).hexdigest()
+    etag = quote_etag(f"{version}-{digest[:16]}")
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    cache_key = f"availability:{version}:{search}"
+    result = cache.get(cache_key)
+    if result is None:
+        result = services.search_availability(reservation, objective)
+        cache.set(cache_key, result, AVAILABILITY_CACHE_SECONDS)
+
+    page = Paginator(result["rooms"], page_size).get_page(page_number)
+    response = JsonResponse(
+        {
+            "status": "success",
+            "version": version,
+            "starting_date": reservation.starting_date,
+            "end_date": reservation.end_date,
+            "people": reservation.people,
+            "rooms": page.object_list,
+            "combination": result["combination"],
+            "page": page.number,
+            "num_pages": page.paginator.num_pages,
+            "count": page.paginator.count,
+        }
+    )
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @login_required
@@ -159,6 +256,13 @@ def show_reservations(request):
     """
     Vista para mostrar las reservas.
 
+    Las reservas se paginan por clave (-starting_date, id) con los cursores
+    `after` y `before`, compatibles con los filtros de búsqueda, fecha y
+    estado de pago y con el filtro por fechas de ReservationFilterForm
+    (llegadas, salidas o alojados entre `date_from` y `date_to`). La
+    búsqueda de clientes usa el índice de texto completo de Customer y
+    ordena primero por relevancia.
+
     Args:
         request: La solicitud HTTP.
 
@@ -170,33 +274,66 @@ def show_reservations(request):
     else:
         reservations = Reserve.objects.filter(user=request.user)
 
-    search_query = request.GET.get('search', '')
-    if search_query:
-        reservations = reservations.filter(
-            Q(customer__name__icontains=search_query) |
-            Q(customer__last_name__icontains=search_query)
-        )
+    filter_form = ReservationFilterForm(request.GET)
+    if not filter_form.is_valid():
+        for field, errors in filter_form.errors.items():
+            for error in errors:
+                messages.error(request, f"{field}: {error}")
+    reservations = filter_form.filter(reservations)
 
-    start_date = request.GET.get('start_date')
-    if start_date:
-        reservations = reservations.filter(starting_date=start_date)
-    
-    payment_status = request.GET.get('payment_status')
-    if payment_status:
-        paid = payment_status == 'paid'
-        reservations = reservations.filter(paid=paid)
-    
-    reservations = reservations.order_by('-starting_date')
+    page = keyset_page(
+        reservations.for_listing(),
+        filter_form.ordering(),
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+    )
 
     context = {
-        "reservations": reservations,
-        "search_query": search_query,
-        "selected_date": start_date,
-        "payment_status": payment_status
+        "reservations": page,
+        "page": page,
+        "search_query": request.GET.get("search", ""),
+        "selected_date": request.GET.get("start_date"),
+        "payment_status": request.GET.get("payment_status"),
+        "filter_form": filter_form,
     }
     return render(request, "reservation_app/show_reservations.html", context)
 
 
+@login_required
+@permission_required("reservation_app.view_reserve", raise_exception=True)
+@require_GET
+def export_reservations(request):
+    """
+    Exporta las reservas en CSV o NDJSON sin cargarlas en memoria.
+
+    Acepta los mismos filtros que show_reservations y el parámetro `format`
+    ("csv" por defecto o "ndjson"). Las filas se envían a medida que se leen
+    de la base de datos (ver reservation_app.exports).
+
+    Args:
+        request: La solicitud HTTP.
+
+    Returns:
+        StreamingHttpResponse: Fichero con las reservas.
+    """
+    output = request.GET.get("format", "csv")
+    if output not in exports.FORMATS:
+        return JsonResponse({"status": "failed"}, status=400)
+    if request.user.is_staff:
+        reservations = Reserve.objects.all()
+    else:
+        reservations = Reserve.objects.filter(user=request.user)
+    filter_form = ReservationFilterForm(request.GET)
+    filter_form.is_valid()
+    rows = exports.reservation_rows(filter_form.filter(reservations))
+    response = StreamingHttpResponse(
+        exports.export_lines(rows, exports.RESERVATION_FIELDS, output),
+        content_type=exports.FORMATS[output],
+    )
+    response["Content-Disposition"] = f'attachment; filename="reservations.{output}"'
+    return response
+
+
 @login_required
 @permission_required("reservation_app.change_reserve", raise_exception=True)
 def update_reservation(request, id):
@@ -211,24 +348,33 @@ def update_reservation(request, id):
         Una redirección o un renderizado de la plantilla de formulario de reserva.
     """
     reservation = Reserve.objects.get(id=id)
-    old_dates = reservation.occupied_dates
     if request.method == "POST":
         form = ReservationForm(request.POST, instance=reservation, user=request.user)
         if form.is_valid():
-            for room in reservation.rooms.all():
-                for date in old_dates:
-                    if date in room.occupied_dates:
-                        room.occupied_dates.remove(date)
-                room.save()
-            reservation = form.save(commit=False)
-            reservation.nights = (reservation.end_date - reservation.starting_date).days
-            reservation.occupied_dates = Reserve.compute_occupied_dates(reservation)
-            Reserve.calculate_price(reservation)
-            reservation.save()
-            form.save_m2m()
-            for room in reservation.rooms.all():
-                room.reserve_dates(reservation)
-            return redirect("show_reservations")
+            try:
+                with transaction.atomic():
+                    # Serializa las modificaciones concurrentes de la misma reserva
+                    old_dates = (
+                        Reserve.objects.select_for_update()
+                        .values_list("occupied_dates", flat=True)
+                        .get(id=id)
+                    )
+                    rooms = Room.objects.filter(bookings__reserve=reservation).locked()
+                    reservation = form.save(commit=False)
+                    reservation.nights = (reservation.end_date - reservation.starting_date).days
+                    reservation.occupied_dates = Reserve.compute_occupied_dates(reservation)
+                    Reserve.calculate_price(reservation)
+                    reservation.save()
+                    form.save_m2m()
+                    for room in rooms:
+                        room.release_dates(old_dates)
+                        room.reserve_dates(reservation)
+            except IntegrityError:
+                messages.error(
+                    request, "Las habitaciones de la reserva no están libres en las nuevas fechas"
+                )
+            else:
+                return redirect("show_reservations")
     else:
         initial_data = {
             'starting_date': reservation.starting_date.strftime('%Y-%m-%d'),
@@ -255,12 +401,11 @@ def delete_reservation(request, id):
     Returns:
         Una redirección a la lista de reservas.
     """
-    reservation = Reserve.objects.get(id=id)
-    for room in reservation.rooms.all():
-        for date in room.occupied_dates:
-            if date in reservation.occupied_dates:
-                room.occupied_dates.remove(date)
-    reservation.delete()
+    with transaction.atomic():
+        reservation = Reserve.objects.with_occupied_dates().select_for_update().get(id=id)
+        for room in Room.objects.filter(bookings__reserve=reservation).locked():
+            room.release_dates(reservation.occupied_dates)
+        reservation.delete()
     return redirect("show_reservations")
 
 
@@ -313,10 +458,11 @@ def select_room(request, reservation_id, room_id):
     reservation = Reserve.objects.get(id=reservation_id)
     old_room = reservation.rooms.get(id=room_id)
     other_rooms_capacity = reservation.people - old_room.capacity
-    rooms = Reserve.find_free_rooms(reservation)
-    rooms = [
-        r for r in rooms if r.capacity + other_rooms_capacity >= reservation.people
-    ]
+    rooms = Room.objects.free_between(
+        reservation.starting_date, reservation.end_date
+    ).filter(
+        capacity__gte=reservation.people - other_rooms_capacity
+    )
 
     if not rooms:
         messages.error(request, "No hay habitaciones disponibles que cumplan con la capacidad requerida.")
@@ -344,15 +490,21 @@ def change_room(request, reservation_id, old_room_id, room_id):
     Returns:
         Una redirección a la lista de reservas.
     """
-    reservation = Reserve.objects.get(id=reservation_id)
-    old_room = reservation.rooms.get(id=old_room_id)
-    new_room = Room.objects.get(id=room_id)
-    reservation.rooms.remove(old_room)
-    reservation.rooms.add(new_room)
-    old_room.save()
-    new_room.save()
-    Reserve.calculate_price(reservation)
-    reservation.save()
+    try:
+        with transaction.atomic():
+            reservation = (
+                Reserve.objects.with_occupied_dates().select_for_update().get(id=reservation_id)
+            )
+            Room.objects.filter(id__in=[old_room_id, room_id]).locked()
+            old_room = reservation.rooms.get(id=old_room_id)
+            new_room = Room.objects.get(id=room_id)
+            reservation.rooms.remove(old_room)
+            old_room.release_dates(reservation.occupied_dates)
+            new_room.reserve_dates(reservation)
+            Reserve.calculate_price(reservation)
+            reservation.save()
+    except IntegrityError:
+        messages.error(request, "La habitación seleccionada ya no está disponible")
     return show_reservations(request)
 
 @login_required
@@ -0,0 +1,280 @@
+"""
+Motor de disponibilidad en memoria.
+
+Mantiene la ocupación de todas las habitaciones como una matriz de bits
+habitaciones × días sobre un horizonte móvil a partir de hoy. La matriz es
+un array de NumPy con una fila por día y los bits de las habitaciones
+empaquetados en bytes (el bit i indica que la habitación i está ocupada esa
+noche). Así, las habitaciones libres para [entrada, salida) se obtienen con
+un OR de las filas de la estancia y una negación, operando sobre todas las
+habitaciones a la vez.
+
+El motor es local a cada proceso y se reconstruye desde la base de datos al
+primer uso de cada día. La versión de ocupación es una secuencia de
+PostgreSQL compartida por todos los procesos que avanza cada vez que se
+confirma un cambio en habitaciones u ocupaciones (ver
+reservation_app.signals); cada versión deja en OccupancyChange las
+habitaciones afectadas. Antes de cada consulta el motor compara su versión
+con la actual y recarga solo las habitaciones cambiadas desde entonces, lo
+hayan cambiado este u otro proceso. Solo se reconstruye entero si faltan
+versiones en el registro (demasiado antiguas, o aún sin confirmar) o si se
+han creado o eliminado habitaciones. La restricción de exclusión de
+RoomBooking sigue siendo la garantía final frente a dobles reservas.
+
+La versión de ocupación sirve también para derivar ETags y claves de caché
+de las búsquedas de disponibilidad.
+"""
+
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.db.backends.postgresql.psycopg_any import DateRange
+
+# Versiones conservadas en el registro de cambios y cada cuántas se poda
+CHANGELOG_SIZE = 10000
+CHANGELOG_PRUNE_EVERY = 100
+
+
+class AvailabilityEngine:
+    """
+    Índice de ocupación por bits para búsquedas de disponibilidad.
+
+    Atributos:
+        horizon_days (int): Número de noches cubiertas a partir de origin.
+        origin (date): Primera noche del horizonte, o None si no se ha construido.
+        version (int): Versión de ocupación que refleja la matriz.
+        room_ids (list): Id de la habitación de cada posición de bit.
+        capacities (list): Capacidad de la habitación de cada posición de bit.
+        days (ndarray): Matriz uint8 días × bytes con los bits de las habitaciones ocupadas.
+
+    Métodos:
+        rebuild(): Reconstruye la matriz desde la base de datos.
+        invalidate(): Fuerza la reconstrucción en el próximo uso.
+        free_rooms(starting_date, end_date): Habitaciones libres y sus capacidades.
+        refresh_rooms(room_ids): Recarga la ocupación y capacidad de varias habitaciones.
+    """
+
+    def __init__(self, horizon_days=730):
+        self.horizon_days = horizon_days
+        self.origin = None
+        self.version = None
+        self.room_ids = []
+        self.capacities = []
+        self.positions = {}
+        self.days = np.zeros((horizon_days, 0), dtype=np.uint8)
+        self.lock = threading.RLock()
+
+    @property
+    def built(self):
+        return self.origin is not None
+
+    def rebuild(self):
+        """
+        Reconstruye la matriz desde Room y RoomBooking.
+
+        La versión se lee antes que las ocupaciones: un cambio confirmado
+        durante la lectura deja el motor con una versión antigua y provoca
+        otra reconstrucción, nunca al revés.
+        """
+        Room = apps.get_model("room", "Room")
+        RoomBooking = apps.get_model("reservation_app", "RoomBooking")
+        version = occupancy_version()
+        origin = date.today()
+        horizon_end = origin + timedelta(days=self.horizon_days)
+
+        rooms = list(Room.objects.order_by("id").values_list("id", "capacity"))
+        positions = {room_id: i for i, (room_id, _) in enumerate(rooms)}
+        occupied = np.zeros((self.horizon_days, len(rooms)), dtype=bool)
+
+        bookings = RoomBooking.objects.filter(
+            period__overlap=DateRange(origin, horizon_end)
+        ).values_list("room_id", "period")
+        for room_id, period in bookings.iterator(chunk_size=5000):
+            nights = self._night_offsets(period, origin)
+            occupied[nights.start:nights.stop, positions[room_id]] = True
+
+        with self.lock:
+            self.origin = origin
+            self.version = version
+            self.room_ids = [room_id for room_id, _ in rooms]
+            self.capacities = [capacity for _, capacity in rooms]
+            self.positions = positions
+            self.days = np.packbits(occupied, axis=1, bitorder="little")
+
+    def invalidate(self):
+        """Marca el motor como obsoleto; se reconstruirá en el próximo uso."""
+        with self.lock:
+            self.origin = None
+
+    def ensure_fresh(self):
+        """
+        Pone el motor al día antes de una consulta.
+
+        Lo reconstruye si no existe o si su horizonte empieza antes de hoy.
+        Si se han confirmado cambios desde su versión, recarga las
+        habitaciones afectadas, o lo reconstruye si el registro de cambios
+        no permite saber cuáles son.
+        """
+        if self.origin != date.today():
+            self.rebuild()
+            return
+        version = occupancy_version()
+        if version == self.version:
+            return
+        room_ids = changed_rooms(self.version, version)
+        if room_ids is not None:
+            self.refresh_rooms(room_ids)
+        if room_ids is None or not self.built:
+            self.rebuild()
+        else:
+            self.version = version
+
+    def covers(self, starting_date, end_date):
+        """Indica si el intervalo cae dentro del horizonte actual."""
+        return (
+            self.built
+            and starting_date >= self.origin
+            and (end_date - self.origin).days <= self.horizon_days
+        )
+
+    def free_rooms(self, starting_date, end_date):
+        """
+        Devuelve las habitaciones libres para todas las noches del intervalo.
+
+        Args:
+            starting_date (date): Primera noche.
+            end_date (date): Fecha de salida (no incluida).
+
+        Returns:
+            list: Pares (id, capacidad) de las habitaciones libres, o None si
+            el intervalo queda fuera del horizonte.
+        """
+        with self.lock:
+            self.ensure_fresh()
+            if not self.covers(starting_date, end_date):
+                return None
+            start = (starting_date - self.origin).days
+            stop = (end_date - self.origin).days
+            busy = np.bitwise_or.reduce(self.days[start:stop], axis=0)
+            free = np.unpackbits(~busy, count=len(self.room_ids), bitorder="little")
+            return [(self.room_ids[i], self.capacities[i]) for i in np.flatnonzero(free)]
+
+    def refresh_rooms(self, room_ids):
+        """
+        Recarga desde la base de datos la ocupación y la capacidad de varias
+        habitaciones. Si alguna no está indexada, invalida el motor.
+
+        Args:
+            room_ids (iterable): Ids de las habitaciones.
+        """
+        with self.lock:
+            if not self.built:
+                return
+            room_ids = set(room_ids)
+            if not room_ids <= self.positions.keys():
+                self.invalidate()
+                return
+            if not room_ids:
+                return
+            Room = apps.get_model("room", "Room")
+            RoomBooking = apps.get_model("reservation_app", "RoomBooking")
+            horizon_end = self.origin + timedelta(days=self.horizon_days)
+            capacities = Room.objects.filter(id__in=room_ids).values_list("id", "capacity")
+            periods = RoomBooking.objects.filter(
+                room_id__in=room_ids, period__overlap=DateRange(self.origin, horizon_end)
+            ).values_list("room_id", "period")
+            for room_id, capacity in capacities:
+                self.capacities[self.positions[room_id]] = capacity
+            for room_id in room_ids:
+                i = self.positions[room_id]
+                self.days[:, i >> 3] &= np.uint8(~(1 << (i & 7)) & 0xFF)
+            for room_id, period in periods:
+                i = self.positions[room_id]
+                nights = self._night_offsets(period, self.origin)
+                self.days[nights.start:nights.stop, i >> 3] |= np.uint8(1 << (i & 7))
+
+    def _night_offsets(self, period, origin):
+        """Posiciones dentro del horizonte de las noches de un periodo."""
+        start = max((period.lower - origin).days, 0)
+        stop = min((period.upper - origin).days, self.horizon_days)
+        return range(start, max(start, stop))
+
+
+def occupancy_version():
+    """
+    Devuelve la versión de ocupación actual sin modificarla.
+
+    Returns:
+        int: Versión de ocupación.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM room_occupancy_version"
+        )
+        return cursor.fetchone()[0]
+
+
+def commit_occupancy_change(room_ids=None):
+    """
+    Avanza la versión de ocupación y registra las habitaciones afectadas.
+
+    nextval() no es transaccional, así que debe llamarse una vez confirmados
+    los cambios (transaction.on_commit) para que nadie asocie la nueva
+    versión a datos antiguos. La versión y su registro se escriben en una
+    sola sentencia; cada CHANGELOG_PRUNE_EVERY versiones se borran las que
+    exceden OCCUPANCY_CHANGELOG_SIZE.
+
+    Args:
+        room_ids (iterable): Habitaciones cuya ocupación o capacidad ha
+            cambiado; None si se han creado o eliminado habitaciones.
+
+    Returns:
+        int: Nueva versión.
+    """
+    OccupancyChange = apps.get_model("room", "OccupancyChange")
+    table = OccupancyChange._meta.db_table
+    if room_ids is not None:
+        room_ids = sorted(set(room_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (version, room_ids) "
+            "VALUES (nextval('room_occupancy_version'), %s::bigint[]) RETURNING version",
+            [room_ids],
+        )
+        version = cursor.fetchone()[0]
+    if version % CHANGELOG_PRUNE_EVERY == 0:
+        size = getattr(settings, "OCCUPANCY_CHANGELOG_SIZE", CHANGELOG_SIZE)
+        OccupancyChange.objects.filter(version__lte=version - size).delete()
+    return version
+
+
+def changed_rooms(since, until):
+    """
+    Habitaciones cambiadas entre dos versiones de ocupación.
+
+    Args:
+        since (int): Versión ya conocida (no incluida).
+        until (int): Versión actual.
+
+    Returns:
+        set: Ids de las habitaciones, o None si falta alguna versión en el
+        registro o alguna creó o eliminó habitaciones.
+    """
+    if since is None or until < since:
+        return None
+    OccupancyChange = apps.get_model("room", "OccupancyChange")
+    changes = list(
+        OccupancyChange.objects.filter(version__gt=since, version__lte=until).values_list(
+            "room_ids", flat=True
+        )
+    )
+    if len(changes) != until - since or None in changes:
+        return None
+    return {room_id for room_ids in changes for room_id in room_ids}
+
+
+engine = AvailabilityEngine(getattr(settings, "AVAILABILITY_HORIZON_DAYS", 730))
@@ -0,0 +1,82 @@
+import tracemalloc
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+
+from reservation_app.management.commands.benchmark_availability import (
+    Command as AvailabilityBenchmark,
+)
+from room.models import Room
+
+
+class Command(AvailabilityBenchmark):
+    help = "Compara la carga del listado de habitaciones con y sin occupied_dates"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(sizes=[1000, 10000], repeat=5)
+        parser.add_argument(
+            "--history-days",
+            type=int,
+            default=1095,
+            help="Días pasados ocupados que acumula cada habitación",
+        )
+
+    def add_history(self, days):
+        """Añade `days` fechas pasadas a occupied_dates, como sin compactar"""
+        first_day = date.today() - timedelta(days=days)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {Room._meta.db_table}
+                SET occupied_dates = ARRAY(
+                    SELECT generate_series(%s::date, %s::date - 1, interval '1 day')::date
+                ) || occupied_dates
+                """,
+                [first_day, date.today()],
+            )
+
+    def transfer(self, deferred):
+        """Bytes en texto de las filas del listado, como los envía PostgreSQL"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT sum(octet_length(room::text))
+                    - CASE WHEN %s THEN sum(octet_length(occupied_dates::text)) ELSE 0 END
+                FROM {Room._meta.db_table} AS room
+                """,
+                [deferred],
+            )
+            return cursor.fetchone()[0]
+
+    def load(self, queryset, repeat):
+        """Mediana de tiempo (ms) y pico de memoria (MB) de cargar el listado"""
+        elapsed = self.measure(lambda: list(queryset.all()), repeat)
+        tracemalloc.start()
+        rooms = list(queryset.all())
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del rooms
+        return elapsed, peak / 2**20
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'habitaciones':>12} {'listado':>9} {'tiempo (ms)':>12} "
+            f"{'memoria (MB)':>13} {'transferencia (KB)':>19}"
+        )
+        for size in options["sizes"]:
+            # Todo se deshace al salir: la base de datos queda intacta
+            with transaction.atomic():
+                Room.objects.all().delete()
+                self.populate(size, options["stays"])
+                self.add_history(options["history_days"])
+                for label, queryset, deferred in (
+                    ("antes", Room.objects.with_occupied_dates(), False),
+                    ("después", Room.objects.all(), True),
+                ):
+                    elapsed, peak = self.load(queryset, options["repeat"])
+                    transfer = self.transfer(deferred) / 1024
+                    self.stdout.write(
+                        f"{size:>12} {label:>9} {elapsed:>12.1f} {peak:>13.1f} {transfer:>19.0f}"
+                    )
+                transaction.set_rollback(True)
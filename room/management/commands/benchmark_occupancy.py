@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from reservation_app.management.commands.benchmark_availability import (
+    Command as AvailabilityBenchmark,
+)
+from room.models import Room
+from room.occupancy import OccupancyMatrix
+
+
+class Command(AvailabilityBenchmark):
+    help = "Mide la construcción de la matriz de ocupación habitaciones × días"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(sizes=[100, 1000, 2000])
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=90,
+            help="Días de la ventana",
+        )
+
+    def handle(self, *args, **options):
+        starting_date = date.today()
+        end_date = starting_date + timedelta(days=options["days"])
+
+        self.stdout.write(
+            f"{'habitaciones':>12} {'matriz (ms)':>12} {'json (ms)':>10} {'binario (ms)':>13}"
+        )
+        for size in options["sizes"]:
+            # Todo se deshace al salir: la base de datos queda intacta
+            with transaction.atomic():
+                Room.objects.all().delete()
+                self.populate(size, options["stays"])
+                build_ms = self.measure(
+                    lambda: OccupancyMatrix.build(starting_date, end_date), options["repeat"]
+                )
+                matrix = OccupancyMatrix.build(starting_date, end_date)
+                json_ms = self.measure(matrix.to_json, options["repeat"])
+                binary_ms = self.measure(matrix.to_bytes, options["repeat"])
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f"{size:>12} {build_ms:>12.2f} {json_ms:>10.2f} {binary_ms:>13.2f}"
+            )
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:00
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('room', '0007_alter_room_photo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='room',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['occupied_dates'], name='room_occupied_dates_gin'),
+        ),
+    ]
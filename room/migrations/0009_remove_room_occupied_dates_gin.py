@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('room', '0008_room_occupied_dates_gin'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='room',
+            name='room_occupied_dates_gin',
+        ),
+    ]
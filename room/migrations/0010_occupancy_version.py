@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('room', '0009_remove_room_occupied_dates_gin'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE SEQUENCE room_occupancy_version",
+            "DROP SEQUENCE room_occupancy_version",
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation_app', '0027_reservations_without_constraint'),
+        ('room', '0010_occupancy_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='room',
+            name='reservations',
+            field=models.ManyToManyField(blank=True, db_constraint=False, to='reservation_app.reserve'),
+        ),
+    ]
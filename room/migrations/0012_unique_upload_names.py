@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:29
+
+import reservation.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('room', '0011_reservations_without_constraint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='room',
+            name='photo',
+            field=models.ImageField(blank=True, default='rooms/default.jpg', null=True, upload_to=reservation.uploads.UniqueUploadTo('rooms')),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('room', '0012_unique_upload_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='photo_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:09
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('room', '0013_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupancyChange',
+            fields=[
+                ('version', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('room_ids', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), null=True, size=None)),
+            ],
+        ),
+    ]
@@ -4,12 +4,152 @@ Room
 
 from datetime import timedelta
 
+from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
 from django.db import models
+from django.db.backends.postgresql.psycopg_any import DateRange
+
+from reservation.uploads import UniqueUploadTo
+
+from .availability import engine
 
 # Create your models here.
 
 
+def dates_without(dates):
+    """
+    Expresión con occupied_dates sin las fechas dadas, conservando el orden.
+
+    Args:
+        dates (list): Fechas a quitar.
+
+    Returns:
+        RawSQL: Expresión para usar en update().
+    """
+    return models.expressions.RawSQL(
+        "ARRAY(SELECT day FROM unnest(occupied_dates) WITH ORDINALITY AS dates(day, position)"
+        " WHERE day <> ALL(%s::date[]) ORDER BY position)",
+        [dates],
+        output_field=ArrayField(models.DateField()),
+    )
+
+
+class RoomQuerySet(models.QuerySet):
+    """
+    QuerySet de habitaciones con consultas de disponibilidad.
+
+    Métodos:
+        free_between(starting_date, end_date, reservation): Filtra las habitaciones libres en el intervalo.
+        locked(): Bloquea las habitaciones para el resto de la transacción.
+        add_dates(dates): Añade fechas ocupadas sin cargar las existentes.
+        remove_dates(dates): Quita fechas ocupadas sin cargar las existentes.
+        with_occupied_dates(): Carga también occupied_dates.
+    """
+
+    def with_occupied_dates(self):
+        """
+        Carga occupied_dates, que RoomManager aplaza por defecto.
+
+        Anula cualquier defer() u only() anterior.
+
+        Returns:
+            QuerySet: Habitaciones con todos sus campos.
+        """
+        return self.defer(None)
+
+    def locked(self):
+        """
+        Bloquea las habitaciones (SELECT ... FOR UPDATE) hasta el final de la
+        transacción en curso.
+
+        Las filas se bloquean siempre en orden de id para que dos transacciones
+        que compiten por las mismas habitaciones no se bloqueen mutuamente.
+
+        Returns:
+            list: Habitaciones bloqueadas.
+        """
+        return list(
+            self.select_for_update(of=("self",)).defer("occupied_dates").order_by("id")
+        )
+
+    def add_dates(self, dates):
+        """
+        Añade fechas a occupied_dates con un único UPDATE en la base de datos.
+
+        Args:
+            dates (list): Fechas a añadir.
+
+        Returns:
+            int: Número de habitaciones actualizadas.
+        """
+        dates_field = ArrayField(models.DateField())
+        return self.update(
+            occupied_dates=models.Func(
+                models.F("occupied_dates"),
+                models.Value(list(dates), output_field=dates_field),
+                function="array_cat",
+                output_field=dates_field,
+            )
+        )
+
+    def remove_dates(self, dates):
+        """
+        Quita fechas de occupied_dates con un único UPDATE en la base de datos.
+
+        Args:
+            dates (list): Fechas a quitar.
+
+        Returns:
+            int: Número de habitaciones actualizadas.
+        """
+        return self.update(occupied_dates=dates_without(list(dates)))
+
+    def free_between(self, starting_date, end_date, reservation=None):
+        """
+        Filtra las habitaciones libres entre dos fechas.
+
+        Las habitaciones ocupadas se localizan con el operador de solapamiento
+        de rangos (&&) sobre RoomBooking.period, que usa el índice GiST de la
+        restricción de exclusión, y se excluyen mediante un anti-join por id.
+
+        Si AVAILABILITY_ENGINE está activo y no hay que ignorar ninguna
+        reserva, la respuesta sale del motor en memoria (room.availability)
+        siempre que el intervalo esté dentro de su horizonte.
+
+        Args:
+            starting_date (date): Primera noche del intervalo.
+            end_date (date): Fecha de salida (no incluida).
+            reservation (Reserve): Reserva cuyas propias ocupaciones se ignoran (opcional).
+
+        Returns:
+            QuerySet: Habitaciones libres.
+        """
+        if reservation is None and settings.AVAILABILITY_ENGINE:
+            free = engine.free_rooms(starting_date, end_date)
+            if free is not None:
+                return self.filter(id__in=[room_id for room_id, _ in free])
+        RoomBooking = self.model._meta.get_field("bookings").related_model
+        busy = RoomBooking.objects.filter(
+            period__overlap=DateRange(starting_date, end_date)
+        )
+        if reservation is not None and reservation.pk:
+            busy = busy.exclude(reserve=reservation)
+        return self.exclude(id__in=busy.values("room_id"))
+
+
+class RoomManager(models.Manager.from_queryset(RoomQuerySet)):
+    """
+    Gestor por defecto de Room: aplaza occupied_dates.
+
+    Las fechas ocupadas son la mayor parte de cada fila y los listados, el
+    admin y las relaciones no las usan; la disponibilidad se consulta con
+    RoomBooking. Quien las necesite debe pedirlas con with_occupied_dates().
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer("occupied_dates")
+
+
 class Room(models.Model):
     """
     Modelo que representa una habitación en el sistema de reservas.
@@ -20,32 +160,112 @@ class Room(models.Model):
         price (float): Precio por noche de la habitación.
         capacity (int): Capacidad máxima de personas en la habitación (por defecto 2).
         photo (ImageField): Foto de la habitación (opcional, por defecto "rooms/default.jpg").
+        photo_derivatives (JSONField): Miniaturas y versiones WebP de la foto (ver reservation_app.derivatives).
         reservations (ManyToManyField): Relación con el modelo Reserve, representa las reservas asociadas a la habitación.
         occupied_dates (ArrayField): Lista de fechas ocupadas para la habitación.
 
     Métodos:
-        reserve_dates(reservation): Añade las fechas de una reserva a la lista de fechas ocupadas.
+        reserve_dates(reservation): Reserva la habitación para las fechas de una reserva.
+        release_dates(dates): Libera fechas de la lista de fechas ocupadas.
+        occupied_ranges(starting_date, end_date): Intervalos ocupados dentro de una ventana.
+        is_free(starting_date, end_date, reservation): Indica si está libre en un intervalo.
+
+    El gestor por defecto aplaza occupied_dates (ver RoomManager); las
+    consultas de disponibilidad usan RoomBooking y no necesitan cargarlo.
     """
     number = models.IntegerField(unique=True)
     description = models.TextField(null=True, blank=True)
     price = models.FloatField()
     capacity = models.IntegerField(default=2)
     photo = models.ImageField(
-        upload_to="rooms", null=True, blank=True, default="rooms/default.jpg"
+        upload_to=UniqueUploadTo("rooms"), null=True, blank=True, default="rooms/default.jpg"
+    )
+    photo_derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    # Clave ajena compuesta creada en reservation_app 0032_reserve_foreign_keys
+    reservations = models.ManyToManyField(
+        "reservation_app.Reserve", blank=True, db_constraint=False
     )
-    reservations = models.ManyToManyField("reservation_app.Reserve", blank=True)
     occupied_dates = ArrayField(models.DateField(), blank=True, default=list)
 
+    objects = RoomManager()
+
     def reserve_dates(self, reservation):
         """
-        Añade las fechas de una reserva a la lista de fechas ocupadas.
+        Reserva la habitación para las fechas de una reserva.
+
+        Crea o actualiza el RoomBooking de la reserva y añade sus fechas a la
+        lista de fechas ocupadas. La base de datos rechaza con IntegrityError
+        cualquier solapamiento con otra reserva de la habitación.
 
         Args:
             reservation (Reserve): Objeto de reserva que contiene la fecha de inicio y el número de noches.
         """
-        for i in range(reservation.nights):
-            self.occupied_dates.append(reservation.starting_date + timedelta(days=i))
-        self.save()
+        self.bookings.update_or_create(
+            reserve=reservation, defaults={"period": reservation.period}
+        )
+        dates = [reservation.starting_date + timedelta(days=i) for i in range(reservation.nights)]
+        Room.objects.filter(pk=self.pk).add_dates(dates)
+        if "occupied_dates" not in self.get_deferred_fields():
+            self.occupied_dates = self.occupied_dates + dates
+
+    def release_dates(self, dates):
+        """
+        Libera fechas de la lista de fechas ocupadas.
+
+        Args:
+            dates (list): Fechas a liberar.
+        """
+        Room.objects.filter(pk=self.pk).remove_dates(dates)
+        if "occupied_dates" not in self.get_deferred_fields():
+            released = set(dates)
+            self.occupied_dates = [d for d in self.occupied_dates if d not in released]
+
+    def is_free(self, starting_date, end_date, reservation=None):
+        """
+        Indica si la habitación está libre entre dos fechas, sin cargar occupied_dates.
+
+        Args:
+            starting_date (date): Primera noche del intervalo.
+            end_date (date): Fecha de salida (no incluida).
+            reservation (Reserve): Reserva cuyas propias ocupaciones se ignoran (opcional).
+
+        Returns:
+            bool: True si ninguna otra reserva ocupa la habitación en el intervalo.
+        """
+        busy = self.bookings.filter(period__overlap=DateRange(starting_date, end_date))
+        if reservation is not None and reservation.pk:
+            busy = busy.exclude(reserve=reservation)
+        return not busy.exists()
+
+    def occupied_ranges(self, starting_date, end_date):
+        """
+        Intervalos ocupados de la habitación dentro de una ventana de fechas.
+
+        Los periodos de RoomBooking se recortan a la ventana y se fusionan
+        cuando son contiguos o se solapan, de modo que el tamaño de la
+        respuesta depende del número de estancias visibles y no de noches.
+
+        Args:
+            starting_date (date): Primer día de la ventana.
+            end_date (date): Día siguiente al último de la ventana.
+
+        Returns:
+            list: Pares [inicio, fin) de fechas ocupadas, ordenados.
+        """
+        periods = (
+            self.bookings.filter(period__overlap=DateRange(starting_date, end_date))
+            .order_by("period")
+            .values_list("period", flat=True)
+        )
+        ranges = []
+        for period in periods:
+            lower = max(period.lower, starting_date)
+            upper = min(period.upper, end_date)
+            if ranges and lower <= ranges[-1][1]:
+                ranges[-1][1] = max(ranges[-1][1], upper)
+            else:
+                ranges.append([lower, upper])
+        return ranges
         
     class Meta:
         verbose_name = "Room"
@@ -53,3 +273,21 @@ class Room(models.Model):
 
     def __str__(self):
         return str(self.number)
+
+
+class OccupancyChange(models.Model):
+    """
+    Registro de los cambios de ocupación confirmados, por versión.
+
+    Cada versión de room_occupancy_version deja una fila con las habitaciones
+    afectadas, para que los motores de disponibilidad de otros procesos
+    recarguen solo esas habitaciones (ver room/availability.py). Solo se
+    conservan las últimas OCCUPANCY_CHANGELOG_SIZE versiones.
+
+    Atributos:
+        version (BigIntegerField): Versión de ocupación que produjo el cambio.
+        room_ids (ArrayField): Habitaciones afectadas, o None si cambiaron
+            las habitaciones en sí (altas y bajas) y hay que reconstruir.
+    """
+    version = models.BigIntegerField(primary_key=True)
+    room_ids = ArrayField(models.BigIntegerField(), null=True)
@@ -0,0 +1,160 @@
+"""
+Matriz de ocupación habitaciones × días.
+
+Para una ventana de fechas se construye una matriz de NumPy con una fila
+por habitación (ordenadas por número) y una columna por noche, cuyo valor es
+el id de la reserva que ocupa la celda o 0 si está libre. La restricción de
+exclusión de RoomBooking garantiza que cada celda tiene como mucho una
+reserva.
+
+Las habitaciones y sus ocupaciones dentro de la ventana se leen en una
+única consulta (LEFT JOIN filtrado sobre RoomBooking) y la matriz se rellena
+de forma vectorizada, sin bucles de Python por noche.
+"""
+
+import numpy as np
+from django.db.backends.postgresql.psycopg_any import DateRange
+from django.db.models import DateField, F, FilteredRelation, Func, Q
+
+from .models import Room
+
+
+class OccupancyMatrix:
+    """
+    Ocupación de todas las habitaciones en una ventana de fechas.
+
+    Atributos:
+        starting_date (date): Primera noche de la ventana.
+        end_date (date): Día siguiente a la última noche.
+        room_ids (ndarray): Id de la habitación de cada fila.
+        numbers (ndarray): Número de la habitación de cada fila.
+        cells (ndarray): Matriz int64 habitaciones × días con el id de la
+            reserva de cada noche (0 si está libre).
+
+    Métodos:
+        build(starting_date, end_date): Construye la matriz desde la base de datos.
+        runs(): Codificación por tramos de las celdas ocupadas.
+        to_json(): Representación JSON por tramos.
+        to_bytes(): Representación binaria compacta.
+    """
+
+    def __init__(self, starting_date, end_date, room_ids, numbers, cells):
+        self.starting_date = starting_date
+        self.end_date = end_date
+        self.room_ids = room_ids
+        self.numbers = numbers
+        self.cells = cells
+
+    @classmethod
+    def build(cls, starting_date, end_date):
+        """
+        Construye la matriz de ocupación de una ventana.
+
+        Args:
+            starting_date (date): Primera noche de la ventana.
+            end_date (date): Día siguiente a la última noche.
+
+        Returns:
+            OccupancyMatrix: Matriz de la ventana.
+        """
+        days = (end_date - starting_date).days
+        rows = (
+            Room.objects.annotate(
+                visible=FilteredRelation(
+                    "bookings",
+                    condition=Q(bookings__period__overlap=DateRange(starting_date, end_date)),
+                ),
+                lower=Func(F("visible__period"), function="lower", output_field=DateField()),
+                upper=Func(F("visible__period"), function="upper", output_field=DateField()),
+            )
+            .order_by("number", "lower")
+            .values_list("id", "number", "visible__reserve_id", "lower", "upper")
+        )
+
+        room_ids, numbers, bookings = [], [], []
+        for room_id, number, reserve_id, lower, upper in rows:
+            if not room_ids or room_ids[-1] != room_id:
+                room_ids.append(room_id)
+                numbers.append(number)
+            if reserve_id is not None:
+                bookings.append(
+                    (
+                        len(room_ids) - 1,
+                        reserve_id,
+                        (lower - starting_date).days,
+                        (upper - starting_date).days,
+                    )
+                )
+
+        cells = np.zeros((len(room_ids), days), dtype=np.int64)
+        if bookings:
+            row, reserve, start, stop = np.array(bookings, dtype=np.int64).T
+            start = np.clip(start, 0, days)
+            stop = np.clip(stop, 0, days)
+            lengths = stop - start
+            # Índices de todas las noches ocupadas sin recorrerlas en Python
+            offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            cells[np.repeat(row, lengths), np.repeat(start, lengths) + offsets] = np.repeat(
+                reserve, lengths
+            )
+        return cls(
+            starting_date,
+            end_date,
+            np.array(room_ids, dtype=np.int64),
+            np.array(numbers, dtype=np.int64),
+            cells,
+        )
+
+    def runs(self):
+        """
+        Codifica las celdas ocupadas por tramos.
+
+        Un tramo es una secuencia de noches consecutivas de una habitación con
+        la misma reserva.
+
+        Returns:
+            tuple: Arrays (fila, inicio, longitud, reserva) de cada tramo ocupado.
+        """
+        rooms, days = self.cells.shape
+        if not rooms or not days:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty, empty
+        boundaries = np.ones(self.cells.shape, dtype=bool)
+        boundaries[:, 1:] = self.cells[:, 1:] != self.cells[:, :-1]
+        row, start = np.nonzero(boundaries)
+        stop = np.append(start[1:], days)
+        stop[np.append(row[1:] != row[:-1], True)] = days
+        reserve = self.cells[row, start]
+        busy = reserve != 0
+        return row[busy], start[busy], (stop - start)[busy], reserve[busy]
+
+    def to_json(self):
+        """
+        Representación JSON por tramos.
+
+        Returns:
+            dict: Ventana y, por habitación, sus tramos [inicio, noches, reserva],
+            con el inicio como desplazamiento en días desde starting_date.
+        """
+        rooms = [
+            {"id": int(room_id), "number": int(number), "runs": []}
+            for room_id, number in zip(self.room_ids, self.numbers)
+        ]
+        for row, start, length, reserve in zip(*(array.tolist() for array in self.runs())):
+            rooms[row]["runs"].append([start, length, reserve])
+        return {
+            "start": self.starting_date,
+            "end": self.end_date,
+            "days": self.cells.shape[1],
+            "rooms": rooms,
+        }
+
+    def to_bytes(self):
+        """
+        Representación binaria: ids de habitación seguidos de la matriz.
+
+        Returns:
+            bytes: int64 little-endian (los ids son BigAutoField); primero
+            las R habitaciones y después las R × D celdas por filas.
+        """
+        return self.room_ids.astype("<i8").tobytes() + self.cells.astype("<i8").tobytes()
@@ -10,6 +10,9 @@ from django.contrib.auth.models import User
 from datetime import date, timedelta
 from .models import Room
 from .views import show_rooms
+from .occupancy import OccupancyMatrix
+from django.contrib.auth.models import Permission
+import numpy as np
 
 class RoomModelTest(TestCase):
     def setUp(self):
@@ -46,6 +49,26 @@ class RoomModelTest(TestCase):
         expected_dates = [self.reservation.starting_date + timedelta(days=i) for i in range(self.reservation.nights)]
         self.assertEqual(self.room.occupied_dates, expected_dates)
 
+    def test_occupied_dates_deferred_by_default(self):
+        """Test para verificar que el gestor aplaza occupied_dates salvo que se pida."""
+        self.room.reserve_dates(self.reservation)
+        self.assertIn("occupied_dates", Room.objects.get(id=self.room.id).get_deferred_fields())
+        self.assertIn("occupied_dates", self.reservation.rooms.get().get_deferred_fields())
+        self.assertIn("occupied_dates", Reserve.objects.get().get_deferred_fields())
+        with self.assertNumQueries(1):
+            room = Room.objects.with_occupied_dates().get(id=self.room.id)
+            self.assertEqual(len(room.occupied_dates), self.reservation.nights)
+
+    def test_is_free(self):
+        """Test para verificar la disponibilidad de la habitación sin cargar sus fechas."""
+        self.room.reserve_dates(self.reservation)
+        room = Room.objects.get(id=self.room.id)
+        end_date = self.reservation.end_date
+        self.assertFalse(room.is_free(date.today(), end_date))
+        self.assertTrue(room.is_free(date.today(), end_date, self.reservation))
+        self.assertTrue(room.is_free(end_date, end_date + timedelta(days=2)))
+        self.assertIn("occupied_dates", room.get_deferred_fields())
+
     def test_room_str_representation(self):
         """Test para verificar la representación en cadena del modelo Room."""
         self.assertEqual(str(self.room), "101")
@@ -87,4 +110,214 @@ class ShowRoomsViewTest(TestCase):
 
         # Verifica que las fechas se renderizan correctamente
         for date in response.context['dates']:
-            self.assertContains(response, str(date))
\ No newline at end of file
+            self.assertContains(response, str(date))
+
+class AvailabilityEngineTest(TestCase):
+    def setUp(self):
+        from .availability import engine
+        self.engine = engine
+        self.user = User.objects.create_user(username='engine', password='12345')
+        self.customer = Customer.objects.create(name="Engine", user=self.user)
+        self.room = Room.objects.create(number=201, price=50.0, capacity=2)
+        self.other_room = Room.objects.create(number=202, price=60.0, capacity=4)
+        self.start = date.today() + timedelta(days=10)
+        self.reservation = Reserve.objects.create(
+            customer=self.customer,
+            user=self.user,
+            starting_date=self.start,
+            nights=3,
+            end_date=self.start + timedelta(days=3),
+            people=2,
+        )
+        self.room.reserve_dates(self.reservation)
+        self.engine.rebuild()
+
+    def tearDown(self):
+        self.engine.invalidate()
+
+    def test_free_rooms(self):
+        """El motor excluye las habitaciones con noches ocupadas en el intervalo."""
+        free = self.engine.free_rooms(self.start + timedelta(days=2), self.start + timedelta(days=5))
+        self.assertEqual(free, [(self.other_room.id, 4)])
+        free = self.engine.free_rooms(self.start + timedelta(days=3), self.start + timedelta(days=5))
+        self.assertEqual(len(free), 2)
+
+    def test_free_between_uses_engine(self):
+        """Con AVAILABILITY_ENGINE activo el QuerySet se filtra con el motor."""
+        with self.settings(AVAILABILITY_ENGINE=True):
+            rooms = Room.objects.free_between(self.start, self.start + timedelta(days=1))
+            self.assertEqual(list(rooms), [self.other_room])
+
+    def test_out_of_horizon(self):
+        """Fuera del horizonte el motor no responde."""
+        far = date.today() + timedelta(days=self.engine.horizon_days + 1)
+        self.assertIsNone(self.engine.free_rooms(far, far + timedelta(days=1)))
+
+    def test_incremental_update(self):
+        """Las reservas confirmadas y eliminadas actualizan el motor."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_room.reserve_dates(self.reservation)
+        self.assertEqual(self.engine.free_rooms(self.start, self.start + timedelta(days=1)), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reservation.delete()
+        free = self.engine.free_rooms(self.start, self.start + timedelta(days=1))
+        self.assertEqual(len(free), 2)
+
+    def test_change_from_other_process(self):
+        """Los cambios registrados por otro proceso recargan solo sus habitaciones."""
+        from reservation_app.models import RoomBooking
+        from .availability import commit_occupancy_change
+        days = self.engine.days
+        # bulk_create no emite señales: este motor no se entera del cambio
+        RoomBooking.objects.bulk_create([
+            RoomBooking(reserve=self.reservation, room=self.other_room, period=self.reservation.period)
+        ])
+        commit_occupancy_change([self.other_room.id])
+        self.assertEqual(self.engine.free_rooms(self.start, self.start + timedelta(days=1)), [])
+        RoomBooking.objects.filter(room=self.room)._raw_delete(RoomBooking.objects.db)
+        commit_occupancy_change([self.room.id])
+        free = self.engine.free_rooms(self.start, self.start + timedelta(days=1))
+        self.assertEqual(free, [(self.room.id, 2)])
+        self.assertIs(self.engine.days, days)
+
+    def test_version_gap_rebuilds(self):
+        """Si falta una versión en el registro, el motor se reconstruye."""
+        from django.db import connection
+        from reservation_app.models import RoomBooking
+        days = self.engine.days
+        RoomBooking.objects.bulk_create([
+            RoomBooking(reserve=self.reservation, room=self.other_room, period=self.reservation.period)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT nextval('room_occupancy_version')")
+        self.assertEqual(self.engine.free_rooms(self.start, self.start + timedelta(days=1)), [])
+        self.assertIsNot(self.engine.days, days)
+
+    def test_own_change_keeps_engine(self):
+        """Los cambios de este proceso, incluida la capacidad, no reconstruyen el motor."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_room.reserve_dates(self.reservation)
+            self.room.capacity = 3
+            self.room.save()
+        days = self.engine.days
+        free = self.engine.free_rooms(self.start + timedelta(days=3), self.start + timedelta(days=4))
+        self.assertIn((self.room.id, 3), free)
+        self.assertIs(self.engine.days, days)
+
+class RoomCalendarViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='calendar', password='12345')
+        self.customer = Customer.objects.create(name="Calendar", user=self.user)
+        self.room = Room.objects.create(number=301, price=50.0, capacity=2)
+        self.start = date.today() + timedelta(days=10)
+        for offset, nights in ((0, 2), (2, 3), (10, 1)):
+            starting_date = self.start + timedelta(days=offset)
+            reservation = Reserve.objects.create(
+                customer=self.customer,
+                user=self.user,
+                starting_date=starting_date,
+                nights=nights,
+                end_date=starting_date + timedelta(days=nights),
+                people=2,
+            )
+            self.room.reserve_dates(reservation)
+        self.client.login(username='calendar', password='12345')
+
+    def feed(self, start, end, **extra):
+        return self.client.get(
+            f'/room/{self.room.id}/calendar/', {'start': start, 'end': end}, **extra
+        )
+
+    def test_occupied_ranges(self):
+        """Las estancias contiguas se fusionan y se recortan a la ventana."""
+        ranges = self.room.occupied_ranges(self.start + timedelta(days=1), self.start + timedelta(days=30))
+        self.assertEqual(ranges, [
+            [self.start + timedelta(days=1), self.start + timedelta(days=5)],
+            [self.start + timedelta(days=10), self.start + timedelta(days=11)],
+        ])
+
+    def test_feed(self):
+        """El feed devuelve intervalos [inicio, fin) en formato ISO."""
+        response = self.feed(self.start, self.start + timedelta(days=7))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['busy'], [
+            [str(self.start), str(self.start + timedelta(days=5))],
+        ])
+        etag = response['ETag']
+        response = self.feed(self.start, self.start + timedelta(days=7), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalid_window(self):
+        """Las ventanas vacías, invertidas o demasiado largas se rechazan."""
+        self.assertEqual(self.feed(self.start, self.start).status_code, 400)
+        self.assertEqual(self.feed(self.start, self.start + timedelta(days=365)).status_code, 400)
+        self.assertEqual(self.feed('hoy', self.start).status_code, 400)
+
+    def test_page_does_not_embed_dates(self):
+        """La página de habitaciones no incluye las fechas ocupadas."""
+        response = self.client.get('/room/show/')
+        self.assertContains(response, f'/room/{self.room.id}/calendar/')
+        self.assertNotContains(response, self.start.strftime('%Y-%m-%d'))
+
+class OccupancyMatrixTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='staff', password='12345', is_staff=True)
+        self.user.user_permissions.add(Permission.objects.get(codename='view_reserve'))
+        self.customer = Customer.objects.create(name="Staff", user=self.user)
+        self.room = Room.objects.create(number=401, price=50.0, capacity=2)
+        self.free_room = Room.objects.create(number=402, price=50.0, capacity=2)
+        self.start = date.today() + timedelta(days=10)
+        self.reservations = []
+        for offset, nights in ((-2, 3), (1, 2), (3, 1)):
+            starting_date = self.start + timedelta(days=offset)
+            reservation = Reserve.objects.create(
+                customer=self.customer,
+                user=self.user,
+                starting_date=starting_date,
+                nights=nights,
+                end_date=starting_date + timedelta(days=nights),
+                people=2,
+            )
+            self.room.reserve_dates(reservation)
+            self.reservations.append(reservation.id)
+        self.client.login(username='staff', password='12345')
+
+    def test_build(self):
+        """Cada celda guarda la reserva de la noche, recortada a la ventana."""
+        matrix = OccupancyMatrix.build(self.start, self.start + timedelta(days=5))
+        first, second, third = self.reservations
+        self.assertEqual(matrix.room_ids.tolist(), [self.room.id, self.free_room.id])
+        self.assertEqual(matrix.cells.tolist(), [
+            [first, second, second, third, 0],
+            [0, 0, 0, 0, 0],
+        ])
+
+    def test_json(self):
+        """El formato JSON codifica los tramos ocupados por habitación."""
+        response = self.client.get('/room/occupancy/', {
+            'start': self.start, 'end': self.start + timedelta(days=5),
+        })
+        self.assertEqual(response.status_code, 200)
+        first, second, third = self.reservations
+        rooms = response.json()['rooms']
+        self.assertEqual(rooms[0]['runs'], [[0, 1, first], [1, 2, second], [3, 1, third]])
+        self.assertEqual(rooms[1]['runs'], [])
+
+    def test_binary(self):
+        """El formato binario contiene los ids de habitación y la matriz."""
+        response = self.client.get('/room/occupancy/', {
+            'start': self.start, 'end': self.start + timedelta(days=5), 'format': 'binary',
+        })
+        self.assertEqual(response['X-Occupancy-Rooms'], '2')
+        values = np.frombuffer(response.content, dtype='<i8')
+        self.assertEqual(values[:2].tolist(), [self.room.id, self.free_room.id])
+        self.assertEqual(values[2:].reshape(2, 5)[0, 3], self.reservations[2])
+
+    def test_staff_only(self):
+        """Los usuarios que no son personal no acceden a la matriz."""
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get('/room/occupancy/', {
+            'start': self.start, 'end': self.start + timedelta(days=5),
+        })
+        self.assertEqual(response.status_code, 403)
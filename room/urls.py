@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import show_rooms
+from .views import occupancy, room_calendar, show_rooms
 
 urlpatterns = [
     path("show/", show_rooms, name="show_rooms"),
+    path("<int:id>/calendar/", room_calendar, name="room_calendar"),
+    path("occupancy/", occupancy, name="occupancy"),
 ]
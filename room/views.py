@@ -1,17 +1,28 @@
-from datetime import datetime, timedelta
-from django.shortcuts import render
+from datetime import date, datetime, timedelta
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.views.decorators.http import require_GET
+from .availability import occupancy_version
 from .models import Room
-from django.contrib.auth.decorators import login_required
+from .occupancy import OccupancyMatrix
+from django.contrib.auth.decorators import login_required, permission_required
 
 # Create your views here.
 
+CALENDAR_MAX_DAYS = 62
+OCCUPANCY_MAX_DAYS = 366
+
 
 @login_required
 def show_rooms(request):
     """
     Vista para mostrar todas las habitaciones disponibles y las fechas próximas.
 
-    Esta vista requiere que el usuario esté autenticado.
+    Esta vista requiere que el usuario esté autenticado. Las fechas ocupadas
+    no se incluyen en la página: cada calendario las pide a room_calendar
+    para el mes visible.
 
     Args:
         request: El objeto HttpRequest.
@@ -22,3 +33,128 @@ def show_rooms(request):
     rooms = Room.objects.all()
     context = {"rooms": rooms}
     return render(request, "room/show_rooms.html", context)
+
+
+@login_required
+@require_GET
+def room_calendar(request, id):
+    """
+    Devuelve los intervalos ocupados de una habitación en una ventana de fechas.
+
+    Acepta los parámetros `start` y `end` (AAAA-MM-DD, fin no incluido) con
+    una ventana de como máximo CALENDAR_MAX_DAYS días. Los intervalos se
+    codifican como pares [inicio, fin). La respuesta lleva un ETag derivado
+    de la versión de ocupación.
+
+    Args:
+        request: El objeto HttpRequest.
+        id: El ID de la habitación.
+
+    Returns:
+        JsonResponse: Intervalos ocupados de la habitación.
+            - 304 si el ETag de If-None-Match sigue vigente.
+            - 400 si la ventana no es válida.
+
+    Ejemplo de solicitud:
+    GET /room/4/calendar/?start=2025-06-29&end=2025-08-10
+
+    Ejemplo de respuesta:
+    {
+        "room": 4,
+        "start": "2025-06-29",
+        "end": "2025-08-10",
+        "busy": [["2025-07-01", "2025-07-04"], ["2025-07-20", "2025-07-22"]]
+    }
+    """
+    room = get_object_or_404(Room, id=id)
+    try:
+        starting_date = date.fromisoformat(request.GET["start"][:10])
+        end_date = date.fromisoformat(request.GET["end"][:10])
+    except (KeyError, ValueError):
+        return JsonResponse({"status": "failed"}, status=400)
+    if not 0 < (end_date - starting_date).days <= CALENDAR_MAX_DAYS:
+        return JsonResponse({"status": "failed"}, status=400)
+
+    etag = quote_etag(f"{occupancy_version()}-{room.id}-{starting_date}-{end_date}")
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    response = JsonResponse(
+        {
+            "room": room.id,
+            "start": starting_date,
+            "end": end_date,
+            "busy": room.occupied_ranges(starting_date, end_date),
+        }
+    )
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@login_required
+@permission_required("reservation_app.view_reserve", raise_exception=True)
+@require_GET
+def occupancy(request):
+    """
+    Devuelve la matriz de ocupación habitaciones × días de una ventana.
+
+    Solo para personal. Acepta los parámetros `start` y `end` (AAAA-MM-DD,
+    fin no incluido, como máximo OCCUPANCY_MAX_DAYS días) y `format`:
+
+    - "json" (por defecto): por habitación, tramos [inicio, noches, reserva]
+      con el inicio relativo a `start`.
+    - "binary": int64 little-endian con los ids de las R habitaciones
+      seguidos de las R × D celdas (id de reserva o 0). Las cabeceras
+      X-Occupancy-Rooms, X-Occupancy-Days y X-Occupancy-Start describen la
+      matriz.
+
+    Args:
+        request: El objeto HttpRequest.
+
+    Returns:
+        JsonResponse o HttpResponse: Matriz de ocupación.
+            - 304 si el ETag de If-None-Match sigue vigente.
+            - 400 si la ventana o el formato no son válidos.
+
+    Ejemplo de solicitud:
+    GET /room/occupancy/?start=2025-07-01&end=2025-07-08
+
+    Ejemplo de respuesta:
+    {
+        "start": "2025-07-01",
+        "end": "2025-07-08",
+        "days": 7,
+        "rooms": [{"id": 1, "number": 101, "runs": [[0, 3, 57], [4, 2, 61]]}, ...]
+    }
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied
+    output = request.GET.get("format", "json")
+    try:
+        starting_date = date.fromisoformat(request.GET["start"][:10])
+        end_date = date.fromisoformat(request.GET["end"][:10])
+    except (KeyError, ValueError):
+        return JsonResponse({"status": "failed"}, status=400)
+    if output not in ("json", "binary"):
+        return JsonResponse({"status": "failed"}, status=400)
+    if not 0 < (end_date - starting_date).days <= OCCUPANCY_MAX_DAYS:
+        return JsonResponse({"status": "failed"}, status=400)
+
+    etag = quote_etag(f"{occupancy_version()}-{starting_date}-{end_date}-{output}")
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    matrix = OccupancyMatrix.build(starting_date, end_date)
+    if output == "binary":
+        response = HttpResponse(matrix.to_bytes(), content_type="application/octet-stream")
+        response["X-Occupancy-Rooms"] = len(matrix.room_ids)
+        response["X-Occupancy-Days"] = matrix.cells.shape[1]
+        response["X-Occupancy-Start"] = starting_date.isoformat()
+    else:
+        response = JsonResponse(matrix.to_json())
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response